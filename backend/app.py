@@ -1,11 +1,13 @@
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from services import metrics, native
+from services.responses import DuplexStreamingResponse
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from typing import List, Optional
-import sys
 import os
 import logging
 import asyncio
+import json
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -21,39 +23,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Robust import of mahjong_core extension: try normal import, then fallback candidate paths.
-mahjong_core = None
-try:
-    import mahjong_core  # try normal import
-    mahjong_core = mahjong_core
-except Exception as e:
-    logger.warning("mahjong_core import failed: %s. Trying fallback paths...", e)
-    base = os.path.dirname(__file__)
-    candidates = [
-        os.path.join(base, "mahjong_core"),
-        os.path.join(base, "mahjong_core", "Release"),
-        os.path.join(base, "mahjong_core", "build", "Release"),
-        os.path.join(base, "mahjong_core", "build"),
-        os.path.join(base, "mahjong_core", "Release"),
-    ]
-    for p in candidates:
-        if os.path.isdir(p) and p not in sys.path:
-            sys.path.insert(0, p)
-    try:
-        import mahjong_core
-        mahjong_core = mahjong_core
-    except Exception as e2:
-        logger.error("Failed to import mahjong_core after fallbacks: %s", e2)
-        mahjong_core = None
-
 class Settings(BaseSettings):
     # pending-discard timeout in seconds
     pending_discard_timeout: int = 10
     # cleanup loop interval in seconds (can be float)
     pending_cleanup_interval: float = 1.0
-    # websocket idle config (seconds)
+    # websocket idle config (seconds): server pings after ws_ping_interval of
+    # silence and closes sockets silent for ws_idle_timeout
     ws_idle_timeout: float = 30.0
-    ws_cleanup_interval: float = 5.0
+    ws_ping_interval: float = 10.0
+    # per-room replay buffer length for websocket resume (?since=<seq>)
+    event_buffer_size: int = 256
+    # spectator tier (?role=spectator): broadcast delay, coalescing window,
+    # concurrent sends per room and per-send timeout
+    spectator_delay: float = 0.0
+    spectator_coalesce: float = 0.05
+    spectator_concurrency: int = 64
+    spectator_send_timeout: float = 5.0
+    # threads evaluating native win checks off the event loop (0 = inline)
+    native_workers: int = 2
+    # server-side bots: default policy and how long a seat's sockets must be
+    # gone before a bot takes it over (negative disables takeover)
+    bot_policy: str = "shanten"
+    bot_takeover_delay: float = 5.0
+    # matchmaking: grouping delay after an enqueue, max rooms seated per pass
+    # and how long matched or failed tickets wait to be collected
+    matchmaking_interval: float = 0.05
+    matchmaking_batch: int = 256
+    matchmaking_ticket_ttl: float = 60.0
+    # lock contention profiler (GET/POST /rooms/admin/locks): on at startup,
+    # and timings kept per call site for percentiles
+    lock_profiling: bool = False
+    lock_profile_samples: int = 4096
+    # request tracing: fraction of requests traced (0 = off) and the rotating
+    # NDJSON file the traces are appended to
+    trace_sample_rate: float = 0.0
+    trace_file: str = os.path.join("traces", "requests.ndjson")
+    trace_max_bytes: int = 10 * 1024 * 1024
+    trace_backups: int = 5
+    # reject create/join by a player already seated in another active room
+    unique_seats: bool = False
     # admin token (if set, admin endpoints and ws require this token)
     admin_token: Optional[str] = None
 
@@ -72,35 +81,179 @@ app.include_router(room.router, prefix="/rooms", tags=["rooms"])
 async def _startup_tasks():
     # supply event loop for websocket send scheduling
     room.set_event_loop(asyncio.get_event_loop())
+    room.set_event_buffer_size(settings.event_buffer_size)
+    native.configure_pool(settings.native_workers)
+    # resolve the engine now rather than on the first request
+    native.load()
+    room.configure_lock_profiling(enabled=settings.lock_profiling, samples=settings.lock_profile_samples)
+    room.configure_tracing(rate=settings.trace_sample_rate, path=settings.trace_file,
+                           max_bytes=settings.trace_max_bytes, backups=settings.trace_backups)
+    room.set_unique_seats(settings.unique_seats)
+    room.configure_ws_idle(ping_interval=settings.ws_ping_interval, idle_timeout=settings.ws_idle_timeout)
+    room.configure_spectators(delay=settings.spectator_delay, coalesce=settings.spectator_coalesce,
+                              concurrency=settings.spectator_concurrency,
+                              send_timeout=settings.spectator_send_timeout)
+    room.configure_bots(policy=settings.bot_policy, takeover_delay=settings.bot_takeover_delay)
+    room.start_matchmaking(interval=settings.matchmaking_interval, batch=settings.matchmaking_batch,
+                           ticket_ttl=settings.matchmaking_ticket_ttl)
     try:
         room.start_pending_cleanup(interval=settings.pending_cleanup_interval,
                                    timeout=settings.pending_discard_timeout)
-        # start websocket idle cleanup
-        room.start_ws_cleanup(interval=settings.ws_cleanup_interval,
-                              timeout=settings.ws_idle_timeout)
     except Exception:
-        logger.exception("Failed to start background cleanup threads")
+        logger.exception("Failed to start pending-discard cleanup task")
+
+@app.on_event("shutdown")
+async def _shutdown_tasks():
+    # stop the loop's background tasks so a later startup (on a new loop, as
+    # in-process test runs do) starts fresh ones
+    room.stop_matchmaking()
+    room.stop_pending_cleanup()
+    # write out traces still queued for the export thread
+    room.tracer.close()
 
 class TilesRequest(BaseModel):
     tiles: List[int]
 
 @app.get("/")
 def root():
-    return {"status": "ok", "mahjong_core_loaded": bool(mahjong_core)}
+    engine = native.info()
+    return {"status": "ok", "mahjong_core_loaded": engine["backend"] == "native",
+            "engine": {"backend": engine["backend"], "source": engine["source"],
+                       "load_ms": round(engine["seconds"] * 1e3, 3)}}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape target (text exposition format 0.0.4)."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.post("/check_win")
 def check_win(req: TilesRequest):
     if len(req.tiles) != 14:
         raise HTTPException(status_code=400, detail="Tiles must be 14 numbers")
-    if mahjong_core is None or not hasattr(mahjong_core, "is_win"):
+    mc = native.load()
+    if mc is None:
         raise HTTPException(status_code=500, detail="mahjong_core module not available")
     try:
-        result = mahjong_core.is_win(req.tiles)
+        result = native.timed_is_win(mc)(req.tiles)
     except Exception as e:
         logger.exception("mahjong_core.is_win error")
         raise HTTPException(status_code=500, detail=str(e))
     return {"win": bool(result)}
 
+# bulk win checks are evaluated CHECK_WIN_CHUNK hands at a time, so memory
+# stays bounded by the chunk size whatever the size of the body
+CHECK_WIN_CHUNK = int(os.getenv("MJ_CHECK_WIN_CHUNK", 4096))
+HAND_BYTES = 14
+_NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+_MAX_NDJSON_LINE = 1024
+_BAD_LINE = object()
+
+@app.post("/check_win/bulk")
+async def check_win_bulk(request: Request):
+    """Check many hands in one streamed request.
+
+    application/octet-stream: packed hands, 14 tile bytes each; the response
+    is one byte per hand (1 = win, 0 = not).
+
+    application/x-ndjson: one hand per line, as a tile array or
+    {"tiles": [...]}; the response has one line per input line,
+    {"index": n, "win": bool} or {"index": n, "error": "..."}.
+
+    Results stream back chunk by chunk while the body is still being read,
+    so clients sending very large bodies should read the response
+    concurrently.
+    """
+    mc = native.native_view(native.load())
+    if mc is None:
+        raise HTTPException(status_code=500, detail="mahjong_core module not available")
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if ctype == "application/octet-stream":
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) % HAND_BYTES:
+            raise HTTPException(status_code=400, detail="Packed body must be a multiple of 14 bytes")
+        return DuplexStreamingResponse(_bulk_packed(request, mc), media_type="application/octet-stream")
+    if ctype in _NDJSON_TYPES:
+        return DuplexStreamingResponse(_bulk_ndjson(request, mc), media_type="application/x-ndjson")
+    raise HTTPException(status_code=415, detail="Send application/x-ndjson or application/octet-stream")
+
+def _check_packed(mc, packed: bytes) -> bytes:
+    if hasattr(mc, "is_win_batch"):
+        return native.NATIVE_SECONDS.timed(mc.is_win_batch, "is_win_batch")(packed)
+    # builds without the batch entry point: one native call per hand
+    return bytes(1 if mc.is_win(list(packed[i:i + HAND_BYTES])) else 0
+                 for i in range(0, len(packed), HAND_BYTES))
+
+async def _bulk_packed(request: Request, mc):
+    size = CHECK_WIN_CHUNK * HAND_BYTES
+    buf = bytearray()
+    async for data in request.stream():
+        buf += data
+        while len(buf) >= size:
+            chunk = bytes(buf[:size])
+            del buf[:size]
+            yield await native.run(_check_packed, mc, chunk)
+    # a trailing partial hand (chunked bodies only) is ignored
+    whole = len(buf) - len(buf) % HAND_BYTES
+    if whole:
+        yield await native.run(_check_packed, mc, bytes(buf[:whole]))
+
+def _check_ndjson(mc, lines: List[bytes], first: int) -> bytes:
+    """Evaluate a chunk of NDJSON lines; returns the NDJSON result lines."""
+    try:
+        rows = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        rows = None
+    # a line holding several values ("1,2", "[...], [...]") or a value split
+    # over lines would shift every later index, so the joined parse must
+    # give exactly one row per line
+    if rows is None or len(rows) != len(lines):
+        rows = []
+        for line in lines:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(_BAD_LINE)
+    packed = bytearray()
+    errors = {}
+    for i, row in enumerate(rows):
+        tiles = row.get("tiles") if isinstance(row, dict) else row
+        if row is _BAD_LINE:
+            errors[i] = "Invalid JSON"
+        elif not isinstance(tiles, list) or len(tiles) != HAND_BYTES:
+            errors[i] = "Tiles must be 14 numbers"
+        elif not all(isinstance(t, int) and 0 <= t <= 255 for t in tiles):
+            packed += bytes(HAND_BYTES)  # out-of-range tiles never win
+        else:
+            packed += bytes(tiles)
+    results = iter(_check_packed(mc, bytes(packed)))
+    out = []
+    for i in range(len(rows)):
+        if i in errors:
+            out.append(b'{"index":%d,"error":"%s"}\n' % (first + i, errors[i].encode()))
+        else:
+            out.append(b'{"index":%d,"win":%s}\n' % (first + i, b"true" if next(results) else b"false"))
+    return b"".join(out)
+
+async def _bulk_ndjson(request: Request, mc):
+    pending = b""
+    lines: List[bytes] = []
+    index = 0
+    async for data in request.stream():
+        parts = (pending + data).split(b"\n")
+        pending = parts.pop()
+        if len(pending) > _MAX_NDJSON_LINE:
+            yield b'{"index":%d,"error":"Line too long"}\n' % (index + len(lines))
+            return
+        lines.extend(p for p in parts if p.strip())
+        while len(lines) >= CHECK_WIN_CHUNK:
+            chunk, lines = lines[:CHECK_WIN_CHUNK], lines[CHECK_WIN_CHUNK:]
+            yield await native.run(_check_ndjson, mc, chunk, index)
+            index += len(chunk)
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield await native.run(_check_ndjson, mc, lines, index)
+
 from pydantic import BaseModel
 from typing import Optional
 
@@ -109,7 +262,7 @@ class UpdateCleanupModel(BaseModel):
     pending_cleanup_interval: Optional[float] = None
 
 @app.post("/admin/update_cleanup")
-def admin_update_cleanup(cfg: UpdateCleanupModel, x_admin_token: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
+async def admin_update_cleanup(cfg: UpdateCleanupModel, x_admin_token: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
     # simple header-based admin auth: check X-Admin-Token or Authorization: Bearer <token>
     token_required = app.state.settings.admin_token
     if token_required:
@@ -125,7 +278,7 @@ def admin_update_cleanup(cfg: UpdateCleanupModel, x_admin_token: Optional[str] =
         app.state.settings.pending_discard_timeout = cfg.pending_discard_timeout
     if cfg.pending_cleanup_interval is not None:
         app.state.settings.pending_cleanup_interval = cfg.pending_cleanup_interval
-    # restart cleanup thread with new values
+    # restart cleanup task with new values (async so this runs on the loop)
     try:
         import routers.room as room_module
         room_module.restart_pending_cleanup(interval=app.state.settings.pending_cleanup_interval,
@@ -0,0 +1 @@
+# package marker for benchmarks
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Bot-driven games: one HTTP call per action vs POST /rooms/{id}/batch.
+
+A bot seats two players and plays draw -> discard -> pass until the game
+ends. "single" sends every action as its own request; "batch" queues turns
+while it can still name a tile each seat is known to hold (tiles seen in
+the last hand it got back), sends them in one request, and learns the new
+hands from the per-action results.
+
+Start the server first, then from backend/:
+
+    python -m benchmarks.bench_batch [--games N]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import requests
+
+PREFIX = "/rooms"
+
+class Bot:
+    def __init__(self, base: str):
+        self.base = base + PREFIX
+        self.http = requests.Session()
+        self.calls = 0
+
+    def post(self, path: str, json=None, **params) -> dict:
+        self.calls += 1
+        r = self.http.post(self.base + path, params=params, json=json)
+        return r.json() if r.status_code == 200 else {"error": r.status_code}
+
+    def new_game(self, n: int):
+        seats = ["bb%d-a" % n, "bb%d-b" % n]
+        room_id = self.post("/create_room", player=seats[0], max_players=2)["room_id"]
+        self.post("/join_room", room_id=room_id, player=seats[1])
+        st = self.post("/start_game", room_id=room_id)
+        return room_id, seats, st["current_player"], {p: list(st["hands"][p]) for p in seats}
+
+def play_single(bot: Bot, n: int) -> int:
+    room_id, seats, current, _ = bot.new_game(n)
+    turns = 0
+    while True:
+        drawn = bot.post("/draw_tile", room_id=room_id, player=current)
+        if "error" in drawn or drawn.get("win"):
+            return turns
+        bot.post("/discard_tile", room_id=room_id, player=current, tile=drawn["tile"])
+        other = seats[1] if current == seats[0] else seats[0]
+        bot.post("/pass_claim", room_id=room_id, player=other)
+        current = other
+        turns += 1
+
+def play_batch(bot: Bot, n: int) -> int:
+    room_id, seats, current, hands = bot.new_game(n)
+    turns = 0
+    while True:
+        # tiles each seat is known to hold and hasn't queued for discard yet
+        known: Dict[str, List[int]] = {p: list(h) for p, h in hands.items()}
+        actions = []
+        seat = current
+        while known[seat]:
+            other = seats[1] if seat == seats[0] else seats[0]
+            actions += [{"cmd": "draw_tile", "player": seat},
+                        {"cmd": "discard_tile", "player": seat, "args": {"tile": known[seat].pop()}},
+                        {"cmd": "pass_claim", "player": other}]
+            seat = other
+        res = bot.post("/%d/batch" % room_id, json={"actions": actions})
+        for r in res["results"]:
+            if not r["ok"] or (r["cmd"] == "draw_tile" and r["result"].get("win")):
+                return turns  # deck exhausted or someone won
+            if r["cmd"] == "discard_tile":
+                hands[current] = list(r["result"]["hand"])
+                current = r["result"]["next_player"]
+                turns += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--games", type=int, default=20)
+    args = parser.parse_args()
+    print("%8s %10s %12s %12s %10s" % ("mode", "turns", "calls/game", "ms/game", "turns/s"))
+    for mode, play in (("single", play_single), ("batch", play_batch)):
+        bot = Bot(args.base)
+        turns = 0
+        t0 = time.perf_counter()
+        for n in range(args.games):
+            turns += play(bot, n)
+        elapsed = time.perf_counter() - t0
+        print("%8s %10d %12.1f %12.1f %10.0f" % (mode, turns, bot.calls / args.games,
+                                                  elapsed * 1000 / args.games, turns / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Server-bot step latency on the event loop.
+
+In-process against the rooms router: N rooms of four bot seats play to the
+end concurrently. Every bot step (one locked draw, discard, claim or pass
+including its events) is timed, which is how long a step holds the event
+loop before yielding to other rooms.
+
+Run from backend/:  python -m benchmarks.bench_bots [--rooms N] [--policy shanten]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from routers import room
+from services import native
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1e6
+
+async def run(rooms: int, policy: str):
+    timings: List[float] = []
+    step = room._bot_step
+
+    async def timed_step(room_id):
+        t0 = time.perf_counter()
+        moved = await step(room_id)
+        timings.append(time.perf_counter() - t0)
+        return moved
+    room._bot_step = timed_step
+    ids = []
+    for n in range(rooms):
+        rid = (await room.create_room(player="bench-host-%d" % n, max_players=4))["room_id"]
+        room.room_bots.setdefault(rid, {})["bench-host-%d" % n] = room._new_bot(policy)
+        for _ in range(3):
+            await room.add_bot(room_id=rid, policy=policy)
+        ids.append(rid)
+    t0 = time.perf_counter()
+    for rid in ids:
+        await room.start_game(room_id=rid)
+    while room._bot_tasks:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+    room._bot_step = step
+    finished = sum(room.rooms[rid].status == "finished" for rid in ids)
+    timings.sort()
+    print("%d rooms (%d won, %d stopped on an empty deck) in %.2fs, %d bot steps (%.0f/s)"
+          % (rooms, finished, rooms - finished, elapsed, len(timings), len(timings) / elapsed))
+    print("step time p50 %.0f us  p99 %.0f us  max %.0f us"
+          % (_pct(timings, 0.50), _pct(timings, 0.99), timings[-1] * 1e6))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--policy", default="shanten")
+    args = parser.parse_args()
+    native.configure_pool(0)
+    asyncio.get_event_loop().run_until_complete(run(args.rooms, args.policy))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Win-check throughput in hands per second.
+
+In-process: one mahjong_core.is_win call per hand vs is_win_batch over
+packed hands. Over HTTP (needs a running server): one POST /check_win per
+hand vs POST /check_win/bulk with packed and NDJSON bodies.
+
+Run from backend/:  python -m benchmarks.bench_check_win [--hands N] [--no-http]
+"""
+import argparse
+import json
+import random
+import time
+
+import requests
+
+from services import native
+
+def sample_hands(n: int, seed: int = 11):
+    """Random hands with roughly one in ten built as a winning shape."""
+    rng = random.Random(seed)
+    hands = []
+    for i in range(n):
+        if i % 10:
+            hands.append([rng.randint(1, 39) for _ in range(14)])
+            continue
+        hand = [rng.randint(1, 39)] * 2
+        for _ in range(4):
+            if rng.random() < 0.5:
+                start = rng.randint(0, 2) * 9 + rng.randint(1, 7)
+                hand += [start, start + 1, start + 2]
+            else:
+                hand += [rng.randint(1, 39)] * 3
+        hands.append(hand)
+    return hands
+
+def report(label: str, n: int, seconds: float):
+    print("%-28s %10d hands %10.3fs %14.0f hands/s" % (label, n, seconds, n / seconds))
+
+def bench_native(mc, hands):
+    t0 = time.perf_counter()
+    for h in hands:
+        mc.is_win(h)
+    report("native is_win loop", len(hands), time.perf_counter() - t0)
+    packed = bytes(t for h in hands for t in h)
+    t0 = time.perf_counter()
+    mc.is_win_batch(packed)
+    report("native is_win_batch", len(hands), time.perf_counter() - t0)
+
+def bench_http(base: str, hands):
+    http = requests.Session()
+    single = hands[:2000]
+    t0 = time.perf_counter()
+    r = None
+    for h in single:
+        r = http.post(base + "/check_win", json={"tiles": h})
+    if r is not None and r.status_code == 200:
+        report("POST /check_win per hand", len(single), time.perf_counter() - t0)
+    else:
+        print("POST /check_win per hand: skipped (status %s)" % (r.status_code if r is not None else None))
+
+    def packed_body():
+        for i in range(0, len(hands), 1024):
+            yield bytes(t for h in hands[i:i + 1024] for t in h)
+    t0 = time.perf_counter()
+    r = http.post(base + "/check_win/bulk", data=packed_body(), headers={"content-type": "application/octet-stream"})
+    r.raise_for_status()
+    report("bulk packed", len(r.content), time.perf_counter() - t0)
+
+    def ndjson_body():
+        for i in range(0, len(hands), 1024):
+            yield "".join(json.dumps(h) + "\n" for h in hands[i:i + 1024]).encode()
+    t0 = time.perf_counter()
+    r = http.post(base + "/check_win/bulk", data=ndjson_body(), headers={"content-type": "application/x-ndjson"})
+    r.raise_for_status()
+    report("bulk ndjson", r.content.count(b"\n"), time.perf_counter() - t0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hands", type=int, default=200000)
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--no-http", action="store_true")
+    args = parser.parse_args()
+    mc = native.load()
+    if native.info()["backend"] != "native":
+        raise SystemExit("mahjong_core is not built")
+    hands = sample_hands(args.hands)
+    bench_native(mc, hands)
+    if not args.no_http:
+        bench_http(args.base, hands)
+
+if __name__ == "__main__":
+    main()
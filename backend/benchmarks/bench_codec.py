@@ -0,0 +1,44 @@
+"""Size and encode cost of room events: JSON text vs the binary subprotocol.
+
+Run from backend/:  python -m benchmarks.bench_codec [--number N]
+"""
+import argparse
+import timeit
+
+from services import codec
+
+PLAYERS = ["Alice", "Bob", "Carol", "Dave"]
+
+SAMPLES = {
+    "draw": {"type": "draw", "room_id": 1042, "player": "Carol", "hand_count": 14, "seq": 5120},
+    "discard": {"type": "discard", "room_id": 1042, "player": "Alice", "tile": 23, "pending": True,
+                "next_player": "Bob", "seq": 5121},
+    "pass": {"type": "pass", "room_id": 1042, "player": "Dave", "passes": ["Carol", "Dave"], "seq": 5122},
+    "pending_cleared": {"type": "pending_cleared", "room_id": 1042, "reason": "all_passed", "seq": 5123},
+    "claim": {"type": "claim", "action": "peng", "room_id": 1042, "player": "Bob",
+              "melds": [{"type": "chi", "tiles": [4, 5, 6]}, {"type": "peng", "tiles": [23, 23, 23]}], "seq": 5124},
+    "hand": {"type": "hand", "room_id": 1042, "player": "Bob", "reason": "draw",
+             "hand": [1, 2, 3, 7, 8, 9, 12, 13, 14, 31, 31, 35, 35, 38], "melds": [], "waits": [],
+             "tile": 38, "seq": 5125},
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+    print("%-16s %8s %8s %10s %10s" % ("event", "json B", "bin B", "json us", "bin us"))
+    total_json = total_bin = 0
+    for name, event in SAMPLES.items():
+        j = codec.encode_json(event).encode("utf-8")
+        b = codec.encode_binary(event, PLAYERS)
+        t_json = min(timeit.repeat(lambda: codec.encode_json(event), number=args.number, repeat=3))
+        t_bin = min(timeit.repeat(lambda: codec.encode_binary(event, PLAYERS), number=args.number, repeat=3))
+        total_json += len(j)
+        total_bin += len(b)
+        print("%-16s %8d %8d %10.3f %10.3f" % (name, len(j), len(b),
+                                              t_json / args.number * 1e6, t_bin / args.number * 1e6))
+    print("total bytes: json=%d binary=%d (%.0f%% smaller)" % (total_json, total_bin,
+                                                              100.0 * (1 - total_bin / total_json)))
+
+if __name__ == "__main__":
+    main()
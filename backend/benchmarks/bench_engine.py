@@ -0,0 +1,93 @@
+"""Game-engine throughput in steps (commands) per second.
+
+Plays random games in-process: the seat to move draws, discards the drawn
+tile and every other seat passes, until someone wins or the deck runs out.
+"engine" drives models.engine.Engine directly; "router" sends the same
+commands through the rooms router's lock-free command bodies (event
+recording, lobby index and per-seat wait sets included, no sockets).
+
+Run from backend/:  python -m benchmarks.bench_engine [--games N] [--players 4]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from models.engine import Engine
+from models.room import Room
+from routers import room as rooms_router
+from services import native
+
+def play_engine(engine: Engine) -> int:
+    room = engine.room
+    steps = 1
+    engine.start()
+    while room.deck:
+        player = room.current_player
+        out = engine.draw(player)
+        steps += 1
+        if out.result.get("win"):
+            break
+        engine.discard(player, out.result["tile"])
+        steps += 1
+        for other in room.players:
+            if other != player:
+                engine.pass_claim(other)
+                steps += 1
+    return steps
+
+async def play_router(n: int, players: int) -> int:
+    seats = ["eng%d-%d" % (n, i) for i in range(players)]
+    rid = (await rooms_router.create_room(player=seats[0], max_players=players))["room_id"]
+    for p in seats[1:]:
+        await rooms_router.join_room(room_id=rid, player=p)
+    st = await rooms_router.start_game(room_id=rid)
+    current, steps = st["current_player"], 1
+    room = rooms_router.rooms[rid]
+    while room.deck:
+        drawn = await rooms_router._draw_tile(rid, current)
+        steps += 1
+        if drawn.get("win"):
+            break
+        out = await rooms_router._discard_tile(rid, current, drawn["tile"])
+        steps += 1
+        for other in seats:
+            if other != current:
+                await rooms_router._pass_claim(rid, other)
+                steps += 1
+        current = out["next_player"]
+    return steps
+
+def report(label: str, games: int, steps: int, seconds: float):
+    print("%-8s %8d games %10d steps %9.3fs %12.0f steps/s" % (label, games, steps, seconds, steps / seconds))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    mc = native.load()
+    if native.info()["backend"] != "native":
+        raise SystemExit("mahjong_core is not built")
+    random.seed(args.seed)
+    steps = 0
+    t0 = time.perf_counter()
+    for n in range(args.games):
+        room = Room(n + 1, ["p%d" % i for i in range(args.players)])
+        steps += play_engine(Engine(room, is_win=mc.is_win))
+    report("engine", args.games, steps, time.perf_counter() - t0)
+
+    random.seed(args.seed)
+    loop = asyncio.get_event_loop()
+    rooms_router.set_event_loop(loop)
+    native.configure_pool(0)
+    games = max(1, args.games // 10)
+    steps = 0
+    t0 = time.perf_counter()
+    for n in range(games):
+        steps += loop.run_until_complete(play_router(n, args.players))
+    report("router", games, steps, time.perf_counter() - t0)
+
+if __name__ == "__main__":
+    main()
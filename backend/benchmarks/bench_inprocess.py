@@ -0,0 +1,213 @@
+"""Per-action server cost, in process and without sockets.
+
+Drives app.app through benchmarks/inprocess.py. Each game seats --seats
+players, each with a seat-bound websocket, and plays one action at a time:
+the current seat draws and throws the drawn tile, the others pass. Only one
+request is ever in flight and nothing else shares the loop. Every deck is
+seeded and native work runs inline (no pool threads), so a run plays the
+same games and sends the same frames every time.
+
+Per action (create/join/start, draw_tile, discard_tile, pass_claim) it
+reports the mean and p50/p99 in microseconds of:
+
+  total      the request through httpx's ASGI transport, body included
+  framework  total minus _play: routing, parameter parsing, the room lock
+             and response serialization (and, over http, httpx's own
+             request building, which --transport ws leaves out)
+  engine     _play minus sends: the rules engine and wait sets
+  broadcast  recording, encoding and scheduling the events for sockets
+             (_broadcast_room and _send_player)
+  delivery   from sending the request to the last frame reaching a socket
+
+It also reports websocket frames and bytes per action. These are exact, so
+they only change when the payloads do. With --transport ws the actions are
+commands on the acting seat's socket, and total runs until its reply frame
+arrives.
+
+Run from backend/:  python -m benchmarks.bench_inprocess [--games 20] [--transport ws]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.inprocess import InProcessApp
+from routers import room
+from services import native
+
+PHASES = ("total", "framework", "engine", "broadcast", "delivery")
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1e6 if values else 0.0
+
+class Probe:
+    """Times _play and the send helpers for the action in progress."""
+
+    def __init__(self):
+        self.play = 0.0
+        self.broadcast = 0.0
+        self._saved = None
+
+    def reset(self):
+        self.play = 0.0
+        self.broadcast = 0.0
+
+    def install(self):
+        self._saved = (room._play, room._broadcast_room, room._send_player)
+        play, broadcast_room, send_player = self._saved
+
+        async def timed_play(*args):
+            t0 = time.perf_counter()
+            try:
+                return await play(*args)
+            finally:
+                self.play += time.perf_counter() - t0
+
+        def timed(fn):
+            def wrapper(*args):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args)
+                finally:
+                    self.broadcast += time.perf_counter() - t0
+            return wrapper
+        room._play = timed_play
+        room._broadcast_room = timed(broadcast_room)
+        room._send_player = timed(send_player)
+
+    def uninstall(self):
+        room._play, room._broadcast_room, room._send_player = self._saved
+
+class Bench:
+    def __init__(self, server: InProcessApp, transport: str):
+        self.server = server
+        self.transport = transport
+        self.probe = Probe()
+        self.sockets: Dict[str, object] = {}
+        self.ids = 0
+        self.timings: Dict[str, Dict[str, List[float]]] = collections.defaultdict(
+            lambda: collections.defaultdict(list))
+        self.frames = collections.Counter()
+        self.bytes = collections.Counter()
+
+    async def _settle(self):
+        """Run the loop until the sends scheduled by the last action have all landed."""
+        quiet = 0
+        seen = -1
+        while quiet < 3:
+            await asyncio.sleep(0)
+            landed = sum(len(ws.arrivals) for ws in self.sockets.values())
+            quiet = quiet + 1 if landed == seen else 0
+            seen = landed
+
+    async def action(self, name: str, player: Optional[str] = None, **params) -> Optional[dict]:
+        """Run one action and record its costs; returns the result, or None on an error status."""
+        for ws in self.sockets.values():
+            ws.arrivals.clear()
+        self.probe.reset()
+        frames: List = []
+        t0 = time.perf_counter()
+        if self.transport == "ws" and player in self.sockets:
+            ws = self.sockets[player]
+            self.ids += 1
+            params.pop("room_id", None)
+            await ws.send(json.dumps({"id": self.ids, "cmd": name, "args": params}))
+            while True:
+                frame = await ws.recv()
+                frames.append(frame)
+                reply = json.loads(frame)
+                if reply.get("type") == "reply" and reply.get("id") == self.ids:
+                    break
+            total = time.perf_counter() - t0
+            result = reply.get("result") if reply.get("ok") else None
+        else:
+            if player is not None:
+                params["player"] = player
+            r = await self.server.client.post("/rooms/" + name, params=params)
+            total = time.perf_counter() - t0
+            result = r.json() if r.status_code == 200 else None
+        await self._settle()
+        arrivals = [t for ws in self.sockets.values() for t in ws.arrivals]
+        for ws in self.sockets.values():
+            frames.extend(ws.drain())
+        t = self.timings[name]
+        t["total"].append(total)
+        t["framework"].append(total - self.probe.play if self.probe.play else total)
+        t["engine"].append(max(0.0, self.probe.play - self.probe.broadcast))
+        t["broadcast"].append(self.probe.broadcast)
+        t["delivery"].append(max(arrivals) - t0 if arrivals else 0.0)
+        self.frames[name] += len(frames)
+        self.bytes[name] += sum(len(f.encode() if isinstance(f, str) else f) for f in frames)
+        return result
+
+    async def game(self, n: int, seats: int, seed: int):
+        players = ["bench-g%d-s%d" % (n, i) for i in range(seats)]
+        created = await self.action("create_room", player=players[0], max_players=seats)
+        rid = created["room_id"]
+        tokens = {players[0]: created["token"]}
+        for p in players[1:]:
+            tokens[p] = (await self.action("join_room", room_id=rid, player=p))["token"]
+        for p in players:
+            self.sockets[p] = await self.server.websocket(
+                "/rooms/ws/%d?player=%s&seat_token=%s" % (rid, p, tokens[p]), record=True)
+        await self._settle()
+        for ws in self.sockets.values():
+            ws.drain()
+        random.seed(seed + n)  # Room.init_deck shuffles with the module RNG
+        current = (await self.action("start_game", room_id=rid))["current_player"]
+        while True:
+            drawn = await self.action("draw_tile", current, room_id=rid)
+            if drawn is None or drawn.get("win"):
+                break
+            discarded = await self.action("discard_tile", current, room_id=rid, tile=drawn["tile"])
+            for p in players:
+                if p != current:
+                    await self.action("pass_claim", p, room_id=rid)
+            current = discarded["next_player"]
+        for ws in self.sockets.values():
+            await ws.close()
+        self.sockets = {}
+
+async def run(games: int, seats: int, seed: int, transport: str) -> Bench:
+    async with InProcessApp() as server:
+        # after startup, which sizes the pool from the settings
+        workers = native.NATIVE_WORKERS
+        native.configure_pool(0)
+        bench = Bench(server, transport)
+        bench.probe.install()
+        try:
+            for n in range(games):
+                await bench.game(n, seats, seed)
+        finally:
+            bench.probe.uninstall()
+            native.configure_pool(workers)
+    return bench
+
+def report(bench: Bench):
+    print("%-13s %-10s %7s %10s %10s %10s" % ("action", "phase", "n", "mean us", "p50 us", "p99 us"))
+    for name, phases in bench.timings.items():
+        for phase in PHASES:
+            values = sorted(phases[phase])
+            print("%-13s %-10s %7d %10.1f %10.1f %10.1f" % (name, phase, len(values),
+                                                           1e6 * sum(values) / len(values),
+                                                           _pct(values, 0.50), _pct(values, 0.99)))
+    print()
+    print("%-13s %8s %14s %14s" % ("action", "actions", "frames/action", "bytes/action"))
+    for name, phases in bench.timings.items():
+        n = len(phases["total"])
+        print("%-13s %8d %14.2f %14.1f" % (name, n, bench.frames[name] / n, bench.bytes[name] / n))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--seats", type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--transport", choices=("http", "ws"), default="http")
+    args = parser.parse_args()
+    report(asyncio.run(run(args.games, args.seats, args.seed, args.transport)))
+
+if __name__ == "__main__":
+    main()
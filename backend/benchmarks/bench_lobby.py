@@ -0,0 +1,52 @@
+"""Lobby page cost: RoomIndex.page vs walking every room.
+
+"scan" is what a lobby without indexes has to do: filter all rooms by
+status/open seats, sort by id and slice out the page. "index" is
+RoomIndex.page over the maintained sorted id lists and cached summaries.
+
+Run from backend/:  python -m benchmarks.bench_lobby [--rooms N]
+"""
+import argparse
+import random
+import timeit
+
+from models.room import Room
+from services.lobby import RoomIndex
+
+def build(n: int):
+    rng = random.Random(5)
+    rooms = {}
+    index = RoomIndex()
+    for rid in range(1, n + 1):
+        room = Room(rid, ["p%d" % rid], max_players=4)
+        for k in range(rng.randint(0, 3)):
+            room.add_player("p%d-%d" % (rid, k))
+        if len(room.players) > 1 and rng.random() < 0.6:
+            room.status = "playing"
+        rooms[rid] = room
+        index.update(room)
+    return rooms, index
+
+def scan_page(rooms, after: int, limit: int):
+    ids = sorted(rid for rid, r in rooms.items()
+                 if r.status == "waiting" and len(r.players) < r.max_players and rid > after)
+    return [{"room_id": rid, "status": rooms[rid].status, "players": list(rooms[rid].players),
+             "max_players": rooms[rid].max_players,
+             "open_seats": rooms[rid].max_players - len(rooms[rid].players)} for rid in ids[:limit]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    rooms, index = build(args.rooms)
+    after = args.rooms // 2
+    assert scan_page(rooms, after, args.limit) == index.page(open_only=True, after=after, limit=args.limit)[0]
+    for label, fn in (("scan", lambda: scan_page(rooms, after, args.limit)),
+                      ("index", lambda: index.page(open_only=True, after=after, limit=args.limit))):
+        number = 5 if label == "scan" else 2000
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print("%-6s %8d rooms  %10.1f us/page" % (label, args.rooms, per_call * 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Time-to-table for a burst of queued players.
+
+In-process against the rooms router (no server needed): N players enqueue
+at once and the matchmaking task seats them, reporting the drain time and
+p50/p99 time from enqueue to seated. For comparison the same tables are
+built one at a time through create_room -> join_room -> start_game, the
+path a client-side lobby would take.
+
+Run from backend/:  python -m benchmarks.bench_matchmaking [--players N] [--size 4] [--batch 256]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from routers import room
+from services import native
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+async def bench_sequential(players: int, size: int):
+    t0 = time.perf_counter()
+    for n in range(players // size):
+        seats = ["seq%d-%d" % (n, i) for i in range(size)]
+        rid = (await room.create_room(player=seats[0], max_players=size))["room_id"]
+        for p in seats[1:]:
+            await room.join_room(room_id=rid, player=p)
+        await room.start_game(room_id=rid)
+    return time.perf_counter() - t0
+
+async def bench_matchmaking(players: int, size: int, batch: int):
+    room.start_matchmaking(interval=0, batch=batch)
+    t0 = time.perf_counter()
+    tickets = []
+    for n in range(players):
+        player = "mm%d" % n
+        await room.matchmaking_enqueue(player=player, max_players=size)
+        tickets.append(room.matchmaker.tickets[player])
+    enqueued = time.perf_counter() - t0
+    while any(t.status != "matched" for t in tickets[-size:]) or room.matchmaker.ready():
+        await asyncio.sleep(0.001)
+    drained = time.perf_counter() - t0
+    room.stop_matchmaking()
+    waits = sorted(t.matched_at - t.queued_at for t in tickets if t.status == "matched")
+    return enqueued, drained, waits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    loop = asyncio.get_event_loop()
+    room.set_event_loop(loop)
+    native.configure_pool(0)
+    tables = args.players // args.size
+    seq = loop.run_until_complete(bench_sequential(args.players, args.size))
+    print("sequential create/join/start: %d tables in %.3fs (%.0f tables/s)" % (tables, seq, tables / seq))
+    enqueued, drained, waits = loop.run_until_complete(bench_matchmaking(args.players, args.size, args.batch))
+    print("matchmaking: %d players enqueued in %.3fs, all %d tables seated after %.3fs (%.0f tables/s)"
+          % (args.players, enqueued, len(waits) // args.size, drained, tables / drained))
+    print("time-to-table p50 %.1f ms  p99 %.1f ms" % (_pct(waits, 0.50), _pct(waits, 0.99)))
+
+if __name__ == "__main__":
+    main()
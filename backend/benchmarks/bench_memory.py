@@ -0,0 +1,203 @@
+"""Memory per room at each game phase, measured with tracemalloc.
+
+Drives app.app in process (benchmarks/inprocess.py, native work inline)
+through --rooms rooms of --seats players, one phase at a time for all rooms:
+
+  created    create_room
+  seated     every seat joined
+  connected  a seat-bound websocket per player
+  dealt      start_game
+  midgame    --turns turns each (draw, discard, everyone passes)
+  finished   played to a win or an empty wall
+  closed     sockets closed; what a finished room keeps, since rooms are
+             never evicted
+
+Websocket idle closes and bot takeover are turned off for the run, so the
+sockets stay open until the closed phase and no seat changes hands.
+
+After each phase it collects garbage and reports traced bytes per room over
+the baseline (taken after one warm-up game, so import-time and first-use
+caches are left out). It also reports the estimate the /rooms/admin/memory
+endpoint computes for the same rooms (routers.room.room_footprint) and the
+estimate's largest components. From connected to finished the traced figure
+also covers the per-connection ASGI tasks and this process's in-process
+client sockets, which the estimate does not see. --sites lists the source
+lines that allocated the most in each phase.
+
+Run from backend/:  python -m benchmarks.bench_memory [--rooms 200] [--sites 5]
+"""
+import argparse
+import asyncio
+import gc
+import random
+import tracemalloc
+from typing import Dict, List
+
+from benchmarks.inprocess import InProcessApp
+from routers import room
+from services import native
+
+PHASES = ("created", "seated", "connected", "dealt", "midgame", "finished", "closed")
+
+class Tables:
+    def __init__(self, server: InProcessApp, seats: int, prefix: str):
+        self.server = server
+        self.seats = seats
+        self.prefix = prefix
+        self.rooms: List[int] = []
+        self.players: Dict[int, List[str]] = {}
+        self.tokens: Dict[str, str] = {}
+        self.sockets: list = []
+        self.current: Dict[int, str] = {}
+        self.done: Dict[int, bool] = {}
+
+    async def post(self, endpoint: str, **params) -> dict:
+        r = await self.server.client.post("/rooms/" + endpoint, params=params)
+        return r.json() if r.status_code == 200 else {}
+
+    async def created(self, n: int):
+        for i in range(n):
+            host = "%s-r%d-s0" % (self.prefix, i)
+            body = await self.post("create_room", player=host, max_players=self.seats)
+            self.rooms.append(body["room_id"])
+            self.players[body["room_id"]] = [host]
+            self.tokens[host] = body["token"]
+
+    async def seated(self):
+        for rid in self.rooms:
+            for s in range(1, self.seats):
+                p = self.players[rid][0][:-1] + str(s)
+                self.tokens[p] = (await self.post("join_room", room_id=rid, player=p))["token"]
+                self.players[rid].append(p)
+
+    async def connected(self):
+        for rid in self.rooms:
+            for p in self.players[rid]:
+                self.sockets.append(await self.server.websocket(
+                    "/rooms/ws/%d?player=%s&seat_token=%s" % (rid, p, self.tokens[p])))
+
+    async def dealt(self):
+        for rid in self.rooms:
+            self.current[rid] = (await self.post("start_game", room_id=rid))["current_player"]
+            self.done[rid] = False
+
+    async def turn(self, rid: int):
+        player = self.current[rid]
+        drawn = await self.post("draw_tile", room_id=rid, player=player)
+        if not drawn or drawn.get("win"):
+            self.done[rid] = True
+            return
+        discarded = await self.post("discard_tile", room_id=rid, player=player, tile=drawn["tile"])
+        for p in self.players[rid]:
+            if p != player:
+                await self.post("pass_claim", room_id=rid, player=p)
+        self.current[rid] = discarded["next_player"]
+
+    async def midgame(self, turns: int):
+        for rid in self.rooms:
+            for _ in range(turns):
+                if not self.done[rid]:
+                    await self.turn(rid)
+
+    async def finished(self):
+        for rid in self.rooms:
+            while not self.done[rid]:
+                await self.turn(rid)
+
+    async def closed(self):
+        for ws in self.sockets:
+            await ws.close()
+        self.sockets = []
+
+    def drain(self):
+        for ws in self.sockets:
+            ws.drain()
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def estimate(rids: List[int]) -> Dict[str, int]:
+    seen: set = set()
+    totals: Dict[str, int] = {}
+    for rid in rids:
+        for name, value in room.room_footprint(rid, seen).items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+async def run(rooms: int, seats: int, turns: int, seed: int, sites: int) -> List[dict]:
+    random.seed(seed)
+    tracemalloc.start(1)
+    results = []
+    async with InProcessApp() as server:
+        saved = (native.NATIVE_WORKERS, room.WS_PING_INTERVAL, room.WS_IDLE_TIMEOUT, room.BOT_TAKEOVER_DELAY)
+        native.configure_pool(0)
+        # phases outlast the idle timeout under tracemalloc; an idle close would
+        # drop the sockets early and hand the seats to takeover bots
+        room.configure_ws_idle(ping_interval=86400, idle_timeout=86400)
+        room.configure_bots(takeover_delay=-1)
+        try:
+            warm = Tables(server, seats, "memwarm%06x" % random.getrandbits(24))
+            await warm.created(1)
+            await warm.seated()
+            await warm.connected()
+            await warm.dealt()
+            await warm.finished()
+            await warm.closed()
+            tables = Tables(server, seats, "mem%06x" % random.getrandbits(24))
+            await _settle()
+            gc.collect()
+            base = tracemalloc.get_traced_memory()[0]
+            snapshot = tracemalloc.take_snapshot() if sites else None
+            for phase in PHASES:
+                if phase == "created":
+                    await tables.created(rooms)
+                elif phase == "midgame":
+                    await tables.midgame(turns)
+                else:
+                    await getattr(tables, phase)()
+                await _settle()
+                tables.drain()
+                gc.collect()
+                traced = tracemalloc.get_traced_memory()[0] - base
+                parts = estimate(tables.rooms)
+                row = {"phase": phase, "traced": traced / rooms, "estimate": sum(parts.values()) / rooms,
+                       "components": {k: v / rooms for k, v in parts.items()}}
+                if sites:
+                    current = tracemalloc.take_snapshot()
+                    row["sites"] = [(str(d.traceback), d.size_diff)
+                                    for d in current.compare_to(snapshot, "lineno")[:sites]]
+                    snapshot = current
+                results.append(row)
+        finally:
+            native.configure_pool(saved[0])
+            room.configure_ws_idle(ping_interval=saved[1], idle_timeout=saved[2])
+            room.configure_bots(takeover_delay=saved[3])
+    tracemalloc.stop()
+    return results
+
+def report(results: List[dict]):
+    print("%-10s %14s %14s   %s" % ("phase", "traced B/room", "estimate B/room", "largest estimated components"))
+    for row in results:
+        top = sorted(row["components"].items(), key=lambda kv: -kv[1])[:4]
+        print("%-10s %14.0f %14.0f   %s" % (row["phase"], row["traced"], row["estimate"],
+                                           ", ".join("%s %.0f" % kv for kv in top)))
+    if results and "sites" in results[0]:
+        for row in results:
+            print()
+            print("%s: allocated most (bytes over the previous phase, all rooms)" % row["phase"])
+            for site, size in row["sites"]:
+                print("  %10d  %s" % (size, site))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--seats", type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument("--turns", type=int, default=10, help="turns per room in the midgame phase")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sites", type=int, default=0, help="top allocating source lines per phase")
+    args = parser.parse_args()
+    report(asyncio.run(run(args.rooms, args.seats, args.turns, args.seed, args.sites)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Native engine microbenchmarks with regression baselines.
+
+Times every mahjong_core entry point (is_win, is_win_batch, shanten,
+discard_table) on three hand sets:
+
+  random      hands dealt from a shuffled wall
+  worst       hands that make each function do the most work: non-winning
+              all-pairs hands for is_win (every tile is a pair candidate
+              and each one scans all 39 counts) and dense single-suit hands
+              for shanten and discard_table (the deepest decompositions)
+  exhaustive  every single-suit hand of the size (counts 0-4 of tiles 1-9):
+              118,800 14-tile and 93,600 13-tile hands; discard_table takes
+              every --stride'th of them
+
+The same inputs go through the pure-Python port (services/pycore.py) for
+up to --budget seconds per case. Its results must match the native ones
+exactly, or the run fails.
+
+Throughput is ops/s, best of --repeat passes. --save writes the results to
+benchmarks/baselines/native.json. Otherwise the run is checked against that
+file and exits 1 if any native case is more than --threshold slower than its
+baseline. Baselines depend on the machine, so record them on the box that
+runs the check. Needs only the built extension; no network or server.
+
+Run from backend/:  python -m benchmarks.bench_native [--save] [--threshold 0.25] [--quick]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from services import native, pycore
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "native.json")
+WALL = [t for t in range(1, 35) for _ in range(4)]
+
+def random_hands(n: int, size: int, seed: int) -> List[List[int]]:
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(n):
+        hands.append(rng.sample(WALL, size))
+    return hands
+
+def all_pairs_hands(n: int, seed: int) -> List[List[int]]:
+    """Seven distinct pairs that don't win: is_win tries every pair."""
+    rng = random.Random(seed)
+    hands = []
+    while len(hands) < n:
+        hand = [t for t in rng.sample(range(1, 35), 7) for _ in range(2)]
+        if not pycore.is_win(hand):
+            hands.append(hand)
+    return hands
+
+def dense_hands(n: int, size: int, seed: int) -> List[List[int]]:
+    """Single-suit hands packed into a few ranks."""
+    rng = random.Random(seed)
+    hands = []
+    while len(hands) < n:
+        lo = rng.randint(1, 4)
+        hand = sorted(rng.randint(lo, lo + 5) for _ in range(size))
+        if all(hand.count(t) <= 4 for t in hand):
+            hands.append(hand)
+    return hands
+
+def single_suit_hands(size: int) -> List[List[int]]:
+    """Every hand of `size` tiles from 1-9 with at most four of each."""
+    out = []
+    counts = [0] * 9
+
+    def fill(i: int, left: int):
+        if i == 8:
+            if left <= 4:
+                counts[8] = left
+                out.append([t + 1 for t in range(9) for _ in range(counts[t])])
+            return
+        for c in range(min(4, left) + 1):
+            counts[i] = c
+            fill(i + 1, left - c)
+        counts[i] = 0
+    fill(0, size)
+    return out
+
+def packed(hands: List[List[int]]) -> List[bytes]:
+    return [bytes(t for h in hands for t in h)]
+
+def time_native(fn: Callable, inputs: list, repeat: int) -> Tuple[float, list]:
+    """Best-of-`repeat` ops/s over all `inputs`, and the results of the last pass."""
+    best = None
+    results = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [fn(x) for x in inputs]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return len(inputs) / max(best, 1e-9), results
+
+def time_fallback(fn: Callable, inputs: list, budget: float) -> Tuple[float, list]:
+    """ops/s of one pass over as many inputs as fit in `budget` seconds, and their results."""
+    results = []
+    t0 = time.perf_counter()
+    for x in inputs:
+        results.append(fn(x))
+        if time.perf_counter() - t0 > budget:
+            break
+    return len(results) / max(time.perf_counter() - t0, 1e-9), results
+
+def normalize(name: str, result):
+    if name == "discard_table":
+        return sorted(tuple(row) for row in result)
+    if name == "is_win":
+        return bool(result)
+    return result
+
+def cases(quick: bool, stride: int) -> List[Tuple[str, str, list]]:
+    """(function, hand set, inputs); batch inputs are packed, ops are hands."""
+    n = 2000 if quick else 20000
+    ex14 = single_suit_hands(14)
+    ex13 = single_suit_hands(13)
+    if quick:
+        ex14, ex13 = ex14[::20], ex13[::20]
+    out = []
+    for label, hands in (("random", random_hands(n, 14, 1)), ("worst", all_pairs_hands(n, 2)),
+                         ("exhaustive", ex14)):
+        out.append(("is_win", label, hands))
+        out.append(("is_win_batch", label, hands))
+    for label, hands in (("random", random_hands(n, 13, 3)), ("worst", dense_hands(n, 13, 4)),
+                         ("exhaustive", ex13)):
+        out.append(("shanten", label, hands))
+    tables = max(1, n // 10)
+    for label, hands in (("random", random_hands(tables, 14, 5)), ("worst", dense_hands(tables, 14, 6)),
+                         ("exhaustive", ex14[::stride])):
+        out.append(("discard_table", label, hands))
+    return out
+
+def run(mc, repeat: int, budget: float, quick: bool, stride: int) -> Tuple[Dict[str, float], List[str]]:
+    results: Dict[str, float] = {}
+    mismatches = []
+    print("%-14s %-11s %8s %14s %14s %9s" % ("function", "hands", "n", "native ops/s", "python ops/s", "speedup"))
+    for name, label, hands in cases(quick, stride):
+        if name == "is_win_batch":
+            # one call per pass; ops are the hands it checks
+            inputs = packed(hands)
+            native_rate, native_out = time_native(getattr(mc, name), inputs, repeat)
+            native_rate *= len(hands)
+            py_hands = hands[:2000]
+            py_rate, py_out = time_fallback(pycore.is_win_batch, packed(py_hands), budget)
+            py_rate *= len(py_hands)
+            native_out = [native_out[0][:len(py_hands)]]
+        else:
+            native_rate, native_out = time_native(getattr(mc, name), hands, repeat)
+            py_rate, py_out = time_fallback(getattr(pycore, name), hands, budget)
+        for i, got in enumerate(py_out):
+            if normalize(name, native_out[i]) != normalize(name, got):
+                mismatches.append("%s %s: %r native=%r python=%r"
+                                  % (name, label, hands[i] if name != "is_win_batch" else "batch",
+                                     native_out[i], got))
+                break
+        results["native.%s.%s" % (name, label)] = round(native_rate, 1)
+        results["python.%s.%s" % (name, label)] = round(py_rate, 1)
+        print("%-14s %-11s %8d %14.0f %14.1f %8.1fx"
+              % (name, label, len(hands), native_rate, py_rate, native_rate / max(py_rate, 1e-9)))
+    return results, mismatches
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+def compare(results: Dict[str, float], baseline: dict, threshold: float) -> List[str]:
+    """Native cases slower than baseline * (1 - threshold)."""
+    slower = []
+    for key, base in sorted(baseline.get("results", {}).items()):
+        if not key.startswith("native.") or key not in results:
+            continue
+        if results[key] < base * (1 - threshold):
+            slower.append("%s: %.0f ops/s vs baseline %.0f (%.0f%%)"
+                          % (key, results[key], base, 100.0 * (results[key] / base - 1)))
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per case for the Python port")
+    parser.add_argument("--stride", type=int, default=50, help="exhaustive discard_table takes every Nth hand")
+    parser.add_argument("--quick", action="store_true", help="smaller hand sets, for a smoke run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+    mc = native.load()
+    if native.info()["backend"] != "native" or not all(hasattr(mc, f) for f in ("is_win", "is_win_batch", "shanten", "discard_table")):
+        sys.exit("mahjong_core with is_win, is_win_batch, shanten and discard_table is not built")
+    results, mismatches = run(mc, args.repeat, args.budget, args.quick, args.stride)
+    if mismatches:
+        print("native and Python results differ:")
+        for line in mismatches:
+            print("  " + line)
+        sys.exit(1)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": machine(), "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("baseline written to %s" % args.baseline)
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline at %s (run with --save to record one)" % args.baseline)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != machine():
+        print("note: baseline recorded on %s" % baseline.get("machine"))
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print("regressions beyond %.0f%%:" % (100 * args.threshold))
+        for line in slower:
+            print("  " + line)
+        sys.exit(1)
+    print("no regressions beyond %.0f%% of %s" % (100 * args.threshold, args.baseline))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Per-endpoint response serialization cost: FastAPI default vs FastJSONResponse.
+
+"default" is what the router did before: jsonable_encoder over the returned
+dict, then JSONResponse (stdlib json). "fast" is FastJSONResponse with the
+active backend (orjson if installed), "fast-stdlib" forces the json fallback.
+
+Run from backend/:  python -m benchmarks.bench_responses [--number N]
+"""
+import argparse
+import random
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services import responses
+from services.responses import FastJSONResponse
+
+PLAYERS = ["Alice", "Bob", "Carol", "Dave"]
+
+def payloads():
+    rng = random.Random(7)
+    hand = lambda n: sorted(rng.randint(1, 39) for _ in range(n))
+    discards = [[PLAYERS[i % 4], rng.randint(1, 39)] for i in range(100)]
+    return {
+        "create_room": {"room_id": 1042, "players": ["Alice"], "max_players": 4, "token": "x" * 22},
+        "start_game": {"hands": {p: hand(13) for p in PLAYERS}, "deck_count": 84, "status": "playing",
+                       "current_player": "Alice"},
+        "game_state": {"deck_count": 20, "current_player": "Carol", "status": "playing", "discards": discards,
+                       "seq": 812, "hands": {"Alice": hand(13), "Bob": "13 tiles", "Carol": "13 tiles",
+                                             "Dave": "13 tiles"}},
+        "draw_tile": {"tile": 23, "hand": hand(14), "must_discard": True, "current_player": "Alice"},
+        "discard_tile": {"hand": hand(13), "next_player": "Bob", "deck_count": 60},
+        "claim": {"claimed": "peng", "player": "Bob", "melds": [{"type": "peng", "tiles": [7, 7, 7]}]},
+        "pass_claim": {"passed": True, "resolved": "waiting_other_passes"},
+    }
+
+def default_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+def fast_path(content):
+    return FastJSONResponse(content).body
+
+def fast_stdlib_path(content):
+    saved = responses.orjson
+    responses.orjson = None
+    try:
+        return FastJSONResponse(content).body
+    finally:
+        responses.orjson = saved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    print("fast backend: %s" % responses.BACKEND)
+    print("%-14s %7s %12s %12s %14s" % ("endpoint", "bytes", "default us", "fast us", "fast-stdlib us"))
+    for name, content in payloads().items():
+        row = []
+        for fn in (default_path, fast_path, fast_stdlib_path):
+            t = min(timeit.repeat(lambda: fn(content), number=args.number, repeat=3))
+            row.append(t / args.number * 1e6)
+        print("%-14s %7d %12.2f %12.2f %14.2f" % (name, len(fast_path(content)), row[0], row[1], row[2]))
+
+if __name__ == "__main__":
+    main()
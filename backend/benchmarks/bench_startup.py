@@ -0,0 +1,95 @@
+"""Startup cost of resolving the engine and importing the app.
+
+Each run is a fresh interpreter started from backend/. It reports the median
+and min wall time of the child, and of the loader's own time as reported by
+services.native.info(), for these cases:
+
+  scan        native.load() with the path cache off: import, then probe the
+              build dirs
+  cache       native.load() with a warm path cache (a temporary file, so the
+              one under mahjong_core/ is left alone)
+  app         `import app` and then resolve the engine, as at server startup,
+              with a warm cache
+
+It also times a resolved native.load() in this process, the lookup callers
+outside the router pay (the router's hot paths hold direct references).
+
+Run from backend/:  python -m benchmarks.bench_startup [--runs 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Dict, List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, time
+t0 = time.perf_counter()
+%s
+from services import native
+native.load()
+print(json.dumps(dict(native.info(), wall=time.perf_counter() - t0)))
+"""
+
+CASES = {
+    "scan": ("", False),
+    "cache": ("", True),
+    "app": ("import app", True),
+}
+
+def child(setup: str, cache: str) -> dict:
+    env = dict(os.environ, MJ_NATIVE_CACHE=cache)
+    out = subprocess.run([sys.executable, "-c", _CHILD % setup], cwd=BACKEND, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    return json.loads(out.stdout.decode().strip().splitlines()[-1])
+
+def run(runs: int) -> Dict[str, dict]:
+    tmp = tempfile.mkdtemp(prefix="bench-startup-")
+    cache = os.path.join(tmp, "resolved.json")
+    results = {}
+    try:
+        child("", cache)  # fill the cache (and the OS page cache) once
+        for name, (setup, warm) in CASES.items():
+            samples: List[dict] = [child(setup, cache if warm else "") for _ in range(runs)]
+            results[name] = {
+                "backend": samples[-1]["backend"], "source": samples[-1]["source"],
+                "wall": [s["wall"] for s in samples], "load": [s["seconds"] for s in samples],
+            }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+def lookup_ns(calls: int = 200000) -> float:
+    from services import native
+    native.load()
+    return min(timeit.repeat(native.load, number=calls, repeat=5)) / calls * 1e9
+
+def report(results: Dict[str, dict], lookup: float):
+    print("%-6s %-7s %-8s %12s %12s %12s %12s" % ("case", "backend", "source", "wall p50 ms", "wall min ms",
+                                                  "load p50 ms", "load min ms"))
+    for name, r in results.items():
+        print("%-6s %-7s %-8s %12.1f %12.1f %12.2f %12.2f" % (
+            name, r["backend"], r["source"], statistics.median(r["wall"]) * 1e3, min(r["wall"]) * 1e3,
+            statistics.median(r["load"]) * 1e3, min(r["load"]) * 1e3))
+    print()
+    print("resolved lookup (native.load): %.0f ns/call" % lookup)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per case")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    results = run(args.runs)
+    report(results, lookup_ns())
+    print("(%.1f s)" % (time.perf_counter() - t0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""In-process ASGI driver for app.app: HTTP and websockets without sockets.
+
+InProcessApp runs the app's lifespan (the startup hooks, so the broadcast
+loop, native pool and background tasks are set up as under uvicorn) on the
+caller's event loop. It exposes:
+
+  client          an httpx.AsyncClient over httpx.ASGITransport
+  websocket(path) a client websocket speaking ASGI straight to the app
+
+Requests and frames never touch the network or another thread, so tests
+and benchmarks measure handler, serialization and broadcast cost alone and
+need no running server:
+
+    async with InProcessApp() as server:
+        r = await server.client.post("/rooms/create_room", params={"player": "A"})
+        ws = await server.websocket("/rooms/ws/1?player=A&seat_token=" + r.json()["token"])
+        event = json.loads(await ws.recv())
+
+The websocket keeps the small client API the load tools use from the
+websockets package (send, recv, async iteration, close), so one driver runs
+against either. Each received frame's perf_counter arrival time is kept in
+`ws.arrivals` (when `record` is set) for delivery timings.
+"""
+import asyncio
+import time
+from typing import List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+class ConnectionClosed(Exception):
+    """The app closed the websocket (or refused it); `code` is the close code."""
+
+    def __init__(self, code: int, reason: str = ""):
+        super().__init__("websocket closed with code %d %s" % (code, reason))
+        self.code = code
+        self.reason = reason
+
+_CLOSED = {"type": "websocket.close", "code": 1006}
+
+class InProcessWebSocket:
+    def __init__(self, app, path: str, subprotocols: Sequence[str] = (), headers: Sequence[Tuple[str, str]] = (),
+                 record: bool = False, registry: Optional[Set["InProcessWebSocket"]] = None):
+        url = urlsplit(path)
+        self.app = app
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": url.path, "raw_path": url.path.encode(), "root_path": "",
+            "query_string": url.query.encode(), "subprotocols": list(subprotocols),
+            "headers": [(b"host", b"testserver")] + [(k.lower().encode(), v.encode()) for k, v in headers],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        self.subprotocol: Optional[str] = None
+        self.close_code: Optional[int] = None
+        self.arrivals: Optional[List[float]] = [] if record else None
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Future] = None
+        # the owning InProcessApp's open sockets, closed on its exit
+        self._registry = registry
+
+    async def _send_from_app(self, message: dict):
+        if self.arrivals is not None and message["type"] == "websocket.send":
+            self.arrivals.append(time.perf_counter())
+        self._from_app.put_nowait(message)
+
+    async def _serve(self):
+        try:
+            await self.app(self.scope, self._to_app.get, self._send_from_app)
+        finally:
+            self._from_app.put_nowait(_CLOSED)
+            if self._registry is not None:
+                self._registry.discard(self)
+
+    async def open(self):
+        if self._registry is not None:
+            self._registry.add(self)
+        self._to_app.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.ensure_future(self._serve())
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            self.close_code = message.get("code", 1006)
+            raise ConnectionClosed(self.close_code, message.get("reason", ""))
+        self.subprotocol = message.get("subprotocol")
+        return self
+
+    async def send(self, data):
+        if self.close_code is not None:
+            raise ConnectionClosed(self.close_code)
+        if isinstance(data, bytes):
+            self._to_app.put_nowait({"type": "websocket.receive", "bytes": data})
+        else:
+            self._to_app.put_nowait({"type": "websocket.receive", "text": data})
+
+    async def recv(self):
+        """The next frame: str for text, bytes for binary."""
+        if self.close_code is not None:
+            raise ConnectionClosed(self.close_code)
+        message = await self._from_app.get()
+        if message["type"] == "websocket.send":
+            text = message.get("text")
+            return text if text is not None else message.get("bytes")
+        self.close_code = message.get("code", 1000)
+        raise ConnectionClosed(self.close_code, message.get("reason", ""))
+
+    def drain(self) -> list:
+        """Frames already delivered, without waiting (a close is left queued)."""
+        frames = []
+        while not self._from_app.empty():
+            message = self._from_app.get_nowait()
+            if message["type"] != "websocket.send":
+                self._from_app.put_nowait(message)
+                break
+            text = message.get("text")
+            frames.append(text if text is not None else message.get("bytes"))
+        return frames
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except ConnectionClosed:
+            raise StopAsyncIteration
+
+    async def close(self, code: int = 1000):
+        if self._task is None or self._task.done():
+            return
+        self.close_code = code
+        self._to_app.put_nowait({"type": "websocket.disconnect", "code": code})
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except Exception:
+            self._task.cancel()
+
+class InProcessApp:
+    """Async context manager running `app` (default app.app) in this event loop."""
+
+    def __init__(self, app=None, base_url: str = "http://testserver"):
+        if app is None:
+            from app import app
+        self.app = app
+        self.base_url = base_url
+        self.client: Optional[httpx.AsyncClient] = None
+        self._sockets: Set[InProcessWebSocket] = set()
+        self._lifespan_in: asyncio.Queue = asyncio.Queue()
+        self._lifespan_out: asyncio.Queue = asyncio.Queue()
+        self._lifespan: Optional[asyncio.Future] = None
+
+    async def _lifespan_step(self, event: str):
+        self._lifespan_in.put_nowait({"type": "lifespan." + event})
+        message = await self._lifespan_out.get()
+        if message["type"] != "lifespan.%s.complete" % event:
+            raise RuntimeError("lifespan %s failed: %s" % (event, message.get("message")))
+
+    async def __aenter__(self) -> "InProcessApp":
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan = asyncio.ensure_future(self.app(scope, self._lifespan_in.get, self._lifespan_out.put))
+        await self._lifespan_step("startup")
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url=self.base_url)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(ws.close() for ws in list(self._sockets)))
+        await self.client.aclose()
+        await self._lifespan_step("shutdown")
+        await self._lifespan
+        return False
+
+    async def websocket(self, path: str, subprotocols: Sequence[str] = (),
+                        headers: Sequence[Tuple[str, str]] = (), record: bool = False) -> InProcessWebSocket:
+        """Open a websocket to `path` (with its query string); raises ConnectionClosed if refused."""
+        return await InProcessWebSocket(self.app, path, subprotocols, headers, record, self._sockets).open()
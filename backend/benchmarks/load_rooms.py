@@ -0,0 +1,80 @@
+"""Concurrent-table load test for the rooms router.
+
+Each virtual table creates a two-seat room and plays draw -> discard -> pass
+turns against a running server until the time budget ends, starting a new
+room whenever a game finishes. For each concurrency level it reports request
+throughput and latency percentiles, so two server builds can be compared at
+the same p99 (e.g. how many tables fit before p99 crosses a budget).
+
+Needs httpx. Start the server first, then from backend/:
+
+    python -m benchmarks.load_rooms --levels 16,64,256 --seconds 10
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+PREFIX = "/rooms"
+
+async def _post(client: httpx.AsyncClient, path: str, latencies: List[float], **params):
+    t0 = time.perf_counter()
+    r = await client.post(PREFIX + path, params=params)
+    latencies.append(time.perf_counter() - t0)
+    return r
+
+async def _table(client: httpx.AsyncClient, n: int, deadline: float, latencies: List[float], errors: List[int]):
+    while time.perf_counter() < deadline:
+        seats = ["t%d-a" % n, "t%d-b" % n]
+        r = await _post(client, "/create_room", latencies, player=seats[0], max_players=2)
+        room_id = r.json()["room_id"]
+        await _post(client, "/join_room", latencies, room_id=room_id, player=seats[1])
+        r = await _post(client, "/start_game", latencies, room_id=room_id)
+        current = r.json()["current_player"]
+        while time.perf_counter() < deadline:
+            r = await _post(client, "/draw_tile", latencies, room_id=room_id, player=current)
+            if r.status_code != 200:
+                break  # deck exhausted
+            body = r.json()
+            if body.get("win"):
+                break
+            r = await _post(client, "/discard_tile", latencies, room_id=room_id, player=current, tile=body["tile"])
+            if r.status_code != 200:
+                errors[0] += 1
+                break
+            other = seats[1] if current == seats[0] else seats[0]
+            await _post(client, "/pass_claim", latencies, room_id=room_id, player=other)
+            current = other
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+async def run_level(base: str, tables: int, seconds: float) -> dict:
+    latencies: List[float] = []
+    errors = [0]
+    limits = httpx.Limits(max_connections=tables, max_keepalive_connections=tables)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+        started = time.perf_counter()
+        await asyncio.gather(*[_table(client, n, deadline, latencies, errors) for n in range(tables)])
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"tables": tables, "requests": len(latencies), "rps": len(latencies) / elapsed,
+            "p50_ms": _pct(latencies, 0.50), "p99_ms": _pct(latencies, 0.99), "errors": errors[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--levels", default="16,64,256", help="comma separated table counts")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+    print("%8s %10s %10s %10s %10s %7s" % ("tables", "requests", "req/s", "p50 ms", "p99 ms", "errors"))
+    for tables in (int(x) for x in args.levels.split(",")):
+        res = asyncio.get_event_loop().run_until_complete(run_level(args.base, tables, args.seconds))
+        print("%8d %10d %10.0f %10.2f %10.2f %7d" % (res["tables"], res["requests"], res["rps"],
+                                                      res["p50_ms"], res["p99_ms"], res["errors"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""Asyncio load generator: N tables of M seat clients playing full games.
+
+Every table creates a room, seats M clients and plays it to the end (a win,
+a won claim or an exhausted wall), then starts the next game until --games
+or --seconds runs out. Each seat is a client on its own seat-bound
+websocket. It plays from the events it receives, the way a real client
+would:
+
+  start / pending_cleared   the seat whose turn it is draws
+  hand (draw or claim)      the seat discards, or draws after a gang
+  discard                   every other seat claims or passes
+  win / hu                  the game is over
+
+A services.bots policy (--policy) picks the discards and claims, fed the
+wait sets from the server's hand events. Actions go over one pooled
+httpx client (--transport http) or as commands on the seat's websocket
+(--transport ws). --rate caps actions per second per table; 0 plays as
+fast as the server answers. --ramp spreads table starts so thousands of
+tables don't connect at once.
+
+The report gives:
+
+  per endpoint   requests, errors and p50/p95/p99/max latency
+  event lag      time from sending the action that caused an event to
+                 receiving it, per event type and seat
+  games          outcomes, stalls (--game-timeout) and disconnects
+  client loop    how late a 10 ms timer fires on this process's loop; if it
+                 is high the client, not the server, was the bottleneck
+
+A claim or pass that lands after another seat's claim already resolved the
+discard, and the draw that finds the wall empty, get a 400. Those are
+counted as expected, not as errors.
+--out writes the summary as JSON. With --max-error-rate the run exits 1 if
+errors exceed that fraction of requests.
+
+Needs httpx and websockets. Start the server first, then from backend/:
+
+    python -m benchmarks.load_tables --tables 500 --seats 4 --games 2 --rate 4
+
+--in-process plays against app.app in this process instead (see
+benchmarks/inprocess.py): no server or sockets, and client and server share
+one event loop, so numbers are per-action server cost, not capacity.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from services import native, pycore
+from services.bots import POLICIES
+
+PREFIX = "/rooms"
+# 400s that are part of normal play: a claim window another seat already
+# closed, and the draw that ends the game on an empty wall
+_EXPECTED = ("No pending discard", "No tiles left")
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+class Stats:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self.expected = collections.Counter()
+        self.lag: Dict[str, List[float]] = collections.defaultdict(list)
+        self.games = collections.Counter()
+        self.loop_lag: List[float] = []
+        self.actions = 0
+
+    def request(self, endpoint: str, seconds: float, status: int, detail: str = ""):
+        self.latency[endpoint].append(seconds)
+        if status >= 400:
+            if status == 400 and detail in _EXPECTED:
+                self.expected[endpoint] += 1
+            else:
+                self.errors[endpoint]["%d %s" % (status, detail)] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        requests = sum(len(v) for v in self.latency.values())
+        errors = sum(sum(c.values()) for c in self.errors.values())
+        endpoints = {}
+        for name, values in sorted(self.latency.items()):
+            values.sort()
+            endpoints[name] = {"requests": len(values), "rps": round(len(values) / elapsed, 1),
+                               "errors": sum(self.errors[name].values()), "expected": self.expected[name],
+                               "p50_ms": _pct(values, 0.50), "p95_ms": _pct(values, 0.95),
+                               "p99_ms": _pct(values, 0.99), "max_ms": values[-1] * 1000}
+        lag = {}
+        for kind, values in sorted(self.lag.items()):
+            values.sort()
+            lag[kind] = {"events": len(values), "p50_ms": _pct(values, 0.50), "p95_ms": _pct(values, 0.95),
+                         "p99_ms": _pct(values, 0.99), "max_ms": values[-1] * 1000}
+        self.loop_lag.sort()
+        return {
+            "seconds": round(elapsed, 2), "requests": requests, "rps": round(requests / elapsed, 1),
+            "actions": self.actions, "actions_per_s": round(self.actions / elapsed, 1),
+            "errors": errors, "error_rate": errors / requests if requests else 0.0,
+            "games": dict(self.games), "endpoints": endpoints, "event_lag": lag,
+            "error_detail": {name: dict(c) for name, c in self.errors.items() if c},
+            "client_loop_lag_p99_ms": _pct(self.loop_lag, 0.99),
+        }
+
+class Table:
+    """One room's game, shared by its seat clients."""
+
+    def __init__(self, ctx, room_id: int, players: List[str]):
+        self.ctx = ctx
+        self.room_id = room_id
+        self.players = players
+        self.seats: List["Seat"] = []
+        # perf_counter of each player's last action, and of the last by anyone
+        self.sent: Dict[str, float] = {}
+        self.last_sent = 0.0
+        self.next_at = 0.0
+        self.outcome: Optional[str] = None
+
+    def stamp(self, player: Optional[str] = None):
+        now = time.perf_counter()
+        if player is None:
+            for p in self.players:
+                self.sent[p] = now
+        else:
+            self.sent[player] = now
+        self.last_sent = now
+
+    async def pace(self):
+        """Wait for this table's next action slot under --rate."""
+        if not self.ctx.interval:
+            return
+        now = time.perf_counter()
+        wait = self.next_at - now
+        self.next_at = max(now, self.next_at) + self.ctx.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def finish(self, outcome: str):
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        self.ctx.stats.games[outcome] += 1
+        for seat in self.seats:
+            seat.inbox.put_nowait(None)
+
+class Seat:
+    """A client playing one seat over its own websocket."""
+
+    def __init__(self, table: Table, player: str, token: str, policy):
+        self.table = table
+        self.player = player
+        self.token = token
+        self.policy = policy
+        self.view = SimpleNamespace(hands={player: []}, current_player=None)
+        self.waits: Optional[List[int]] = None
+        self.next_player: Optional[str] = None
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.replies: Dict[int, asyncio.Future] = {}
+        self.ws = None
+        self.reader: Optional[asyncio.Future] = None
+
+    async def connect(self):
+        ctx = self.table.ctx
+        self.ws = await ctx.connect("%s/ws/%d?player=%s&seat_token=%s" % (PREFIX, self.table.room_id,
+                                                                          self.player, self.token))
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+
+    async def _read(self):
+        table = self.table
+        stats = table.ctx.stats
+        try:
+            async for msg in self.ws:
+                if msg == "ping":
+                    await self.ws.send("pong")
+                    continue
+                now = time.perf_counter()
+                event = json.loads(msg)
+                kind = event.get("type")
+                if kind == "reply":
+                    future = self.replies.pop(event.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(event)
+                    continue
+                # lag is taken here, before the seat acts on anything queued
+                if kind != "hand" or event.get("reason") not in ("connect", "snapshot"):
+                    sent = table.sent.get(event["player"]) if "player" in event else table.last_sent
+                    if sent:
+                        stats.lag[kind].append(now - sent)
+                self.inbox.put_nowait(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        if table.outcome is None:
+            stats.errors["websocket"]["closed"] += 1
+            table.finish("disconnected")
+
+    async def run(self):
+        while True:
+            event = await self.inbox.get()
+            if event is None:
+                return
+            await self.handle(event)
+
+    async def handle(self, event: dict):
+        kind = event.get("type")
+        me = self.player
+        if kind in ("win", "hu"):
+            self.table.finish(kind)
+        elif kind == "start":
+            if event.get("current_player") == me:
+                await self.draw()
+        elif kind == "hand":
+            hand = event.get("hand", [])
+            self.view.hands[me] = hand
+            self.waits = event.get("waits")
+            if event.get("reason") in ("draw", "claim"):
+                # peng/chi leave a tile to throw; a gang draws its replacement first
+                if len(hand) % 3 == 2:
+                    await self.act("discard_tile", tile=self.policy.discard(self.view, me))
+                else:
+                    await self.draw()
+        elif kind == "discard":
+            self.next_player = self.view.current_player = event.get("next_player")
+            if event.get("player") != me:
+                want = self.policy.claim(self.view, me, event["tile"], self.waits)
+                if want:
+                    action, tiles = want
+                    args = {"action": action}
+                    if tiles:
+                        args["tiles"] = ",".join(str(t) for t in tiles)
+                    await self.act("claim", **args)
+                else:
+                    await self.act("pass_claim")
+        elif kind == "pending_cleared":
+            if self.next_player == me:
+                await self.draw()
+
+    async def draw(self):
+        status, detail, _ = await self.act("draw_tile")
+        if status == 400 and detail == "No tiles left":
+            self.table.finish("exhausted")
+
+    async def act(self, cmd: str, **args):
+        """Send one game action; returns (status, detail, result)."""
+        table = self.table
+        ctx = table.ctx
+        await table.pace()
+        if table.outcome is not None:
+            return 0, "", None
+        table.stamp(self.player)
+        ctx.stats.actions += 1
+        if ctx.transport == "ws":
+            return await self._command(cmd, args)
+        return await ctx.post(cmd, room_id=table.room_id, player=self.player, **args)
+
+    async def _command(self, cmd: str, args: dict):
+        ctx = self.table.ctx
+        request_id = next(ctx.ids)
+        future = asyncio.get_event_loop().create_future()
+        self.replies[request_id] = future
+        t0 = time.perf_counter()
+        try:
+            await self.ws.send(json.dumps({"id": request_id, "cmd": cmd, "args": args}))
+            reply = await asyncio.wait_for(future, ctx.timeout)
+        except Exception as e:
+            self.replies.pop(request_id, None)
+            ctx.stats.errors[cmd][type(e).__name__] += 1
+            return 599, type(e).__name__, None
+        status = 200 if reply.get("ok") else int(reply.get("status") or 500)
+        detail = "" if reply.get("ok") else str(reply.get("detail"))
+        ctx.stats.request(cmd, time.perf_counter() - t0, status, detail)
+        return status, detail, reply.get("result")
+
+class Context:
+    def __init__(self, args, client: httpx.AsyncClient, connect, policy_factory):
+        self.client = client
+        # coroutine function opening a websocket to a path on the server
+        self.connect = connect
+        self.transport = args.transport
+        self.seats = args.seats
+        self.games = args.games
+        self.interval = 1.0 / args.rate if args.rate > 0 else 0.0
+        self.timeout = args.timeout
+        self.game_timeout = args.game_timeout
+        self.deadline = time.perf_counter() + args.seconds if args.seconds > 0 else None
+        self.run_id = "%06x" % random.getrandbits(24)
+        self.ids = itertools.count(1)
+        self.new_policy = policy_factory
+        self.stats = Stats()
+
+    async def post(self, endpoint: str, **params):
+        """POST /rooms/<endpoint>, recording its latency; returns (status, detail, body)."""
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.post(PREFIX + "/" + endpoint, params=params)
+            body = r.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.stats.errors[endpoint][type(e).__name__] += 1
+            return 599, type(e).__name__, None
+        detail = str(body.get("detail")) if r.status_code >= 400 and isinstance(body, dict) else ""
+        self.stats.request(endpoint, time.perf_counter() - t0, r.status_code, detail)
+        return r.status_code, detail, body
+
+    async def setup(self, endpoint: str, **params) -> Optional[dict]:
+        status, _, body = await self.post(endpoint, **params)
+        return body if status == 200 else None
+
+async def play_game(ctx: Context, prefix: str):
+    players = ["%s-s%d" % (prefix, i) for i in range(ctx.seats)]
+    created = await ctx.setup("create_room", player=players[0], max_players=ctx.seats)
+    if created is None:
+        ctx.stats.games["setup_failed"] += 1
+        return
+    tokens = {players[0]: created["token"]}
+    for p in players[1:]:
+        joined = await ctx.setup("join_room", room_id=created["room_id"], player=p)
+        if joined is None:
+            ctx.stats.games["setup_failed"] += 1
+            return
+        tokens[p] = joined["token"]
+    table = Table(ctx, created["room_id"], players)
+    table.seats = [Seat(table, p, tokens[p], ctx.new_policy()) for p in players]
+    try:
+        try:
+            await asyncio.gather(*(s.connect() for s in table.seats))
+        except Exception as e:
+            ctx.stats.errors["websocket"]["connect " + type(e).__name__] += 1
+            table.finish("disconnected")
+            return
+        table.stamp()
+        if await ctx.setup("start_game", room_id=table.room_id) is None:
+            table.finish("setup_failed")
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(s.run() for s in table.seats)), ctx.game_timeout)
+        except asyncio.TimeoutError:
+            table.finish("stalled")
+    finally:
+        await asyncio.gather(*(s.close() for s in table.seats))
+
+async def play_table(ctx: Context, n: int, delay: float):
+    await asyncio.sleep(delay)
+    for g in range(ctx.games):
+        if ctx.deadline is not None and time.perf_counter() > ctx.deadline:
+            return
+        await play_game(ctx, "L%s-t%d-g%d" % (ctx.run_id, n, g))
+
+async def _probe_loop(stats: Stats, stop: asyncio.Event):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stats.loop_lag.append(time.perf_counter() - t0 - 0.01)
+
+async def run(args) -> dict:
+    policy_cls = POLICIES[args.policy]
+    mc = pycore
+    if args.policy not in ("random", "tsumogiri"):
+        # shanten-based policies score discards with the engine; prefer the native one
+        mc = native.load() or pycore
+    rng = random.Random(args.seed)
+
+    def new_policy():
+        return policy_cls(mc, random.Random(rng.random()))
+    if args.in_process:
+        from benchmarks.inprocess import InProcessApp
+        async with InProcessApp() as server:
+            return await _run(Context(args, server.client, server.websocket, new_policy), args)
+    ws_base = args.base.replace("http", "ws", 1)
+
+    def connect(path: str):
+        return websockets.connect(ws_base + path, ping_interval=None, compression=None)
+    limits = httpx.Limits(max_connections=args.http_pool, max_keepalive_connections=args.http_pool)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=args.timeout) as client:
+        return await _run(Context(args, client, connect, new_policy), args)
+
+async def _run(ctx: Context, args) -> dict:
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_probe_loop(ctx.stats, stop))
+    started = time.perf_counter()
+    step = args.ramp / args.tables if args.tables else 0.0
+    await asyncio.gather(*(play_table(ctx, n, n * step) for n in range(args.tables)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return ctx.stats.summary(elapsed)
+
+def report(summary: dict):
+    print("%.1fs  %d requests (%.0f/s)  %d actions (%.0f/s)  errors %d (%.2f%%)  client loop p99 %.1f ms"
+          % (summary["seconds"], summary["requests"], summary["rps"], summary["actions"],
+             summary["actions_per_s"], summary["errors"], 100 * summary["error_rate"],
+             summary["client_loop_lag_p99_ms"]))
+    print("games: " + ", ".join("%s %d" % kv for kv in sorted(summary["games"].items())))
+    print()
+    print("%-14s %9s %8s %7s %8s %9s %9s %9s %9s" % ("endpoint", "requests", "req/s", "errors", "expected",
+                                                     "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for name, e in summary["endpoints"].items():
+        print("%-14s %9d %8.0f %7d %8d %9.2f %9.2f %9.2f %9.2f" % (name, e["requests"], e["rps"], e["errors"],
+                                                               e["expected"], e["p50_ms"], e["p95_ms"],
+                                                               e["p99_ms"], e["max_ms"]))
+    print()
+    print("%-16s %9s %9s %9s %9s %9s" % ("event lag", "events", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for kind, e in summary["event_lag"].items():
+        print("%-16s %9d %9.2f %9.2f %9.2f %9.2f" % (kind, e["events"], e["p50_ms"], e["p95_ms"],
+                                                      e["p99_ms"], e["max_ms"]))
+    if summary["error_detail"]:
+        print()
+        print("errors:")
+        for name, details in sorted(summary["error_detail"].items()):
+            for detail, count in sorted(details.items()):
+                print("  %-14s %6d  %s" % (name, count, detail))
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--tables", type=int, default=100, help="concurrent rooms")
+    parser.add_argument("--seats", type=int, default=4, choices=(2, 3, 4), help="seat clients per room")
+    parser.add_argument("--games", type=int, default=1, help="games per table, played back to back")
+    parser.add_argument("--seconds", type=float, default=0, help="stop starting games after this (0 = no limit)")
+    parser.add_argument("--rate", type=float, default=0, help="actions per second per table (0 = unpaced)")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which tables start")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http", help="how seats send actions")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="tsumogiri")
+    parser.add_argument("--in-process", action="store_true",
+                        help="drive app.app in this process (benchmarks/inprocess.py) instead of --base")
+    parser.add_argument("--http-pool", type=int, default=100, help="pooled HTTP connections")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--game-timeout", type=float, default=300.0, help="a game running longer is stalled")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the summary as JSON")
+    parser.add_argument("--max-error-rate", type=float, help="exit 1 above this fraction of requests")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    summary = asyncio.get_event_loop().run_until_complete(run(args))
+    report(summary)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
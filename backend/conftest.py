@@ -0,0 +1,2 @@
+# pytest rootdir conftest: puts backend/ on sys.path so tests can import
+# models/routers/services the same way app.py does
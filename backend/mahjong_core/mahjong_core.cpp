@@ -1,5 +1,10 @@
 #include <vector>
 #include <algorithm>
+#include <string>
+#include <atomic>
+#include <cstdint>
+#include <cstdlib>
+#include <tuple>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
@@ -30,6 +35,227 @@ bool is_win(const std::vector<int>& tiles) {
     return false;
 }
 
+// Batch win check over packed hands: 14 tile bytes per hand in, one result
+// byte (1 = win, 0 = not) per hand out. The loop runs without the GIL.
+pybind11::bytes is_win_batch(const pybind11::bytes& packed) {
+    std::string data = packed;
+    if (data.size() % 14 != 0) throw pybind11::value_error("packed hands must be a multiple of 14 bytes");
+    size_t n = data.size() / 14;
+    std::string out(n, '\0');
+    {
+        pybind11::gil_scoped_release release;
+        std::vector<int> hand(14);
+        for (size_t i = 0; i < n; ++i) {
+            for (size_t k = 0; k < 14; ++k) hand[k] = static_cast<unsigned char>(data[i * 14 + k]);
+            out[i] = is_win(hand) ? 1 : 0;
+        }
+    }
+    return pybind11::bytes(out);
+}
+
+// Shanten for the standard shape (melds + one pair): -1 = complete, 0 = ready.
+// Works on any hand size, so hands shortened by exposed melds need
+// size / 3 concealed melds. Sequences stay inside a suit (1-9, 10-18, 19-27).
+//
+// Suits and honors are independent, so each group is decomposed on its own
+// into the most partial blocks reachable for every (pair, melds) pair, and
+// the groups are then combined. Group results are memoized in two fixed
+// tables shared by all threads (the check runs without the GIL), indexed by
+// the group's counts, so memory is bounded whatever the hands: a suit is
+// keyed by its nine counts in base 5 (5^9 slots) and honors, which have no
+// sequences, by how many tiles they hold once, twice, three and four times
+// (13^4 slots). That is about 21 MB at most, committed only as keys are first
+// seen. Groups with more than four copies of a tile are not cached.
+namespace {
+struct GroupBlocks {
+    // most partial blocks for [pair 0/1][melds 0..4], -1 = unreachable
+    signed char t[2][5];
+};
+
+struct GroupSlot {
+    // 0 empty, 1 being written, 2 ready
+    std::atomic<unsigned char> state;
+    GroupBlocks blocks;
+};
+
+const size_t SUIT_KEYS = 1953125;  // 5^9
+const size_t HONOR_KEYS = 28561;   // 13^4
+
+GroupSlot* group_table(bool seqs) {
+    // calloc'd (all slots empty) so untouched pages are never committed
+    static GroupSlot* const tables[2] = {
+        static_cast<GroupSlot*>(std::calloc(HONOR_KEYS, sizeof(GroupSlot))),
+        static_cast<GroupSlot*>(std::calloc(SUIT_KEYS, sizeof(GroupSlot))),
+    };
+    return tables[seqs ? 1 : 0];
+}
+
+void group_dfs(int* c, int n, bool seqs, int i, int melds, int partials, int pair, GroupBlocks& r) {
+    while (i < n && c[i] == 0) ++i;
+    if (i == n) {
+        int m = melds > 4 ? 4 : melds;
+        int t = partials > 8 ? 8 : partials;
+        if (t > r.t[pair][m]) r.t[pair][m] = static_cast<signed char>(t);
+        return;
+    }
+    if (c[i] >= 3) {
+        c[i] -= 3; group_dfs(c, n, seqs, i, melds + 1, partials, pair, r); c[i] += 3;
+    }
+    if (seqs && i + 2 < n && c[i + 1] && c[i + 2]) {
+        c[i]--; c[i + 1]--; c[i + 2]--;
+        group_dfs(c, n, seqs, i, melds + 1, partials, pair, r);
+        c[i]++; c[i + 1]++; c[i + 2]++;
+    }
+    if (c[i] >= 2) {
+        c[i] -= 2;
+        if (!pair) group_dfs(c, n, seqs, i, melds, partials, 1, r);
+        group_dfs(c, n, seqs, i, melds, partials + 1, pair, r);
+        c[i] += 2;
+    }
+    if (seqs) {
+        for (int d = 1; d <= 2; ++d) {
+            if (i + d < n && c[i + d]) {
+                c[i]--; c[i + d]--;
+                group_dfs(c, n, seqs, i, melds, partials + 1, pair, r);
+                c[i]++; c[i + d]++;
+            }
+        }
+    }
+    // leave one copy isolated
+    c[i]--; group_dfs(c, n, seqs, i, melds, partials, pair, r); c[i]++;
+}
+
+GroupBlocks group_blocks(const int* counts, int n, bool seqs) {
+    size_t key = 0;
+    bool cached = true;
+    if (seqs) {
+        for (int k = 0; k < n; ++k) {
+            if (counts[k] > 4) cached = false;
+            key = key * 5 + static_cast<size_t>(counts[k]);
+        }
+    } else {
+        int held[5] = {0};
+        for (int k = 0; k < n; ++k) {
+            if (counts[k] > 4) { cached = false; break; }
+            held[counts[k]]++;
+        }
+        key = static_cast<size_t>(((held[1] * 13 + held[2]) * 13 + held[3]) * 13 + held[4]);
+    }
+    GroupSlot* slot = nullptr;
+    if (cached) {
+        GroupSlot* table = group_table(seqs);
+        if (table) {
+            slot = &table[key];
+            if (slot->state.load(std::memory_order_acquire) == 2) return slot->blocks;
+        }
+    }
+    GroupBlocks r;
+    std::fill(&r.t[0][0], &r.t[0][0] + 10, static_cast<signed char>(-1));
+    int c[12];
+    std::copy(counts, counts + n, c);
+    group_dfs(c, n, seqs, 0, 0, 0, 0, r);
+    unsigned char empty = 0;
+    // first writer publishes; a thread racing it on the same key keeps its own copy
+    if (slot && slot->state.compare_exchange_strong(empty, 1, std::memory_order_acquire)) {
+        slot->blocks = r;
+        slot->state.store(2, std::memory_order_release);
+    }
+    return r;
+}
+}
+
+// counts[1..39] of a hand of `size` tiles; call without the GIL
+int shanten_counts(const int* counts, int size) {
+    int target = size / 3;
+    int best = 2 * target;
+    int acc[2][5];
+    std::fill(&acc[0][0], &acc[0][0] + 10, -1);
+    acc[0][0] = 0;
+    const int starts[4] = {1, 10, 19, 28};
+    for (int g = 0; g < 4; ++g) {
+        const GroupBlocks r = group_blocks(counts + starts[g], g < 3 ? 9 : 12, g < 3);
+        int next[2][5];
+        std::fill(&next[0][0], &next[0][0] + 10, -1);
+        for (int p1 = 0; p1 < 2; ++p1)
+            for (int m1 = 0; m1 < 5; ++m1) {
+                if (acc[p1][m1] < 0) continue;
+                for (int p2 = 0; p1 + p2 < 2; ++p2)
+                    for (int m2 = 0; m2 < 5; ++m2) {
+                        if (r.t[p2][m2] < 0) continue;
+                        int m = m1 + m2 > 4 ? 4 : m1 + m2;
+                        int t = acc[p1][m1] + r.t[p2][m2];
+                        if (t > next[p1 + p2][m]) next[p1 + p2][m] = t;
+                    }
+            }
+        std::copy(&next[0][0], &next[0][0] + 10, &acc[0][0]);
+    }
+    for (int p = 0; p < 2; ++p)
+        for (int m = 0; m < 5; ++m) {
+            if (acc[p][m] < 0) continue;
+            int mm = m > target ? target : m;
+            int t = acc[p][m] < target - mm ? acc[p][m] : target - mm;
+            int s = 2 * (target - mm) - t - p;
+            if (s < best) best = s;
+        }
+    return best;
+}
+
+void count_tiles(const std::vector<int>& tiles, int* counts) {
+    for (int t : tiles) {
+        if (t < 1 || t > 39) throw pybind11::value_error("tile out of range");
+        counts[t]++;
+    }
+}
+
+int shanten(const std::vector<int>& tiles) {
+    int counts[40] = {0};
+    count_tiles(tiles, counts);
+    pybind11::gil_scoped_release release;
+    return shanten_counts(counts, static_cast<int>(tiles.size()));
+}
+
+// Discard table for a hand about to discard: for each distinct tile, the
+// shanten after throwing it and its ukeire (copies not in hand of every tile
+// that would lower that shanten). One call per bot decision.
+std::vector<std::tuple<int, int, int>> discard_table(const std::vector<int>& tiles) {
+    int counts[40] = {0};
+    count_tiles(tiles, counts);
+    int size = static_cast<int>(tiles.size());
+    std::vector<std::tuple<int, int, int>> out;
+    pybind11::gil_scoped_release release;
+    // only a tile that pairs or melds with a held one can lower shanten
+    bool near[40] = {false};
+    for (int t = 1; t <= 39; ++t) {
+        if (!counts[t]) continue;
+        if (t > 27) { near[t] = true; continue; }
+        int lo = (t - 1) / 9 * 9 + 1;
+        for (int c = std::max(lo, t - 2); c <= std::min(lo + 8, t + 2); ++c) near[c] = true;
+    }
+    for (int t = 1; t <= 39; ++t) {
+        if (!counts[t]) continue;
+        counts[t]--;
+        int s = shanten_counts(counts, size - 1);
+        int ukeire = 0;
+        for (int c = 1; c <= 39; ++c) {
+            if (!near[c] || counts[c] >= 4) continue;
+            counts[c]++;
+            if (shanten_counts(counts, size) < s) ukeire += 4 - (counts[c] - 1);
+            counts[c]--;
+        }
+        counts[t]++;
+        out.emplace_back(t, s, ukeire);
+    }
+    return out;
+}
+
 PYBIND11_MODULE(mahjong_core, m) {
-    m.def("is_win", &is_win, "Simplified win check, input 14 tiles, return true if win");
+    // the list is converted before the call, so the check itself can drop the GIL
+    m.def("is_win", &is_win, "Simplified win check, input 14 tiles, return true if win",
+          pybind11::call_guard<pybind11::gil_scoped_release>());
+    m.def("shanten", &shanten, "Tiles away from ready (0) or complete (-1) for the melds + pair shape "
+          "(memo of suit and honor groups bounded at about 21 MB per process)");
+    m.def("discard_table", &discard_table,
+          "(tile, shanten after discarding it, ukeire) for each distinct tile in the hand "
+          "(shares shanten's bounded memo)");
+    m.def("is_win_batch", &is_win_batch, "Win check for packed hands (14 bytes each), returns one byte per hand");
 }
@@ -20,9 +20,34 @@ def test_wrong_count():
     tiles = [1,2,3]
     assert mahjong_core.is_win(tiles) == False
 
+def test_batch():
+    # 打包批量判定，每手 14 字节
+    hands = [[1,2,3,4,5,6,7,8,9,11,12,13,31,31], [0,2,3,4,5,6,7,8,9,11,12,13,31,31]]
+    packed = bytes([t for hand in hands for t in hand])
+    assert mahjong_core.is_win_batch(packed) == bytes([1, 0])
+    assert mahjong_core.is_win_batch(b"") == b""
+
+def test_shanten():
+    # 向听数：-1 为和牌，0 为听牌；副露后手牌变短也可计算
+    assert mahjong_core.shanten([1,2,3,4,5,6,7,8,9,11,12,13,31,31]) == -1
+    assert mahjong_core.shanten([1,2,3,4,5,6,7,8,9,11,12,31,31]) == 0
+    assert mahjong_core.shanten([1,4,7,10,13,16,19,22,25,28,30,32,34]) == 8
+    assert mahjong_core.shanten([1,2,3,4,5,6,11,12,31,31]) == 0
+    # 顺子不跨花色
+    assert mahjong_core.shanten([1,1,1,2,2,2,3,3,3,9,10,31,31]) == 1
+
+def test_discard_table():
+    # 打出每种牌后的向听数与进张数
+    table = mahjong_core.discard_table([1,2,3,4,5,6,7,8,9,11,12,31,31,35])
+    assert (35, 0, 8) in table
+    assert min(table, key=lambda row: (row[1], -row[2]))[0] == 35
+
 if __name__ == "__main__":
     test_win()
     test_not_win()
     test_invalid_tile()
     test_wrong_count()
+    test_batch()
+    test_shanten()
+    test_discard_table()
     print("All tests passed.")
\ No newline at end of file
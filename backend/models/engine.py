@@ -0,0 +1,260 @@
+"""Headless game engine.
+
+Engine applies the game rules (turn order, draw/discard, claim priority,
+chi/peng/gang, rob-gang, hu) to a models.room.Room with no web or asyncio
+dependencies. Each command validates, mutates the room and returns an
+Outcome: the result for the acting client, the public events to broadcast
+and the seats whose private hand changed. Rule violations raise GameError
+carrying the HTTP status the rooms router reports.
+
+`is_win` is any callable taking a tile list (mahjong_core.is_win in the
+server) and is called synchronously; `clock` stamps pending discards and
+claims so simulations can run on a fake clock.
+"""
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from models.room import Room
+
+logger = logging.getLogger("uvicorn.error")
+
+CLAIM_ACTIONS = ("chi", "peng", "gang", "hu")
+# claims resolve by action (hu > gang > peng > chi), then seat distance from
+# the discarder, then time
+CLAIM_PRIORITY = {"hu": 4, "gang": 3, "peng": 2, "chi": 1}
+
+class GameError(Exception):
+    def __init__(self, detail: str, status: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+class Outcome:
+    __slots__ = ("result", "events", "hands")
+
+    def __init__(self, result: dict, events: Optional[List[dict]] = None,
+                 hands: Optional[List[Tuple[str, str, Optional[int]]]] = None):
+        self.result = result
+        self.events = events or []
+        # (player, reason, tile) for each seat whose private view changed
+        self.hands = hands or []
+
+def same_suit(a: int, b: int) -> bool:
+    # suits are 1-9, 10-18, 19-27; honors (28+) never form sequences
+    return a <= 27 and b <= 27 and (a - 1) // 9 == (b - 1) // 9
+
+def parse_chi_tiles(tiles) -> List[int]:
+    """The two hand tiles of a chi, from "a,b" or a list."""
+    if not tiles:
+        raise GameError("Chi requires tiles param")
+    try:
+        parts = [int(x) for x in (tiles.split(",") if isinstance(tiles, str) else tiles)]
+    except (TypeError, ValueError):
+        raise GameError("Invalid tiles param")
+    if len(parts) != 2:
+        raise GameError("Chi requires two tiles")
+    return parts
+
+class Engine:
+    __slots__ = ("room", "is_win", "clock")
+
+    def __init__(self, room: Room, is_win: Optional[Callable] = None, clock: Callable[[], float] = time.time):
+        self.room = room
+        self.is_win = is_win
+        self.clock = clock
+
+    def _wins(self, hand: List[int]) -> bool:
+        if self.is_win is None:
+            raise GameError("mahjong_core module not available", 500)
+        try:
+            return bool(self.is_win(hand))
+        except Exception:
+            logger.exception("mahjong_core.is_win raised exception")
+            raise GameError("mahjong_core.is_win error", 500)
+
+    def _distance(self, player: str) -> int:
+        """Seats from the discarder to `player` in turn order."""
+        room = self.room
+        try:
+            return (room.players.index(player) - room.players.index(room.pending_discard["player"])) % len(room.players)
+        except ValueError:
+            return 999
+
+    def _take_discard(self, claimant: str, tile: int):
+        """The claimed discard leaves the pile and the claimant takes the turn."""
+        room = self.room
+        if room.discards and room.discards[-1][1] == tile:
+            room.discards.pop()
+        room.pending_discard = None
+        room.passes = set()
+        room.current_player = claimant
+
+    def start(self) -> Outcome:
+        room = self.room
+        try:
+            room.deal_tiles()
+        except ValueError as e:
+            raise GameError(str(e))
+        event = {"type": "start", "room_id": room.room_id, "players": list(room.players),
+                 "current_player": room.current_player, "deck_count": len(room.deck)}
+        result = {"hands": room.hands, "deck_count": len(room.deck), "status": room.status,
+                  "current_player": room.current_player}
+        return Outcome(result, [event], [(p, "deal", None) for p in room.players])
+
+    def draw(self, player: str) -> Outcome:
+        room = self.room
+        if room.status != "playing":
+            raise GameError("Room not playing")
+        if player not in room.players:
+            raise GameError("Player not in room")
+        # block drawing while a pending discard is awaiting claims
+        if room.pending_discard is not None:
+            raise GameError("Pending discard awaiting claims")
+        if player != room.current_player:
+            raise GameError("Not player's turn")
+        if not room.deck:
+            raise GameError("No tiles left")
+        if self.is_win is None:
+            raise GameError("mahjong_core module not available", 500)
+        tile = room.deck.pop()
+        hand = room.hands[player]
+        hand.append(tile)
+        if self._wins(hand):
+            room.status = "finished"
+            event = {"type": "win", "room_id": room.room_id, "player": player, "hand": list(hand)}
+            return Outcome({"tile": tile, "hand": list(hand), "win": True, "winner": player}, [event])
+        # the drawn tile only goes to the drawing seat
+        event = {"type": "draw", "room_id": room.room_id, "player": player, "hand_count": len(hand)}
+        return Outcome({"tile": tile, "hand": list(hand), "must_discard": True, "current_player": room.current_player},
+                       [event], [(player, "draw", tile)])
+
+    def discard(self, player: str, tile: int) -> Outcome:
+        room = self.room
+        if room.status != "playing":
+            raise GameError("Room not playing")
+        if player != room.current_player:
+            raise GameError("Not player's turn")
+        hand = room.hands[player]
+        if tile not in hand:
+            raise GameError("Tile not in hand")
+        hand.remove(tile)
+        room.discards.append([player, tile])
+        room.pending_discard = {"player": player, "tile": tile, "claims": [], "time": self.clock()}
+        room.passes = set()
+        next_p = room.next_player()
+        event = {"type": "discard", "room_id": room.room_id, "player": player, "tile": tile,
+                 "pending": True, "next_player": next_p}
+        return Outcome({"hand": list(hand), "next_player": next_p, "deck_count": len(room.deck)},
+                       [event], [(player, "discard", tile)])
+
+    def claim(self, player: str, action: str, tiles=None) -> Outcome:
+        """Record a claim on the pending discard and resolve the best one at once."""
+        action = action.lower()
+        if action not in CLAIM_ACTIONS:
+            raise GameError("Invalid action")
+        room = self.room
+        if room.pending_discard is None:
+            raise GameError("No pending discard")
+        if player not in room.players:
+            raise GameError("Player not in room")
+        if player == room.pending_discard["player"]:
+            raise GameError("Discarder cannot claim own tile")
+        room.pending_discard["claims"].append({"player": player, "action": action, "tiles": tiles,
+                                               "time": self.clock(), "distance": self._distance(player)})
+        return self._resolve(tiles)
+
+    def _resolve(self, tiles) -> Outcome:
+        room = self.room
+        pending = room.pending_discard
+        winner = min(pending["claims"], key=lambda c: (-CLAIM_PRIORITY.get(c["action"], 0), c["distance"], c["time"]))
+        claimant = winner["player"]
+        act = winner["action"]
+        tile = pending["tile"]
+        hand = room.hands[claimant]
+        if act == "hu":
+            if not self._wins(hand + [tile]):
+                return Outcome({"detail": "invalid hu claim", "accepted": False})
+            room.status = "finished"
+            room.pending_discard = None
+            room.passes = set()
+            return Outcome({"win": True, "winner": claimant},
+                           [{"type": "hu", "room_id": room.room_id, "player": claimant, "winner": claimant}])
+        if act == "peng":
+            if hand.count(tile) < 2:
+                raise GameError("Not enough tiles for peng")
+            for _ in range(2):
+                hand.remove(tile)
+            meld = [tile] * 3
+        elif act == "chi":
+            # chi is only open to the seat after the discarder
+            if winner["distance"] != 1:
+                raise GameError("Chi only allowed to next player")
+            parts = parse_chi_tiles(tiles)
+            meld = sorted(parts + [tile])
+            if not (same_suit(meld[0], meld[1]) and same_suit(meld[1], meld[2])):
+                raise GameError("Chi tiles must be same suit sequence")
+            if not (meld[0] + 1 == meld[1] and meld[1] + 1 == meld[2]):
+                raise GameError("Tiles do not form sequence")
+            for t in parts:
+                if t not in hand:
+                    raise GameError("Missing tile for chi")
+            for t in parts:
+                hand.remove(t)
+        else:
+            if hand.count(tile) < 3:
+                raise GameError("Not enough tiles for gang")
+            # rob gang: anyone who can hu on the tile outranks the exposed kong
+            if self.is_win is None:
+                raise GameError("mahjong_core module not available", 500)
+            for p in room.players:
+                if p != claimant and self._wins(room.hands[p] + [tile]):
+                    pending["claims"].append({"player": p, "action": "hu", "tiles": None,
+                                              "time": self.clock(), "distance": self._distance(p)})
+                    return self._resolve(tiles)
+            for _ in range(3):
+                hand.remove(tile)
+            meld = [tile] * 4
+        room.melds[claimant].append({"type": act, "tiles": meld})
+        # a gang claimant also takes the turn (and draws next)
+        self._take_discard(claimant, tile)
+        melds = list(room.melds[claimant])
+        event = {"type": "claim", "action": act, "room_id": room.room_id, "player": claimant, "melds": melds}
+        return Outcome({"claimed": act, "player": claimant, "melds": list(melds)}, [event], [(claimant, "claim", tile)])
+
+    def pass_claim(self, player: str) -> Outcome:
+        room = self.room
+        if room.pending_discard is None:
+            raise GameError("No pending discard")
+        if player not in room.players:
+            raise GameError("Player not in room")
+        room.passes.add(player)
+        events = [{"type": "pass", "room_id": room.room_id, "player": player, "passes": list(room.passes)}]
+        # everyone but the discarder must pass (the length test skips the set walk until then)
+        discarder = room.pending_discard["player"]
+        passes = room.passes
+        if len(passes) < len(room.players) - 1 or not all(p in passes for p in room.players if p != discarder):
+            return Outcome({"passed": True, "resolved": "waiting_other_passes"}, events)
+        room.pending_discard = None
+        room.passes = set()
+        events.append({"type": "pending_cleared", "room_id": room.room_id, "reason": "all_passed"})
+        return Outcome({"passed": True, "resolved": "no_claims"}, events)
+
+    def expire_pending(self, now: float, timeout: float) -> Optional[Outcome]:
+        """Drop a pending discard older than `timeout` seconds; None if there is nothing to drop."""
+        room = self.room
+        pending = room.pending_discard
+        if pending is None or now - pending.get("time", 0) <= timeout:
+            return None
+        room.pending_discard = None
+        room.passes = set()
+        return Outcome({"tile": pending.get("tile")},
+                       [{"type": "pending_cleared", "room_id": room.room_id, "reason": "timeout"}])
+
+    def set_hand(self, player: str, tiles: List[int]) -> Outcome:
+        room = self.room
+        if player not in room.players:
+            raise GameError("Player not in room")
+        room.hands[player] = list(tiles)
+        return Outcome({"room_id": room.room_id, "player": player, "hand_count": len(room.hands[player])},
+                       hands=[(player, "admin_set_hand", None)])
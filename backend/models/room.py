@@ -1,5 +1,11 @@
 from typing import List, Dict, Optional
+import copy
 import random
+import secrets
+
+# game state that actions mutate (seating and tokens are left out)
+_STATE_FIELDS = ("status", "deck", "hands", "current_player", "discards", "dealer_index",
+                 "melds", "pending_discard", "passes")
 
 class Room:
     def __init__(self, room_id: int, players: Optional[List[str]] = None, max_players: int = 4):
@@ -16,13 +22,16 @@ class Room:
         # pending discard and claim state
         self.pending_discard: Optional[Dict] = None
         self.passes: set = set()  # players who passed on current pending discard
+        # per-seat secrets used to bind websocket channels to a player
+        self.seat_tokens: Dict[str, str] = {p: secrets.token_urlsafe(16) for p in self.players}
         self.init_deck()
 
-    def init_deck(self):
+    def init_deck(self, rng: Optional[random.Random] = None):
+        """Fresh shuffled deck; pass a seeded `rng` for a reproducible one."""
         deck = []
         for t in list(range(1, 28)) + list(range(28, 40)):
             deck += [t] * 4
-        random.shuffle(deck)
+        (rng or random).shuffle(deck)
         self.deck = deck
         return self.deck
 
@@ -36,6 +45,7 @@ class Room:
         self.players.append(player)
         self.hands[player] = []
         self.melds[player] = []
+        self.seat_tokens[player] = secrets.token_urlsafe(16)
 
     def deal_tiles(self):
         if len(self.players) < 2:
@@ -73,7 +83,20 @@ class Room:
             self.players.remove(player)
             self.hands.pop(player, None)
             self.melds.pop(player, None)
+            self.seat_tokens.pop(player, None)
             if self.dealer_index >= len(self.players):
                 self.dealer_index = 0
             if self.current_player == player:
-                self.current_player = self.players[self.dealer_index] if self.players else None
\ No newline at end of file
+                self.current_player = self.players[self.dealer_index] if self.players else None
+
+    def snapshot(self) -> Dict:
+        """Deep copy of the game state, for restore()."""
+        return copy.deepcopy({f: getattr(self, f) for f in _STATE_FIELDS})
+
+    def restore(self, state: Dict):
+        for f in _STATE_FIELDS:
+            setattr(self, f, state[f])
+
+    def check_seat_token(self, player: str, token: Optional[str]) -> bool:
+        expected = self.seat_tokens.get(player)
+        return bool(expected and token) and secrets.compare_digest(expected, token)
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Request and response schemas for the rooms router.
+
+Response models document the endpoints in OpenAPI only: handlers build
+trusted dicts and return them through FastJSONResponse, so no per-request
+validation or jsonable_encoder pass is run against them. Request bodies
+(BatchRequest) are validated as usual.
+"""
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel
+
+class Meld(BaseModel):
+    type: str
+    tiles: List[int]
+
+class CreateRoomResponse(BaseModel):
+    room_id: int
+    players: List[str]
+    max_players: int
+    token: str
+
+class JoinRoomResponse(BaseModel):
+    room_id: int
+    players: List[str]
+    token: str
+
+class StartGameResponse(BaseModel):
+    hands: Dict[str, List[int]]
+    deck_count: int
+    status: str
+    current_player: Optional[str] = None
+
+class GameStateResponse(BaseModel):
+    deck_count: int
+    current_player: Optional[str] = None
+    status: str
+    discards: List[List[Union[str, int]]]
+    seq: int
+    # own hand as tiles, other seats as "<n> tiles"; tile counts for observers
+    hands: Dict[str, Union[List[int], str, int]]
+
+class DrawTileResponse(BaseModel):
+    tile: int
+    hand: List[int]
+    must_discard: Optional[bool] = None
+    current_player: Optional[str] = None
+    win: Optional[bool] = None
+    winner: Optional[str] = None
+
+class DiscardTileResponse(BaseModel):
+    hand: List[int]
+    next_player: Optional[str] = None
+    deck_count: int
+
+class ClaimResponse(BaseModel):
+    claimed: Optional[str] = None
+    player: Optional[str] = None
+    melds: Optional[List[Meld]] = None
+    win: Optional[bool] = None
+    winner: Optional[str] = None
+    accepted: Optional[bool] = None
+    detail: Optional[str] = None
+
+class PassClaimResponse(BaseModel):
+    passed: bool
+    resolved: str
+
+class SetHandResponse(BaseModel):
+    room_id: int
+    player: str
+    hand_count: int
+
+class BatchAction(BaseModel):
+    cmd: str
+    player: str
+    args: Dict[str, Any] = {}
+
+class BatchRequest(BaseModel):
+    actions: List[BatchAction]
+    # roll every action back if one fails (default: keep those applied before it)
+    atomic: bool = False
+
+class BatchResult(BaseModel):
+    index: int
+    cmd: str
+    ok: bool
+    result: Optional[Dict[str, Any]] = None
+    status: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    room_id: int
+    ok: bool
+    applied: int
+    rolled_back: bool
+    results: List[BatchResult]
+    seq: int
+
+class LobbyRoom(BaseModel):
+    room_id: int
+    status: str
+    players: List[str]
+    max_players: int
+    open_seats: int
+
+class LobbyResponse(BaseModel):
+    rooms: List[LobbyRoom]
+    # cursor for the next page (?after=), null on the last page
+    next_after: Optional[int] = None
+    total: int
+
+class PlayerRoomResponse(BaseModel):
+    player: str
+    room_ids: List[int]
+
+class EnqueueResponse(BaseModel):
+    player: str
+    ticket: str
+    max_players: int
+    # players queued for this table size, including this one
+    waiting: int
+
+class TicketResponse(BaseModel):
+    player: str
+    status: str
+    max_players: int
+    room_id: Optional[int] = None
+    token: Optional[str] = None
+
+class CancelResponse(BaseModel):
+    cancelled: bool
+
+class AddBotResponse(BaseModel):
+    room_id: int
+    players: List[str]
+    bot: str
+    policy: str
+
+class LockTimings(BaseModel):
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    max_us: float
+
+class LockSite(BaseModel):
+    lock: str
+    # file:line function of the acquiring `with` / `async with`
+    site: str
+    count: int
+    wait_total_ms: float
+    hold_total_ms: float
+    wait: LockTimings
+    hold: LockTimings
+
+class LockProfileResponse(BaseModel):
+    enabled: bool
+    # unix time profiling was enabled or last reset
+    since: Optional[float] = None
+    samples: int
+    sites: List[LockSite]
+
+class StatusMemory(BaseModel):
+    rooms: int
+    bytes: int
+
+class RoomMemory(BaseModel):
+    room_id: int
+    status: str
+    bytes: int
+    # bytes per component: room fields (deck, hands, discards, melds,
+    # pending_discard, seat_tokens, room) and router tables (event_log,
+    # connections, lock, index, bots, bot_task, spectators, sse, seq)
+    components: Dict[str, int]
+
+class MemoryResponse(BaseModel):
+    rooms: int
+    total_bytes: int
+    per_room_bytes: float
+    components: Dict[str, int]
+    by_status: Dict[str, StatusMemory]
+    largest: List[RoomMemory]
+    # per-room table entries whose room no longer exists
+    orphans: Dict[str, int]
+    # tracemalloc totals, when the process is tracing allocations
+    traced_bytes: Optional[int] = None
+    traced_peak_bytes: Optional[int] = None
+    elapsed_ms: float
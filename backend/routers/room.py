@@ -1,350 +1,306 @@
-from fastapi import APIRouter, HTTPException, Request, Header, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, HTTPException, Request, Header, WebSocket, WebSocketDisconnect, Depends, Query
+from fastapi.responses import Response, StreamingResponse
+from models.engine import CLAIM_PRIORITY, Engine, GameError
 from models.room import Room
-from typing import List, Optional
+from models.schemas import (CreateRoomResponse, JoinRoomResponse, StartGameResponse, GameStateResponse,
+                            DrawTileResponse, DiscardTileResponse, ClaimResponse, PassClaimResponse,
+                            SetHandResponse, BatchRequest, BatchResponse, LobbyResponse,
+                            PlayerRoomResponse, EnqueueResponse, TicketResponse, CancelResponse,
+                            AddBotResponse, LockProfileResponse, MemoryResponse)
+from services import codec, memory, metrics, native, tracing
+from services.responses import FastJSONResponse
+from services.bots import POLICIES, SeatBot, wait_set
+from services.lobby import RoomIndex
+from services.lockprof import LockProfiler, ProfiledLock
+from services.matchmaking import Matchmaker, Ticket
+from services.sampler import NativeView, StackSampler, collapsed
+from services.spectators import SpectatorPublisher
+from services.sse import EventChannel, format_event
+from collections import deque
 import threading
 import logging
 import os
-import sys
-import glob
-import importlib.util
-import importlib.machinery
 import time
+import json
 import asyncio
-from typing import Dict, Optional
+import functools
+import heapq
+import itertools
+import secrets
+import tracemalloc
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 
 logger = logging.getLogger("uvicorn.error")
 
-router = APIRouter()
+# metrics (GET /metrics); counters and histograms are per-thread shards, so
+# observing them takes no lock
+REQUEST_SECONDS = metrics.registry.histogram(
+    "mahjong_request_seconds", "Rooms router request latency.", ("endpoint",))
+REQUEST_ERRORS = metrics.registry.counter(
+    "mahjong_request_errors_total", "Rooms router requests answered with an HTTP error.", ("endpoint", "status"))
+LOCK_WAIT_SECONDS = metrics.registry.histogram(
+    "mahjong_lock_wait_seconds", "Time spent waiting to acquire a lock.", ("lock",))
+LOCK_HOLD_SECONDS = metrics.registry.histogram(
+    "mahjong_lock_hold_seconds", "Time a lock was held.", ("lock",))
+BROADCAST_SECONDS = metrics.registry.histogram(
+    "mahjong_broadcast_seconds", "Time to record an event and schedule its sends to a room.",
+    ("target",), metrics.FAST_BUCKETS)
+PENDING_EXPIRED = metrics.registry.counter(
+    "mahjong_pending_discards_expired_total", "Pending discards cleared by the timeout loop.")
+# opt-in contention profile of rooms_lock and the per-room locks by call
+# site (GET /rooms/admin/locks); MJ_LOCK_PROFILING=1 enables it at startup
+lock_profiler = LockProfiler(samples=int(os.getenv("MJ_LOCK_PROFILE_SAMPLES", 4096)))
+lock_profiler.configure(enabled=os.getenv("MJ_LOCK_PROFILING", "0").lower() in ("1", "true", "yes"))
+# sampled request traces (MJ_TRACE_SAMPLE_RATE) to a rotating NDJSON file
+tracer = tracing.tracer
+tracer.configure(rate=float(os.getenv("MJ_TRACE_SAMPLE_RATE", 0.0)),
+                 path=os.getenv("MJ_TRACE_FILE", os.path.join("traces", "requests.ndjson")))
+
+router = APIRouter(default_response_class=FastJSONResponse)
 rooms = {}  # room_id: Room
-rooms_lock = threading.Lock()
-
-# helper to load mahjong_core extension (must export is_win)
-def _ensure_mahjong_core():
-    if "mahjong_core" in sys.modules:
-        m = sys.modules["mahjong_core"]
-        if hasattr(m, "is_win"):
-            return m
+# rooms_lock guards the registry (rooms, room_locks) and is never held across
+# an await. Game actions run on the event loop and serialize per room on
+# room_locks, so a slow table never holds up the others. The lock profiler
+# wraps outermost so it sees the acquiring call site.
+rooms_lock = ProfiledLock(
+    tracing.TracedLock(metrics.TimedLock(threading.Lock(), LOCK_WAIT_SECONDS, LOCK_HOLD_SECONDS, "rooms_lock"),
+                       "rooms_lock"),
+    lock_profiler, "rooms_lock")
+room_locks: Dict[int, asyncio.Lock] = {}
+# player -> room, status -> rooms and open-seat indexes plus cached lobby
+# summaries; updated after every seating or status change
+room_index = RoomIndex()
+# reject create/join by a player already seated in another waiting or playing room
+UNIQUE_SEATS = os.getenv("MJ_UNIQUE_SEATS", "0").lower() in ("1", "true", "yes")
+
+class _Unlocked:
+    """Stand-in for unknown rooms; the handler then reports the missing room."""
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+_UNLOCKED = _Unlocked()
+
+def _room_lock(room_id: int):
+    lock = room_locks.get(room_id)
+    if lock is None:
+        return _UNLOCKED
+    lock = tracing.traced_async_lock(lock, "room_lock")
+    return lock if not lock_profiler.enabled else lock_profiler.wrap_async(lock, "room_lock")
+
+def _route(method: str, path: str, model=None, **kwargs):
+    """Register an async handler that returns a trusted, JSON-native dict.
+
+    The route serializes the dict straight through FastJSONResponse, skipping
+    response-model validation and jsonable_encoder; `model` only documents the
+    response. Latency and HTTP errors are recorded per handler name, and a
+    sampled request gets a trace named after the handler. The undecorated
+    function is returned, so in-process callers (websocket commands) keep
+    getting plain dicts.
+    """
+    def decorator(func):
+        name = func.__name__
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError("_route handlers must be async: %s" % name)
+
+        @functools.wraps(func)
+        async def endpoint(*args, **kw):
+            t0 = time.perf_counter()
+            started = tracer.start(name, kw)
+            status = 200
+            try:
+                return FastJSONResponse(await func(*args, **kw))
+            except HTTPException as e:
+                status = e.status_code
+                REQUEST_ERRORS.inc(name, status)
+                raise
+            except BaseException:
+                status = 500
+                raise
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - t0, name)
+                if started is not None:
+                    tracer.finish(started, status)
+        responses = {200: {"model": model}} if model is not None else None
+        router.add_api_route(path, endpoint, methods=[method], response_model=None,
+                             responses=responses, **kwargs)
+        return func
+    return decorator
+
+# the engine (services/native.py) and its observed wrappers, bound on first
+# use so the hot paths (_play, hand events, bots) call them without a lookup
+_core_bound = False
+_core = None
+_core_view: Optional[NativeView] = None
+_core_is_win: Optional[Callable] = None
+
+def _bind_core():
+    global _core_bound, _core, _core_view, _core_is_win
+    mc = native.load()
+    _core, _core_view, _core_is_win = mc, native.native_view(mc), native.timed_is_win(mc)
+    _core_bound = True
+    return mc
+
+def _wait_set(view: Optional[NativeView], hand: List[int]) -> List[int]:
+    """Tiles that would complete `hand` (same is_win check used for hu claims)."""
+    if view is None:
+        return []
+    t0 = time.perf_counter()
     try:
-        import mahjong_core as mc
-        if hasattr(mc, "is_win"):
-            sys.modules["mahjong_core"] = mc
-            return mc
+        return wait_set(view, hand)
     except Exception:
-        pass
-    base = os.path.dirname(os.path.dirname(__file__))
-    candidates = [
-        os.path.join(base, "mahjong_core"),
-        os.path.join(base, "mahjong_core", "Release"),
-        os.path.join(base, "mahjong_core", "build", "Release"),
-        os.path.join(base, "mahjong_core", "build"),
-    ]
-    for p in candidates:
-        if not os.path.isdir(p):
-            continue
-        for pattern in ("*.pyd", "*.so"):
-            for fpath in glob.glob(os.path.join(p, pattern)):
-                try:
-                    module_name = "mahjong_core"
-                    loader = importlib.machinery.ExtensionFileLoader(module_name, fpath)
-                    spec = importlib.util.spec_from_file_location(module_name, fpath, loader=loader)
-                    if not spec or not spec.loader:
-                        continue
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-                    sys.modules[module_name] = mod
-                    if hasattr(mod, "is_win"):
-                        logger.info("Loaded mahjong_core from %s", fpath)
-                        return mod
-                except Exception:
-                    logger.exception("failed to load mahjong_core from %s", fpath)
-    return None
+        logger.exception("mahjong_core.is_win error while computing waits")
+        return []
+    finally:
+        elapsed = time.perf_counter() - t0
+        native.NATIVE_SECONDS.observe(elapsed, "wait_set")
+        tracing.add_span("native:wait_set", t0, elapsed)
+
+def _wait_sets(view: Optional[NativeView], hands: List[List[int]]) -> List[List[int]]:
+    return [_wait_set(view, hand) for hand in hands]
 
-@router.post("/create_room")
-def create_room(player: str, max_players: int = 4):
+def set_unique_seats(enabled: bool):
+    global UNIQUE_SEATS
+    UNIQUE_SEATS = bool(enabled)
+
+def _check_seat_free(player: str, room_id: Optional[int] = None):
+    if not UNIQUE_SEATS:
+        return
+    for other in room_index.rooms_of(player):
+        if other != room_id:
+            raise HTTPException(status_code=409, detail="Player already seated in room %d" % other)
+
+@_route("POST", "/create_room", CreateRoomResponse)
+async def create_room(player: str, max_players: int = 4):
+    _check_seat_free(player)
     with rooms_lock:
         room_id = len(rooms) + 1
         room = Room(room_id, [player], max_players=max_players)
         rooms[room_id] = room
-    return {"room_id": room_id, "players": room.players, "max_players": room.max_players}
+        room_locks[room_id] = asyncio.Lock()
+    room_index.update(room)
+    return {"room_id": room_id, "players": room.players, "max_players": room.max_players,
+            "token": room.seat_tokens[player]}
 
-@router.post("/join_room")
-def join_room(room_id: int, player: str):
-    with rooms_lock:
+@_route("POST", "/join_room", JoinRoomResponse)
+async def join_room(room_id: int, player: str):
+    async with _room_lock(room_id):
         room = rooms.get(room_id)
         if not room:
             raise HTTPException(status_code=404, detail="Room not found")
+        _check_seat_free(player, room_id)
         try:
             room.add_player(player)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
-    return {"room_id": room_id, "players": room.players}
+        room_index.update(room)
+        return {"room_id": room_id, "players": room.players, "token": room.seat_tokens[player]}
 
-@router.post("/start_game")
-def start_game(room_id: int):
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
-        try:
-            room.deal_tiles()
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        return {"hands": room.hands, "deck_count": len(room.deck), "status": room.status, "current_player": room.current_player}
+@_route("POST", "/start_game", StartGameResponse)
+async def start_game(room_id: int):
+    async with _room_lock(room_id):
+        return await _play(_get_room(room_id), "start")
 
-@router.get("/game_state")
-def game_state(room_id: int, player: Optional[str] = None):
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
-        public = {
-            "deck_count": len(room.deck),
-            "current_player": room.current_player,
-            "status": room.status,
-            "discards": room.discards
-        }
-        if player and player in room.players:
-            masked = {p: (room.hands[p] if p == player else f"{len(room.hands[p])} tiles") for p in room.players}
-            public["hands"] = masked
-        else:
-            public["hands"] = {p: len(room.hands.get(p, [])) for p in room.players}
+@_route("GET", "", LobbyResponse)
+async def list_rooms(status: Optional[str] = None, open_only: bool = Query(False, alias="open"),
+                     after: int = 0, limit: int = Query(50, ge=1, le=200)):
+    """Lobby listing, paged by room id: pass the returned next_after as ?after=."""
+    page, next_after, total = room_index.page(status=status, open_only=open_only, after=after, limit=limit)
+    return {"rooms": page, "next_after": next_after, "total": total}
+
+@_route("GET", "/player_room", PlayerRoomResponse)
+async def player_room(player: str):
+    """Rooms where `player` is seated in a waiting or playing game."""
+    return {"player": player, "room_ids": room_index.rooms_of(player)}
+
+def _state_view(room: Room, player: Optional[str] = None) -> dict:
+    """Public room state, with `player`'s own hand revealed if they are seated."""
+    public = {
+        "deck_count": len(room.deck),
+        "current_player": room.current_player,
+        "status": room.status,
+        "discards": list(room.discards),
+        "seq": room_seq.get(room.room_id, 0),
+    }
+    if player and player in room.players:
+        masked = {p: (room.hands[p] if p == player else f"{len(room.hands[p])} tiles") for p in room.players}
+        public["hands"] = masked
+    else:
+        public["hands"] = {p: len(room.hands.get(p, [])) for p in room.players}
     return public
 
-@router.post("/draw_tile")
-def draw_tile(room_id: int, player: str):
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
-        if room.status != "playing":
-            raise HTTPException(status_code=400, detail="Room not playing")
-        if player not in room.players:
-            raise HTTPException(status_code=400, detail="Player not in room")
-        # block drawing while a pending discard is awaiting claims
-        if room.pending_discard is not None:
-            raise HTTPException(status_code=400, detail="Pending discard awaiting claims")
-        if player != room.current_player:
-            raise HTTPException(status_code=400, detail="Not player's turn")
-        if not room.deck:
-            raise HTTPException(status_code=400, detail="No tiles left")
-        tile = room.deck.pop()
-        room.hands[player].append(tile)
-    mc = _ensure_mahjong_core()
-    if mc is None:
-        raise HTTPException(status_code=500, detail="mahjong_core module not available")
+def _get_room(room_id: int, status: int = 404, detail: str = "Room not found") -> Room:
+    room = rooms.get(room_id)
+    if room is None:
+        raise HTTPException(status_code=status, detail=detail)
+    return room
+
+async def _play(room: Room, command: str, *args) -> dict:
+    """Run an engine command on `room` and deliver its events; the caller holds the room lock.
+
+    The rules live in models/engine.py; this adapter maps GameError to
+    HTTPException, keeps room_index current and sends the public events and
+    refreshed hands to connected clients.
+    """
+    if not _core_bound:
+        _bind_core()
+    status = room.status
     try:
-        win = bool(mc.is_win(room.hands[player]))
-    except Exception:
-        logger.exception("mahjong_core.is_win raised exception")
-        raise HTTPException(status_code=500, detail="mahjong_core.is_win error")
-    with rooms_lock:
-        if win:
-            room.status = "finished"
-            event = {"type": "win", "room_id": room_id, "player": player, "hand": room.hands[player]}
-            _broadcast_room(room_id, event)
-            return {"tile": tile, "hand": room.hands[player], "win": True, "winner": player}
-        event = {"type": "draw", "room_id": room_id, "player": player, "tile": tile, "hand_count": len(room.hands[player])}
-        _broadcast_room(room_id, event)
-        return {"tile": tile, "hand": room.hands[player], "must_discard": True, "current_player": room.current_player}
-
-@router.post("/discard_tile")
-def discard_tile(room_id: int, player: str, tile: int):
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room or room.status != "playing":
-            raise HTTPException(status_code=400, detail="Room not playing")
-        if player != room.current_player:
-            raise HTTPException(status_code=400, detail="Not player's turn")
-        if tile not in room.hands[player]:
-            raise HTTPException(status_code=400, detail="Tile not in hand")
-        room.hands[player].remove(tile)
-        room.discards.append([player, tile])
-        room.pending_discard = {"player": player, "tile": tile, "claims": [], "time": time.time()}
-        room.passes = set()
-        next_p = room.next_player()
-        event = {"type": "discard", "room_id": room_id, "player": player, "tile": tile, "pending": True, "next_player": next_p}
-        _broadcast_room(room_id, event)
-    return {"hand": room.hands[player], "next_player": next_p, "deck_count": len(room.deck)}
+        with tracing.span("engine:" + command):
+            outcome = getattr(Engine(room, _core_is_win), command)(*args)
+    except GameError as e:
+        raise HTTPException(status_code=e.status, detail=e.detail)
+    if room.status != status:
+        room_index.update(room)
+    for event in outcome.events:
+        _broadcast_room(room.room_id, event)
+    for (reason, tile), seats in itertools.groupby(outcome.hands, key=lambda h: h[1:]):
+        await _send_hands(room, [player for player, _, _ in seats], reason, tile=tile)
+    _wake_bots(room.room_id)
+    return outcome.result
+
+@_route("GET", "/game_state", GameStateResponse)
+async def game_state(room_id: int, player: Optional[str] = None):
+    # read-only and free of awaits, so it needs no room lock
+    room = rooms.get(room_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return _state_view(room, player)
+
+@_route("POST", "/draw_tile", DrawTileResponse)
+async def draw_tile(room_id: int, player: str):
+    async with _room_lock(room_id):
+        return await _draw_tile(room_id, player)
+
+async def _draw_tile(room_id: int, player: str) -> dict:
+    return await _play(_get_room(room_id), "draw", player)
+
+@_route("POST", "/discard_tile", DiscardTileResponse)
+async def discard_tile(room_id: int, player: str, tile: int):
+    async with _room_lock(room_id):
+        return await _discard_tile(room_id, player, tile)
+
+async def _discard_tile(room_id: int, player: str, tile: int) -> dict:
+    return await _play(_get_room(room_id, 400, "Room not playing"), "discard", player, tile)
 
 # claim endpoint: action in {"chi","peng","gang","hu"}; tiles used param for chi can be passed as csv (optional)
-@router.post("/claim")
-def claim(room_id: int, player: str, action: str, tiles: Optional[str] = None):
-    action = action.lower()
-    if action not in ("chi", "peng", "gang", "hu"):
-        raise HTTPException(status_code=400, detail="Invalid action")
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room or room.pending_discard is None:
-            raise HTTPException(status_code=400, detail="No pending discard")
-        if player not in room.players:
-            raise HTTPException(status_code=400, detail="Player not in room")
-        if player == room.pending_discard["player"]:
-            raise HTTPException(status_code=400, detail="Discarder cannot claim own tile")
-        # record claim with timestamp and distance (for priority)
-        discarder = room.pending_discard["player"]
-        try:
-            idx_disc = room.players.index(discarder)
-            idx_claim = room.players.index(player)
-            n = len(room.players)
-            distance = (idx_claim - idx_disc) % n
-        except ValueError:
-            distance = 999
-        claim_entry = {"player": player, "action": action, "tiles": tiles, "time": time.time(), "distance": distance}
-        room.pending_discard["claims"].append(claim_entry)
-
-        # resolve immediately: pick highest priority (hu>gang>peng>chi), then smallest distance, then earliest time
-        priority_map = {"hu": 4, "gang": 3, "peng": 2, "chi": 1}
-        claims = room.pending_discard["claims"]
-        # sort claims accordingly
-        claims_sorted = sorted(claims, key=lambda c: (-priority_map.get(c["action"], 0), c["distance"], c["time"]))
-        winner = claims_sorted[0]
-        claimant = winner["player"]
-        act = winner["action"]
-
-        tile = room.pending_discard["tile"]
-        # verify claimant has needed tiles and apply action
-        if act == "hu":
-            mc = _ensure_mahjong_core()
-            if mc is None:
-                raise HTTPException(status_code=500, detail="mahjong_core not available")
-            # test hu with claimant's hand + tile
-            temp_hand = list(room.hands[claimant]) + [tile]
-            try:
-                if mc.is_win(temp_hand):
-                    room.status = "finished"
-                    # remove pending discard and mark winner
-                    room.pending_discard = None
-                    room.passes = set()
-                    event = {"type":"hu","room_id":room_id,"player":claimant,"winner":claimant}
-                    _broadcast_room(room_id, event)
-                    return {"win": True, "winner": claimant}
-                else:
-                    # invalid hu claim
-                    return {"detail": "invalid hu claim", "accepted": False}
-            except Exception:
-                logger.exception("mahjong_core.is_win error")
-                raise HTTPException(status_code=500, detail="mahjong_core.is_win error")
-        elif act == "peng":
-            # need two tiles equal to tile in claimant hand
-            cnt = room.hands[claimant].count(tile)
-            if cnt < 2:
-                raise HTTPException(status_code=400, detail="Not enough tiles for peng")
-            # remove two tiles and add meld
-            removed = 0
-            for _ in range(2):
-                room.hands[claimant].remove(tile)
-                removed += 1
-            room.melds[claimant].append({"type": "peng", "tiles": [tile, tile, tile]})
-            # remove discard from discard pile (last occurrence)
-            if room.discards and room.discards[-1][1] == tile:
-                room.discards.pop()
-            # set current player to claimant
-            room.pending_discard = None
-            room.passes = set()
-            room.current_player = claimant
-            event = {"type":"claim","action":"peng","room_id":room_id,"player":claimant,"melds":room.melds[claimant]}
-            _broadcast_room(room_id, event)
-            return {"claimed": "peng", "player": claimant, "melds": room.melds[claimant]}
-        elif act == "chi":
-            # chi only allowed for next player (distance == 1)
-            if winner["distance"] != 1:
-                raise HTTPException(status_code=400, detail="Chi only allowed to next player")
-            # tiles param expected as comma separated integers indicating the two tiles to use
-            if not tiles:
-                raise HTTPException(status_code=400, detail="Chi requires tiles param")
-            try:
-                parts = [int(x.strip()) for x in tiles.split(",")]
-            except Exception:
-                raise HTTPException(status_code=400, detail="Invalid tiles param")
-            if len(parts) != 2:
-                raise HTTPException(status_code=400, detail="Chi requires two tiles")
-            # check those tiles + tile form a sequence
-            seq = sorted(parts + [tile])
-            # simple same-suit check: for suited tiles 1..27 only; honors cannot chi
-            def same_suit(a, b):
-                # suit size 9: 1-9,10-18,19-27
-                if a <= 27 and b <= 27:
-                    return ( (a-1)//9 ) == ( (b-1)//9 )
-                return False
-            if not (same_suit(seq[0], seq[1]) and same_suit(seq[1], seq[2])):
-                raise HTTPException(status_code=400, detail="Chi tiles must be same suit sequence")
-            if not (seq[0]+1 == seq[1] and seq[1]+1 == seq[2]):
-                raise HTTPException(status_code=400, detail="Tiles do not form sequence")
-            # check claimant has the two tiles
-            for t in parts:
-                if t not in room.hands[claimant]:
-                    raise HTTPException(status_code=400, detail="Missing tile for chi")
-            # remove those tiles
-            for t in parts:
-                room.hands[claimant].remove(t)
-            room.melds[claimant].append({"type": "chi", "tiles": seq})
-            if room.discards and room.discards[-1][1] == tile:
-                room.discards.pop()
-            room.pending_discard = None
-            room.passes = set()
-            room.current_player = claimant
-            event = {"type":"claim","action":"chi","room_id":room_id,"player":claimant,"melds":room.melds[claimant]}
-            _broadcast_room(room_id, event)
-            return {"claimed": "chi", "player": claimant, "melds": room.melds[claimant]}
-        elif act == "gang":
-            # check claimant has three tiles equal to tile (exposed kong)
-            cnt = room.hands[claimant].count(tile)
-            if cnt < 3:
-                raise HTTPException(status_code=400, detail="Not enough tiles for gang")
-            # before performing gang, check if anyone else can hu on this tile (rob gang)
-            mc = _ensure_mahjong_core()
-            if mc is None:
-                raise HTTPException(status_code=500, detail="mahjong_core not available")
-            for p in room.players:
-                if p == claimant:
-                    continue
-                temp_hand = list(room.hands[p]) + [tile]
-                try:
-                    if mc.is_win(temp_hand):
-                        # allow other player to hu; we record the potential rob but resolve by higher priority hu claims
-                        # add a placeholder claim for that player with action 'hu' and distance computed
-                        idx_disc = room.players.index(room.pending_discard["player"])
-                        idx_p = room.players.index(p)
-                        distance = (idx_p - idx_disc) % len(room.players)
-                        room.pending_discard["claims"].append({"player": p, "action": "hu", "tiles": None, "time": time.time(), "distance": distance})
-                        # resolve again (recursion safe because we now have added hu claims)
-                        return claim(room_id=room_id, player=p, action="hu")
-                except Exception:
-                    logger.exception("mahjong_core.is_win error during rob gang check")
-                    raise HTTPException(status_code=500, detail="mahjong_core.is_win error")
-            # perform gang
-            for _ in range(3):
-                room.hands[claimant].remove(tile)
-            room.melds[claimant].append({"type": "gang", "tiles": [tile]*4})
-            if room.discards and room.discards[-1][1] == tile:
-                room.discards.pop()
-            room.pending_discard = None
-            room.passes = set()
-            # claimant gets turn to draw after kong (current_player set to claimant)
-            room.current_player = claimant
-            event = {"type":"claim","action":"gang","room_id":room_id,"player":claimant,"melds":room.melds[claimant]}
-            _broadcast_room(room_id, event)
-            return {"claimed": "gang", "player": claimant, "melds": room.melds[claimant]}
-
-@router.post("/pass_claim")
-def pass_claim(room_id: int, player: str):
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room or room.pending_discard is None:
-            raise HTTPException(status_code=400, detail="No pending discard")
-        if player not in room.players:
-            raise HTTPException(status_code=400, detail="Player not in room")
-        room.passes.add(player)
-        # notify others of pass
-        _broadcast_room(room_id, {"type": "pass", "room_id": room_id, "player": player, "passes": list(room.passes)})
-        discarder = room.pending_discard["player"]
-        others = set(room.players) - {discarder}
-        if room.passes.issuperset(others):
-            room.pending_discard = None
-            room.passes = set()
-            _broadcast_room(room_id, {"type": "pending_cleared", "room_id": room_id, "reason": "all_passed"})
-            return {"passed": True, "resolved": "no_claims"}
-    return {"passed": True, "resolved": "waiting_other_passes"}
+@_route("POST", "/claim", ClaimResponse)
+async def claim(room_id: int, player: str, action: str, tiles: Optional[str] = None):
+    async with _room_lock(room_id):
+        return await _claim(room_id, player, action, tiles)
+
+async def _claim(room_id: int, player: str, action: str, tiles: Optional[str] = None) -> dict:
+    return await _play(_get_room(room_id, 400, "No pending discard"), "claim", player, action, tiles)
+
+@_route("POST", "/pass_claim", PassClaimResponse)
+async def pass_claim(room_id: int, player: str):
+    async with _room_lock(room_id):
+        return await _pass_claim(room_id, player)
+
+async def _pass_claim(room_id: int, player: str) -> dict:
+    return await _play(_get_room(room_id, 400, "No pending discard"), "pass_claim", player)
 
 # admin auth dependency
 def require_admin(request: Request, x_admin_token: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
@@ -360,167 +316,389 @@ def require_admin(request: Request, x_admin_token: Optional[str] = Header(None),
     if provided != token_required:
         raise HTTPException(status_code=401, detail="admin token required or invalid")
 
-# Protect admin set_hand route (example)
-@router.post("/admin/set_hand")
-def admin_set_hand(room_id: int, player: str, tiles: List[int], _auth=Depends(require_admin)):
-    """Test helper: set a player's hand explicitly (dev only)."""
-    with rooms_lock:
-        room = rooms.get(room_id)
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
-        if player not in room.players:
-            raise HTTPException(status_code=400, detail="Player not in room")
-        room.hands[player] = tiles[:]
-    return {"room_id": room_id, "player": player, "hand_count": len(room.hands[player])}
+def _observer_allowed(app, provided: Optional[str]) -> bool:
+    """Observer streams (unbound websockets, spectators, SSE) need the admin token when one is set.
 
-# WebSocket: validate token on connect (query param or header)
-@router.websocket("/ws/{room_id}")
-async def websocket_room(ws: WebSocket, room_id: int):
-    # accept first to access query params or headers
-    await ws.accept()
-    # get configured token
-    settings = ws.scope.get("app").state.settings
-    token_required = getattr(settings, "admin_token", None)
-    # token may be supplied as ?token=... or header x-admin-token or authorization
-    q = ws.query_params
-    provided = q.get("token")
-    if not provided:
-        # headers available in ASGI scope: list of (bytes, bytes)
-        headers = {}
-        for k, v in ws.scope.get("headers", []):
-            try:
-                headers[k.decode()] = v.decode()
-            except Exception:
-                # ignore undecodable header
-                continue
-        # try x-admin-token or authorization
-        provided = headers.get("x-admin-token") or headers.get("authorization")
+    `provided` comes from ?token=, X-Admin-Token or Authorization (with or without "Bearer ").
+    """
+    token_required = getattr(app.state.settings, "admin_token", None)
+    if not token_required:
+        return True
     if provided and provided.lower().startswith("bearer "):
         provided = provided.split(None, 1)[1]
-    if token_required and provided != token_required:
-        # unauthorized: close websocket
-        try:
-            await ws.close(code=1008)
-        except Exception:
-            pass
-        return
+    return provided == token_required
 
-    # existing connection handling...
-    rid = int(room_id)
-    room_connections.setdefault(rid, {})[ws] = time.time()
-    try:
-        while True:
-            try:
-                msg = await ws.receive_text()
-            except WebSocketDisconnect:
-                break
-            except Exception:
-                room_connections.get(rid, {})[ws] = time.time()
-                await asyncio.sleep(0.1)
-                continue
-            # update last activity timestamp
-            room_connections.get(rid, {})[ws] = time.time()
-            # respond to simple heartbeat pings from client
-            if msg == "ping":
-                try:
-                    await ws.send_text("pong")
-                except Exception:
-                    pass
-    finally:
-        room_connections.get(rid, {}).pop(ws, None)
+# Protect admin set_hand route (example)
+@_route("POST", "/admin/set_hand", SetHandResponse)
+async def admin_set_hand(room_id: int, player: str, tiles: List[int], _auth=Depends(require_admin)):
+    """Test helper: set a player's hand explicitly (dev only)."""
+    async with _room_lock(room_id):
+        return await _admin_set_hand(room_id, player, tiles)
+
+async def _admin_set_hand(room_id: int, player: str, tiles: List[int]) -> dict:
+    return await _play(_get_room(room_id), "set_hand", player, tiles)
+
+def configure_tracing(rate: Optional[float] = None, path: Optional[str] = None,
+                      max_bytes: Optional[int] = None, backups: Optional[int] = None):
+    tracer.configure(rate=rate, path=path, max_bytes=max_bytes, backups=backups)
+
+def configure_lock_profiling(enabled: Optional[bool] = None, samples: Optional[int] = None):
+    lock_profiler.configure(enabled=enabled, samples=samples)
+
+@_route("GET", "/admin/locks", LockProfileResponse)
+async def admin_lock_profile(_auth=Depends(require_admin)):
+    """Lock wait/hold percentiles per call site, most total wait first."""
+    return lock_profiler.report()
+
+@_route("POST", "/admin/locks", LockProfileResponse)
+async def admin_configure_lock_profile(enabled: Optional[bool] = None, reset: bool = False,
+                                       samples: Optional[int] = Query(None, ge=1, le=1000000),
+                                       _auth=Depends(require_admin)):
+    """Turn lock profiling on or off and/or clear what it has collected."""
+    lock_profiler.configure(enabled=enabled, samples=samples, reset=reset)
+    return lock_profiler.report()
+
+# one capture at a time, on its own thread; the event loop is labelled in set_event_loop
+sampler = StackSampler()
+
+@router.get("/admin/profile")
+async def admin_profile(seconds: float = Query(5.0, gt=0, le=60), hz: float = Query(100.0, gt=0, le=1000),
+                        idle: bool = False, _auth=Depends(require_admin)):
+    """Sample every thread for `seconds` at `hz`; returns collapsed stacks for flame graphs.
+
+    Stacks idling in the selector or a pool queue are left out unless idle=true.
+    """
+    if sampler.busy:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    loop = asyncio.get_event_loop()
+    done = loop.create_future()
+
+    def settle(result=None, error=None):
+        if done.done():
+            return
+        if error is not None:
+            done.set_exception(error)
+        else:
+            done.set_result(result)
+
+    def run():
+        try:
+            result = sampler.capture(seconds, hz, idle)
+        except Exception as e:
+            loop.call_soon_threadsafe(settle, None, e)
+        else:
+            loop.call_soon_threadsafe(settle, result)
+    threading.Thread(target=run, name="profile-sampler", daemon=True).start()
+    result = await done
+    if result is None:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    headers = {"X-Profile-Ticks": str(result["ticks"]), "X-Profile-Seconds": "%.3f" % result["seconds"]}
+    return Response(collapsed(result["stacks"]), media_type="text/plain; charset=utf-8", headers=headers)
 
 # pending discard timeout defaults (kept for fallback if app does not call start_pending_cleanup)
 PENDING_DISCARD_TIMEOUT = float(os.getenv("MJ_PENDING_DISCARD_TIMEOUT", 10))
 _PENDING_CLEANUP_INTERVAL = float(os.getenv("MJ_PENDING_CLEANUP_INTERVAL", 1.0))
-_pending_cleanup_thread: Optional[threading.Thread] = None
-_pending_cleanup_stop_event: Optional[threading.Event] = None
+_pending_cleanup_task: Optional[asyncio.Future] = None
 
-def _pending_cleanup_loop(stop_event: threading.Event, interval: float, timeout: float):
-    logger.info("Pending-discard cleanup thread started (interval=%s, timeout=%s)", interval, timeout)
-    while not stop_event.is_set():
-        try:
-            # wait with timeout so we can stop quickly when requested
-            stopped = stop_event.wait(interval)
-            if stopped:
-                break
-            now = time.time()
-            with rooms_lock:
+async def _pending_cleanup_loop(interval: float, timeout: float):
+    logger.info("Pending-discard cleanup task started (interval=%s, timeout=%s)", interval, timeout)
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                now = time.time()
                 for room in list(rooms.values()):
                     pd = room.pending_discard
-                    if pd is None:
+                    if pd is None or now - pd.get("time", 0) <= timeout:
                         continue
-                    ts = pd.get("time", 0)
-                    if now - ts > timeout:
-                        logger.info("Clearing pending_discard for room %s (tile=%s) due to timeout", room.room_id, pd.get("tile"))
-                        room.pending_discard = None
-                        room.passes = set()
+                    async with _room_lock(room.room_id):
+                        # re-check: a claim may have resolved it while we waited for the lock
+                        outcome = Engine(room).expire_pending(now, timeout)
+                        if outcome is None:
+                            continue
+                        logger.info("Clearing pending_discard for room %s (tile=%s) due to timeout",
+                                    room.room_id, outcome.result["tile"])
+                        PENDING_EXPIRED.inc()
                         # notify connected clients
-                        _broadcast_room(room.room_id, {"type": "pending_cleared", "room_id": room.room_id, "reason": "timeout"})
-        except Exception:
-            logger.exception("Exception in pending-discard cleanup loop")
-    logger.info("Pending-discard cleanup thread exiting")
+                        for event in outcome.events:
+                            _broadcast_room(room.room_id, event)
+                        # the turn may have passed to a bot seat
+                        _wake_bots(room.room_id)
+            except Exception:
+                logger.exception("Exception in pending-discard cleanup loop")
+    except asyncio.CancelledError:
+        pass
+    logger.info("Pending-discard cleanup task exiting")
 
 def start_pending_cleanup(interval: Optional[float] = None, timeout: Optional[float] = None):
-    """Start background thread to clear stale pending_discard entries.
+    """Start the event-loop task that clears stale pending_discard entries.
 
-    If interval/timeout are None the module defaults or env values are used.
+    Must be called on the event loop thread. If interval/timeout are None the
+    module defaults or env values are used.
     """
-    global _pending_cleanup_thread, _pending_cleanup_stop_event
-    if _pending_cleanup_thread and _pending_cleanup_thread.is_alive():
+    global _pending_cleanup_task
+    if _pending_cleanup_task and not _pending_cleanup_task.done():
         return
     if interval is None:
         interval = _PENDING_CLEANUP_INTERVAL
     if timeout is None:
         timeout = PENDING_DISCARD_TIMEOUT
-    _pending_cleanup_stop_event = threading.Event()
-    _pending_cleanup_thread = threading.Thread(target=_pending_cleanup_loop, args=(_pending_cleanup_stop_event, interval, timeout), daemon=True)
-    _pending_cleanup_thread.start()
-
-def stop_pending_cleanup(timeout: float = 2.0):
-    """Stop the background cleanup thread, waiting up to `timeout` seconds."""
-    global _pending_cleanup_thread, _pending_cleanup_stop_event
-    if _pending_cleanup_stop_event:
-        _pending_cleanup_stop_event.set()
-    if _pending_cleanup_thread:
-        _pending_cleanup_thread.join(timeout)
-    _pending_cleanup_thread = None
-    _pending_cleanup_stop_event = None
+    _pending_cleanup_task = asyncio.ensure_future(_pending_cleanup_loop(interval, timeout))
+
+def stop_pending_cleanup():
+    """Cancel the cleanup task (must be called on the event loop thread)."""
+    global _pending_cleanup_task
+    if _pending_cleanup_task:
+        _pending_cleanup_task.cancel()
+    _pending_cleanup_task = None
 
 def restart_pending_cleanup(interval: Optional[float] = None, timeout: Optional[float] = None):
-    """Restart cleanup thread with new parameters."""
+    """Restart cleanup task with new parameters."""
     stop_pending_cleanup()
     start_pending_cleanup(interval=interval, timeout=timeout)
 
 # websocket support / broadcast
 # room websocket connections: room_id -> { websocket: last_activity_ts }
+# (mutated only on the event loop thread; other threads copy before iterating)
 room_connections: Dict[int, Dict[WebSocket, float]] = {}
+# per-room event sequence and bounded replay buffer of (seq, target_player, event)
+EVENT_BUFFER_SIZE = int(os.getenv("MJ_EVENT_BUFFER_SIZE", 256))
+room_seq: Dict[int, int] = {}
+room_event_log: Dict[int, Deque[Tuple[int, Optional[str], dict]]] = {}
+# spectator tier: room_id -> publisher task fanning public events out to watchers
+# (only touched on the event loop thread)
+spectator_publishers: Dict[int, SpectatorPublisher] = {}
+SPECTATOR_DELAY = float(os.getenv("MJ_SPECTATOR_DELAY", 0.0))
+SPECTATOR_COALESCE = float(os.getenv("MJ_SPECTATOR_COALESCE", 0.05))
+SPECTATOR_CONCURRENCY = int(os.getenv("MJ_SPECTATOR_CONCURRENCY", 64))
+SPECTATOR_SEND_TIMEOUT = float(os.getenv("MJ_SPECTATOR_SEND_TIMEOUT", 5.0))
+# SSE observers: room_id -> channel of pre-encoded public event frames
+# (only touched on the event loop thread)
+sse_channels: Dict[int, EventChannel] = {}
+SSE_BUFFER_SIZE = int(os.getenv("MJ_SSE_BUFFER_SIZE", 64))
+SSE_KEEPALIVE = float(os.getenv("MJ_SSE_KEEPALIVE", 15.0))
+# websocket heartbeat: server pings after WS_PING_INTERVAL of silence and
+# closes sockets silent for WS_IDLE_TIMEOUT
+WS_PING_INTERVAL = float(os.getenv("MJ_WS_PING_INTERVAL", 10.0))
+WS_IDLE_TIMEOUT = float(os.getenv("MJ_WS_IDLE_TIMEOUT", 30.0))
 _loop: Optional[asyncio.AbstractEventLoop] = None
 
 def set_event_loop(loop: asyncio.AbstractEventLoop):
+    """Record the server loop; must be called on the loop's thread."""
     global _loop
     _loop = loop
+    sampler.names[threading.get_ident()] = "event-loop"
+
+def configure_ws_idle(ping_interval: Optional[float] = None, idle_timeout: Optional[float] = None):
+    """Set websocket heartbeat parameters (picked up by each receive)."""
+    global WS_PING_INTERVAL, WS_IDLE_TIMEOUT
+    if ping_interval is not None:
+        WS_PING_INTERVAL = max(0.1, float(ping_interval))
+    if idle_timeout is not None:
+        WS_IDLE_TIMEOUT = max(0.1, float(idle_timeout))
+
+def configure_spectators(delay: Optional[float] = None, coalesce: Optional[float] = None,
+                         concurrency: Optional[int] = None, send_timeout: Optional[float] = None):
+    """Set spectator publisher parameters (applies to publishers started afterwards)."""
+    global SPECTATOR_DELAY, SPECTATOR_COALESCE, SPECTATOR_CONCURRENCY, SPECTATOR_SEND_TIMEOUT
+    if delay is not None:
+        SPECTATOR_DELAY = max(0.0, float(delay))
+    if coalesce is not None:
+        SPECTATOR_COALESCE = max(0.0, float(coalesce))
+    if concurrency is not None:
+        SPECTATOR_CONCURRENCY = max(1, int(concurrency))
+    if send_timeout is not None:
+        SPECTATOR_SEND_TIMEOUT = float(send_timeout)
+
+def set_event_buffer_size(size: int):
+    """Change the per-room replay buffer length (applies to rooms created afterwards)."""
+    global EVENT_BUFFER_SIZE
+    EVENT_BUFFER_SIZE = max(1, int(size))
+
+def _record_event(room_id: int, event: dict, player: Optional[str] = None):
+    """Stamp `event` with the next room seq and append it to the ring buffer.
+
+    Runs on the event loop thread (handlers hold the room's lock). `player`
+    marks private events so replays only deliver them to that seat.
+    """
+    seq = room_seq.get(room_id, 0) + 1
+    room_seq[room_id] = seq
+    event["seq"] = seq
+    log = room_event_log.get(room_id)
+    if log is None:
+        log = room_event_log[room_id] = deque(maxlen=EVENT_BUFFER_SIZE)
+    log.append((seq, player, event))
+
+def _resume_events(room: Room, player: Optional[str], since: Optional[int]) -> List[dict]:
+    """Events a (re)connecting socket needs to catch up from `since`."""
+    rid = room.room_id
+    current = room_seq.get(rid, 0)
+    if since is None:
+        # fresh connection: seat sockets start from their private view
+        return [_hand_event(room, player, "connect")] if player else []
+    if since == current:
+        return []
+    log = room_event_log.get(rid)
+    if log and 0 <= since < current and log[0][0] <= since + 1:
+        return [e for seq, target, e in log if seq > since and target in (None, player)]
+    # gap older than the buffer (or a seq from another server run)
+    events = [{"type": "snapshot", "room_id": rid, "seq": current, "state": _state_view(room, player)}]
+    if player:
+        events.append(_hand_event(room, player, "snapshot"))
+    return events
 
 def _broadcast_room(room_id: int, event: dict):
+    """Send a public event to every connection in the room."""
+    captured = _batch_events.get(room_id)
+    if captured is not None:
+        captured.append((None, event))
+        return
+    t0 = time.perf_counter()
+    _record_event(room_id, event)
+    channel = sse_channels.get(room_id)
+    if channel is not None:
+        channel.publish(event)
+    if _loop is not None and room_id in spectator_publishers:
+        _loop.call_soon_threadsafe(_push_spectators, room_id, event)
     conns = room_connections.get(room_id, {}).copy()
-    if not conns or _loop is None:
+    if conns and _loop is not None:
+        # encode once per wire format, not once per connection
+        players = _room_players(room_id)
+        frames = {}
+        for ws in list(conns.keys()):
+            _send_ws(room_id, ws, _encode_for(ws, event, players, frames))
+    elapsed = time.perf_counter() - t0
+    BROADCAST_SECONDS.observe(elapsed, "room")
+    tracing.add_span("broadcast", t0, elapsed)
+
+def _send_player(room_id: int, player: str, event: dict):
+    """Send a private event only to the connections bound to `player`'s seat."""
+    captured = _batch_events.get(room_id)
+    if captured is not None:
+        captured.append((player, event))
         return
-    for ws in list(conns.keys()):
-        try:
-            asyncio.run_coroutine_threadsafe(ws.send_json(event), _loop)
-        except Exception:
-            logger.exception("Failed to send websocket message, removing connection")
-            room_connections.get(room_id, {}).pop(ws, None)
+    t0 = time.perf_counter()
+    _record_event(room_id, event, player)
+    conns = room_connections.get(room_id, {}).copy()
+    if conns and _loop is not None:
+        players = _room_players(room_id)
+        frames = {}
+        for ws in list(conns.keys()):
+            if getattr(ws.state, "player", None) == player:
+                _send_ws(room_id, ws, _encode_for(ws, event, players, frames))
+    elapsed = time.perf_counter() - t0
+    BROADCAST_SECONDS.observe(elapsed, "player")
+    tracing.add_span("send_player", t0, elapsed)
+
+def _room_players(room_id: int) -> List[str]:
+    room = rooms.get(room_id)
+    return room.players if room else []
+
+def _encode_for(ws: WebSocket, event: dict, players: List[str], cache: Optional[dict] = None):
+    """Encode `event` in the wire format negotiated by `ws` (cached per format in `cache`)."""
+    encoding = getattr(ws.state, "encoding", "json")
+    if cache is not None and encoding in cache:
+        return cache[encoding]
+    if encoding == "binary":
+        frame = codec.encode_binary(event, players)
+    else:
+        frame = codec.encode_json(event)
+    if cache is not None:
+        cache[encoding] = frame
+    return frame
+
+async def _send_frame(ws: WebSocket, frame):
+    if isinstance(frame, bytes):
+        await ws.send_bytes(frame)
+    else:
+        await ws.send_text(frame)
+
+def _send_ws(room_id: int, ws: WebSocket, frame):
+    if _loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_send_frame(ws, frame), _loop)
+    except Exception:
+        # removal happens on the loop thread, where the receive loop owns the socket
+        logger.exception("Failed to send websocket message, removing connection")
+        _loop.call_soon_threadsafe(_drop_connection, room_id, ws)
+
+def _hand_event(room: Room, player: str, reason: str, tile: Optional[int] = None,
+                waits: Optional[List[int]] = None) -> dict:
+    """Private view of a seat: concealed hand, melds and current wait set.
+
+    The wait set is computed inline unless the caller already has it.
+    """
+    hand = list(room.hands.get(player, []))
+    if waits is None:
+        if not _core_bound:
+            _bind_core()
+        waits = _wait_set(_core_view, hand)
+    event = {"type": "hand", "room_id": room.room_id, "player": player, "reason": reason,
+             "hand": hand, "melds": list(room.melds.get(player, [])), "waits": waits}
+    if tile is not None:
+        event["tile"] = tile
+    return event
+
+async def _send_hands(room: Room, players: List[str], reason: str, tile: Optional[int] = None):
+    """Send each of `players` their hand event, computing wait sets off the loop."""
+    if not _core_bound:
+        _bind_core()
+    waits = await native.run(_wait_sets, _core_view, [list(room.hands.get(p, [])) for p in players])
+    bots = room_bots.get(room.room_id)
+    for p, w in zip(players, waits):
+        if bots and p in bots:
+            bots[p].cache_waits(room.hands.get(p, []), w)
+        _send_player(room.room_id, p, _hand_event(room, p, reason, tile, waits=w))
 
 @router.websocket("/ws/{room_id}")
 async def websocket_room(ws: WebSocket, room_id: int):
-    """WebSocket endpoint for room events. Clients receive JSON events."""
+    """WebSocket endpoint for room events. Clients receive JSON events.
+
+    Connect with ?player=<name>&seat_token=<token> (token returned by
+    create_room/join_room) to bind the socket to a seat; bound sockets also
+    receive private "hand" events for that seat. Unbound sockets only get
+    public events and are subject to the admin token check.
+
+    Every event carries a per-room "seq". Reconnect with ?since=<last seq>
+    to replay missed events; if the gap is older than the event buffer a
+    "snapshot" event with the full (masked) state is sent instead.
+
+    Seat-bound sockets may also send game commands, see _handle_command.
+
+    ?role=spectator joins the spectator tier instead: a read-only, coalesced
+    and optionally delayed public stream (events may arrive wrapped in a
+    "batch" event).
+
+    Offering the "mahjong.bin.v1" subprotocol switches events to the compact
+    binary encoding in services/codec.py; JSON text frames are the default.
+    """
     # accept first to access query params or headers
-    await ws.accept()
-    # get configured token
-    settings = ws.scope.get("app").state.settings
-    token_required = getattr(settings, "admin_token", None)
-    # token may be supplied as ?token=... or header x-admin-token or authorization
+    subprotocol = codec.negotiate(ws.scope.get("subprotocols", []))
+    await ws.accept(subprotocol=subprotocol)
+    rid = int(room_id)
     q = ws.query_params
+    ws.state.player = None
+    ws.state.encoding = "binary" if subprotocol == codec.BINARY_SUBPROTOCOL else "json"
+    try:
+        since = int(q["since"]) if q.get("since") is not None else None
+    except ValueError:
+        since = -1  # unparseable offset -> force a snapshot
+    player = q.get("player")
+    if player:
+        with rooms_lock:
+            room = rooms.get(rid)
+            authorized = bool(room) and room.check_seat_token(player, q.get("seat_token"))
+        if not authorized:
+            try:
+                await ws.close(code=1008)
+            except Exception:
+                pass
+            return
+        ws.state.player = player
+        await _serve_ws(ws, rid, since)
+        return
+    # token may be supplied as ?token=... or header x-admin-token or authorization
     provided = q.get("token")
     if not provided:
         # headers available in ASGI scope: list of (bytes, bytes)
@@ -533,96 +711,715 @@ async def websocket_room(ws: WebSocket, room_id: int):
                 continue
         # try x-admin-token or authorization
         provided = headers.get("x-admin-token") or headers.get("authorization")
-    if provided and provided.lower().startswith("bearer "):
-        provided = provided.split(None, 1)[1]
-    if token_required and provided != token_required:
+    if not _observer_allowed(ws.scope.get("app"), provided):
         # unauthorized: close websocket
         try:
             await ws.close(code=1008)
         except Exception:
             pass
         return
+    if q.get("role") == "spectator":
+        await _serve_spectator(ws, rid, since)
+        return
+    await _serve_ws(ws, rid, since)
 
-    # existing connection handling...
-    rid = int(room_id)
+async def _serve_ws(ws: WebSocket, rid: int, since: Optional[int] = None):
+    # register and queue the catch-up events without awaiting: events are only
+    # recorded on the loop thread, so none can slip between replay and live stream
     room_connections.setdefault(rid, {})[ws] = time.time()
+    if ws.state.player:
+        _release_seat(rid, ws.state.player)
+    room = rooms.get(rid)
+    if room is not None:
+        events = _resume_events(room, ws.state.player, since)
+        if ws.state.encoding == "binary":
+            # binary frames carry seat indexes; tell the client the seat order
+            events.insert(0, {"type": "seats", "room_id": rid, "players": list(room.players)})
+        for event in events:
+            _send_ws(rid, ws, _encode_for(ws, event, room.players))
     try:
-        while True:
+        async for msg in _iter_messages(ws):
+            # update last activity timestamp
+            room_connections.get(rid, {})[ws] = time.time()
             try:
-                msg = await ws.receive_text()
-            except WebSocketDisconnect:
+                reply = await _handle_command(rid, ws.state.player, msg)
+                await _send_frame(ws, _encode_for(ws, reply, _room_players(rid)))
+            except Exception:
                 break
+    finally:
+        _drop_connection(rid, ws)
+        if ws.state.player:
+            _seat_left(rid, ws.state.player)
+
+def _rooms_by_status() -> Dict[tuple, int]:
+    return {(status,): len(ids) for status, ids in room_index.status_ids.items()}
+
+def _connections_by_room() -> Dict[tuple, int]:
+    return {(rid,): len(conns) for rid, conns in list(room_connections.items())}
+
+metrics.registry.gauge("mahjong_rooms", "Rooms by status.", ("status",), _rooms_by_status)
+metrics.registry.gauge("mahjong_ws_connections", "Open websocket connections per room (players and admins).",
+                       ("room_id",), _connections_by_room)
+
+def _drop_connection(rid: int, ws: WebSocket):
+    conns = room_connections.get(rid)
+    if conns is None:
+        return
+    conns.pop(ws, None)
+    if not conns:
+        room_connections.pop(rid, None)
+
+async def _iter_messages(ws: WebSocket):
+    """Yield the text of each client frame until the socket closes or goes idle.
+
+    Each receive waits at most WS_PING_INTERVAL; on silence the server sends
+    "ping" (clients answer "pong"), and a peer silent for WS_IDLE_TIMEOUT is
+    closed. Client "ping" heartbeats are answered here. Idle detection runs on
+    the event loop with the connection's own task, so there is no separate
+    scanner thread touching room_connections.
+    """
+    loop = asyncio.get_event_loop()
+    last = loop.time()
+    while True:
+        timeout = max(0.0, min(WS_PING_INTERVAL, last + WS_IDLE_TIMEOUT - loop.time()))
+        try:
+            message = await asyncio.wait_for(ws.receive(), timeout)
+        except asyncio.TimeoutError:
+            try:
+                if loop.time() - last >= WS_IDLE_TIMEOUT:
+                    logger.info("Closing idle websocket")
+                    await ws.close(code=1001)
+                    return
+                await ws.send_text("ping")
+            except Exception:
+                return
+            continue
+        except WebSocketDisconnect:
+            return
+        except Exception:
+            return
+        if message["type"] == "websocket.disconnect":
+            return
+        last = loop.time()
+        msg = message.get("text")
+        if msg is None and message.get("bytes") is not None:
+            msg = message["bytes"].decode("utf-8", "replace")
+        if not msg or msg == "pong":
+            continue
+        if msg == "ping":
+            try:
+                await ws.send_text("pong")
             except Exception:
-                room_connections.get(rid, {})[ws] = time.time()
-                await asyncio.sleep(0.1)
+                return
+            continue
+        yield msg
+
+def _push_spectators(room_id: int, event: dict):
+    pub = spectator_publishers.get(room_id)
+    if pub is not None:
+        pub.push(event)
+
+def _spectator_catch_up(rid: int, ws: WebSocket, since: Optional[int], released: int) -> List[dict]:
+    """Catch-up frames for a spectator: only public events already released to the tier."""
+    with rooms_lock:
+        room = rooms.get(rid)
+        if room is None:
+            return []
+        events = []
+        if ws.state.encoding == "binary":
+            events.append({"type": "seats", "room_id": rid, "players": list(room.players)})
+        if since is None or since == released:
+            return events
+        log = room_event_log.get(rid)
+        if log and 0 <= since < released and log[0][0] <= since + 1:
+            events.extend(e for seq, target, e in log if target is None and since < seq <= released)
+        elif SPECTATOR_DELAY <= 0:
+            # a snapshot would reveal undelayed state, so only send it without a delay
+            events.append({"type": "snapshot", "room_id": rid, "seq": room_seq.get(rid, 0),
+                           "state": _state_view(room)})
+        return events
+
+async def _serve_spectator(ws: WebSocket, rid: int, since: Optional[int]):
+    pub = spectator_publishers.get(rid)
+    if pub is None:
+        pub = SpectatorPublisher(
+            rid,
+            encode=lambda w, event, cache: _encode_for(w, event, _room_players(rid), cache),
+            send=_send_frame,
+            catch_up=functools.partial(_spectator_catch_up, rid),
+            delay=SPECTATOR_DELAY, coalesce=SPECTATOR_COALESCE,
+            concurrency=SPECTATOR_CONCURRENCY, send_timeout=SPECTATOR_SEND_TIMEOUT)
+        with rooms_lock:
+            # everything before the publisher existed counts as released
+            pub.released_seq = room_seq.get(rid, 0)
+        spectator_publishers[rid] = pub
+    pub.join(ws, since)
+    try:
+        # spectators are read-only; anything but heartbeats is ignored
+        async for _ in _iter_messages(ws):
+            pass
+    finally:
+        pub.leave(ws)
+        if pub.idle() and spectator_publishers.get(rid) is pub:
+            pub.close()
+            del spectator_publishers[rid]
+
+def _snapshot_event(room: Room) -> dict:
+    return {"type": "snapshot", "room_id": room.room_id, "seq": room_seq.get(room.room_id, 0),
+            "state": _state_view(room)}
+
+async def _sse_stream(room: Room, since: Optional[int]):
+    rid = room.room_id
+    channel = sse_channels.get(rid)
+    if channel is None:
+        channel = sse_channels[rid] = EventChannel(rid, room_seq.get(rid, 0), SSE_BUFFER_SIZE)
+    channel.observers += 1
+    try:
+        # catch-up and cursor are taken together, before the first await
+        events = _resume_events(room, None, since) if since is not None else [_snapshot_event(room)]
+        cursor = room_seq.get(rid, 0)
+        yield b"retry: 2000\n\n" + b"".join(format_event(e["seq"], e) for e in events)
+        while True:
+            if not await channel.wait(cursor, SSE_KEEPALIVE):
+                # comment line: keeps proxies from timing out an idle stream
+                yield b": keepalive\n\n"
                 continue
-            # update last activity timestamp
-            room_connections.get(rid, {})[ws] = time.time()
-            # respond to simple heartbeat pings from client
-            if msg == "ping":
-                try:
-                    await ws.send_text("pong")
-                except Exception:
-                    pass
+            frames = channel.since(cursor)
+            if frames is None:
+                # fell behind the shared ring: start over from a snapshot
+                snapshot = _snapshot_event(room)
+                cursor = snapshot["seq"]
+                yield format_event(cursor, snapshot)
+                continue
+            cursor = channel.seq
+            yield b"".join(frames)
     finally:
-        room_connections.get(rid, {}).pop(ws, None)
+        channel.observers -= 1
+        if not channel.observers and sse_channels.get(rid) is channel:
+            del sse_channels[rid]
 
-# websocket cleanup thread (close idle connections)
-_ws_cleanup_thread: Optional[threading.Thread] = None
-_ws_cleanup_stop_event: Optional[threading.Event] = None
+@router.get("/{room_id}/events")
+async def room_events(room_id: int, request: Request, last_event_id: Optional[int] = None,
+                      token: Optional[str] = None):
+    """Server-Sent Events stream of a room's public events for read-only observers.
 
-def _ws_cleanup_loop(stop_event: threading.Event, interval: float, timeout: float):
-    logger.info("WS cleanup thread started (interval=%s, idle_timeout=%s)", interval, timeout)
-    while not stop_event.is_set():
+    Each event's id is the room seq. A fresh stream starts with a "snapshot"
+    event; reconnecting with Last-Event-ID (or ?last_event_id= for clients
+    that can't set headers) replays the public events missed since, or sends
+    a snapshot when the gap is older than the replay buffer. When an admin
+    token is configured it is required, as for websocket observers (?token=,
+    since EventSource can't set headers either).
+    """
+    provided = token or request.headers.get("x-admin-token") or request.headers.get("authorization")
+    if not _observer_allowed(request.app, provided):
+        raise HTTPException(status_code=401, detail="admin token required or invalid")
+    room = rooms.get(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    header = request.headers.get("last-event-id")
+    if header:
         try:
-            stopped = stop_event.wait(interval)
-            if stopped:
-                break
-            now = time.time()
-            to_close = []
-            for rid, conns in list(room_connections.items()):
-                for ws, last in list(conns.items()):
-                    if now - last > timeout:
-                        to_close.append((rid, ws))
-            for rid, ws in to_close:
-                logger.info("Closing stale websocket for room %s", rid)
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+    return StreamingResponse(_sse_stream(room, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# command protocol: {"cmd": <name>, "args": {...}}, shared by websocket
+# commands ({"id": <any>} is echoed in the reply so clients can correlate it)
+# and POST /{room_id}/batch. Commands run the lock-free bodies of the HTTP
+# handlers; callers hold the room lock.
+def _claim_command(rid: int, player: str, args: dict):
+    tiles = args.get("tiles")
+    if isinstance(tiles, (list, tuple)):
+        tiles = ",".join(str(t) for t in tiles)
+    return _claim(rid, player, str(args["action"]), tiles)
+
+_COMMANDS = {
+    "draw_tile": lambda rid, player, args: _draw_tile(rid, player),
+    "discard_tile": lambda rid, player, args: _discard_tile(rid, player, int(args["tile"])),
+    "claim": _claim_command,
+    "pass_claim": lambda rid, player, args: _pass_claim(rid, player),
+    "game_state": lambda rid, player, args: game_state(room_id=rid, player=player),
+}
+# commands that only read public state and may be sent on unbound sockets
+_WS_PUBLIC_COMMANDS = {"game_state"}
+
+async def _apply_command(rid: int, player: Optional[str], cmd, args) -> dict:
+    """Run one command; returns {"ok": True, "result"} or {"ok": False, "status", "detail"}."""
+    handler = _COMMANDS.get(cmd)
+    if handler is None:
+        return {"ok": False, "status": 400, "detail": "Unknown command"}
+    if not isinstance(args, dict):
+        return {"ok": False, "status": 400, "detail": "args must be an object"}
+    try:
+        return {"ok": True, "result": await handler(rid, player, args)}
+    except HTTPException as e:
+        return {"ok": False, "status": e.status_code, "detail": e.detail}
+    except (KeyError, TypeError, ValueError) as e:
+        return {"ok": False, "status": 400, "detail": "Invalid args: %s" % e}
+    except Exception:
+        logger.exception("command %s failed", cmd)
+        return {"ok": False, "status": 500, "detail": "Internal error"}
+
+async def _handle_command(rid: int, player: Optional[str], raw: str) -> dict:
+    try:
+        request = json.loads(raw)
+    except ValueError:
+        return {"type": "reply", "id": None, "ok": False, "status": 400, "detail": "Invalid JSON command"}
+    if not isinstance(request, dict):
+        return {"type": "reply", "id": None, "ok": False, "status": 400, "detail": "Command must be an object"}
+    cmd = request.get("cmd")
+    reply = {"type": "reply", "id": request.get("id"), "cmd": cmd}
+    if player is None and cmd in _COMMANDS and cmd not in _WS_PUBLIC_COMMANDS:
+        reply.update(ok=False, status=403, detail="Socket is not bound to a seat")
+        return reply
+    started = tracer.start("ws_command", {"cmd": cmd, "room_id": rid, "player": player} if tracer.rate else None)
+    try:
+        async with _room_lock(rid):
+            reply.update(await _apply_command(rid, player, cmd, request.get("args") or {}))
+    finally:
+        if started is not None:
+            tracer.finish(started, reply.get("status", 200))
+    return reply
+
+# batch actions: events raised while a batch runs are captured per room and
+# flushed as one coalesced "batch" event when it commits
+BATCH_MAX_ACTIONS = int(os.getenv("MJ_BATCH_MAX_ACTIONS", 512))
+_batch_events: Dict[int, List[Tuple[Optional[str], dict]]] = {}
+
+def _flush_batch(room_id: int, captured: List[Tuple[Optional[str], dict]]):
+    public = [event for target, event in captured if target is None]
+    if public:
+        _broadcast_room(room_id, {"type": "batch", "room_id": room_id, "events": public})
+    # hand events are full snapshots of a seat, so only the last one per seat matters
+    latest = {}
+    for target, event in captured:
+        if target is not None:
+            latest[target] = event
+    for target, event in latest.items():
+        _send_player(room_id, target, event)
+
+@_route("POST", "/{room_id}/batch", BatchResponse)
+async def batch_actions(room_id: int, body: BatchRequest):
+    """Apply an ordered list of actions under a single room acquisition.
+
+    Actions use the command protocol ({"cmd", "player", "args"}) and run in
+    order, stopping at the first failure. With "atomic" a failure rolls the
+    room back to where it was before the batch; otherwise the actions before
+    it stay applied. Connected clients get one coalesced "batch" event plus
+    the latest private hand event of each affected seat.
+    """
+    if len(body.actions) > BATCH_MAX_ACTIONS:
+        raise HTTPException(status_code=400, detail="Too many actions (max %d)" % BATCH_MAX_ACTIONS)
+    async with _room_lock(room_id):
+        room = rooms.get(room_id)
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        saved = room.snapshot() if body.atomic else None
+        captured = _batch_events[room_id] = []
+        results = []
+        try:
+            for index, action in enumerate(body.actions):
+                result = await _apply_command(room_id, action.player, action.cmd, action.args)
+                result.update(index=index, cmd=action.cmd)
+                results.append(result)
+                if not result["ok"]:
+                    break
+        finally:
+            del _batch_events[room_id]
+        ok = all(r["ok"] for r in results)
+        rolled_back = not ok and saved is not None
+        if rolled_back:
+            room.restore(saved)
+            room_index.update(room)
+        else:
+            _flush_batch(room_id, captured)
+        applied = 0 if rolled_back else sum(1 for r in results if r["ok"])
+        return {"room_id": room_id, "ok": ok, "applied": applied, "rolled_back": rolled_back,
+                "results": results, "seq": room_seq.get(room_id, 0)}
+
+# matchmaking: queued players are grouped by table size (services/matchmaking.py)
+# and a background task seats each group in a room that starts immediately
+MATCHMAKING_INTERVAL = float(os.getenv("MJ_MATCHMAKING_INTERVAL", 0.05))
+MATCHMAKING_BATCH = int(os.getenv("MJ_MATCHMAKING_BATCH", 256))
+# matched or failed tickets nobody collects are dropped after this many seconds
+MATCHMAKING_TICKET_TTL = float(os.getenv("MJ_MATCHMAKING_TICKET_TTL", 60.0))
+matchmaker = Matchmaker(ttl=MATCHMAKING_TICKET_TTL)
+# player -> socket waiting for its match (event loop thread only)
+matchmaking_connections: Dict[str, WebSocket] = {}
+_matchmaking_task: Optional[asyncio.Future] = None
+_matchmaking_wakeup: Optional[asyncio.Event] = None
+
+def _ticket_for(player: str, secret: Optional[str]) -> Ticket:
+    ticket = matchmaker.tickets.get(player)
+    if ticket is None or not secret or not secrets.compare_digest(ticket.secret, secret):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket
+
+def _match_event(ticket: Ticket) -> dict:
+    if ticket.status == "failed":
+        return {"type": "match_failed", "player": ticket.player}
+    return {"type": "matched", "player": ticket.player, "room_id": ticket.room_id,
+            "players": list(rooms[ticket.room_id].players), "token": ticket.token}
+
+@_route("POST", "/matchmaking/enqueue", EnqueueResponse)
+async def matchmaking_enqueue(player: str, max_players: int = Query(4, ge=2, le=4)):
+    """Queue for a table; the returned ticket authenticates status, cancel and the socket."""
+    _check_seat_free(player)
+    try:
+        ticket = matchmaker.enqueue(player, max_players)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if _matchmaking_wakeup is not None:
+        _matchmaking_wakeup.set()
+    return {"player": player, "ticket": ticket.secret, "max_players": max_players,
+            "waiting": matchmaker.waiting(max_players)}
+
+@_route("GET", "/matchmaking/status", TicketResponse)
+async def matchmaking_status(player: str, ticket: str):
+    t = _ticket_for(player, ticket)
+    view = t.view()
+    matchmaker.forget(player)
+    return view
+
+@_route("POST", "/matchmaking/cancel", CancelResponse)
+async def matchmaking_cancel(player: str, ticket: str):
+    _ticket_for(player, ticket)
+    return {"cancelled": matchmaker.cancel(player)}
+
+@router.websocket("/matchmaking/ws")
+async def matchmaking_ws(ws: WebSocket):
+    """Notification socket for a queued player (?player=<name>&ticket=<ticket>).
+
+    Receives one {"type": "matched", "room_id", "players", "token"} event;
+    the token is the seat token for /ws/{room_id}. If the group could not be
+    seated it gets {"type": "match_failed"} instead and should enqueue again.
+    """
+    await ws.accept()
+    player = ws.query_params.get("player")
+    try:
+        ticket = _ticket_for(player or "", ws.query_params.get("ticket"))
+    except HTTPException:
+        try:
+            await ws.close(code=1008)
+        except Exception:
+            pass
+        return
+    matchmaking_connections[player] = ws
+    if ticket.status in ("matched", "failed"):
+        await _send_frame(ws, codec.encode_json(_match_event(ticket)))
+        matchmaker.forget(player)
+    try:
+        async for _ in _iter_messages(ws):
+            pass
+    finally:
+        if matchmaking_connections.get(player) is ws:
+            del matchmaking_connections[player]
+
+def _seat_groups(groups: List[List[Ticket]]):
+    """Create, start and announce one room per group, registering the batch under one lock."""
+    with rooms_lock:
+        created = []
+        for group in groups:
+            room_id = len(rooms) + 1
+            room = Room(room_id, [t.player for t in group], max_players=group[0].max_players)
+            rooms[room_id] = room
+            room_locks[room_id] = asyncio.Lock()
+            created.append((room, group))
+    for room, group in created:
+        outcome = Engine(room).start()
+        room_index.update(room)
+        # nobody is connected to the room yet: seats get their hand from the
+        # "connect" event when they open /ws/{room_id}, so only the public
+        # start is recorded
+        for event in outcome.events:
+            _broadcast_room(room.room_id, event)
+        for t in group:
+            matchmaker.matched(t, room.room_id, room.seat_tokens[t.player])
+            ws = matchmaking_connections.get(t.player)
+            if ws is not None:
+                _send_ws(room.room_id, ws, codec.encode_json(_match_event(t)))
+                matchmaker.forget(t.player)
+
+def _fail_groups(groups: List[List[Ticket]]):
+    """Mark the tickets of groups that were popped but never seated, and tell their sockets."""
+    for group in groups:
+        for t in group:
+            if t.status != "queued":
+                continue
+            matchmaker.failed(t)
+            ws = matchmaking_connections.get(t.player)
+            if ws is not None:
+                asyncio.ensure_future(_send_frame(ws, codec.encode_json(_match_event(t))))
+                matchmaker.forget(t.player)
+
+async def _matchmaking_loop(interval: float, batch: int):
+    logger.info("Matchmaking task started (interval=%s, batch=%s)", interval, batch)
+    try:
+        while True:
+            # also wake every ttl to expire tickets nobody collected
+            try:
+                await asyncio.wait_for(_matchmaking_wakeup.wait(), max(1.0, matchmaker.ttl))
+            except asyncio.TimeoutError:
+                pass
+            matchmaker.expire()
+            if not _matchmaking_wakeup.is_set():
+                continue
+            _matchmaking_wakeup.clear()
+            # let a burst of enqueues land before grouping
+            await asyncio.sleep(interval)
+            while matchmaker.ready():
+                groups = matchmaker.pop_groups(batch)
                 try:
-                    if _loop is not None:
-                        asyncio.run_coroutine_threadsafe(ws.close(), _loop)
+                    _seat_groups(groups)
                 except Exception:
-                    logger.exception("Error closing stale websocket")
-                room_connections.get(rid, {}).pop(ws, None)
-        except Exception:
-            logger.exception("Exception in ws cleanup loop")
-    logger.info("WS cleanup thread exiting")
+                    logger.exception("Exception in matchmaking loop")
+                    _fail_groups(groups)
+                    break
+                # give request handlers a turn between batches
+                await asyncio.sleep(0)
+    except asyncio.CancelledError:
+        pass
+    logger.info("Matchmaking task exiting")
 
-def start_ws_cleanup(interval: Optional[float] = None, timeout: Optional[float] = None):
-    """Start background thread to close idle websocket connections.
+def start_matchmaking(interval: Optional[float] = None, batch: Optional[int] = None,
+                      ticket_ttl: Optional[float] = None):
+    """Start the matchmaking task (must be called on the event loop thread)."""
+    global _matchmaking_task, _matchmaking_wakeup
+    if ticket_ttl is not None:
+        matchmaker.ttl = float(ticket_ttl)
+    if _matchmaking_task and not _matchmaking_task.done():
+        return
+    _matchmaking_wakeup = asyncio.Event()
+    if matchmaker.ready():
+        _matchmaking_wakeup.set()
+    _matchmaking_task = asyncio.ensure_future(_matchmaking_loop(
+        MATCHMAKING_INTERVAL if interval is None else interval,
+        MATCHMAKING_BATCH if batch is None else max(1, int(batch))))
 
-    If interval/timeout are None the module defaults or env values are used.
-    """
-    global _ws_cleanup_thread, _ws_cleanup_stop_event
-    if _ws_cleanup_thread and _ws_cleanup_thread.is_alive():
+def stop_matchmaking():
+    global _matchmaking_task
+    if _matchmaking_task:
+        _matchmaking_task.cancel()
+    _matchmaking_task = None
+
+# server-side bots: room_id -> {seat: SeatBot} for seats played by the server,
+# either added with POST /add_bot or taken over when a seated player's sockets
+# have all been gone for BOT_TAKEOVER_DELAY (negative disables takeover).
+# Bots move one locked step at a time on the event loop, yielding between
+# steps so other rooms and clients keep going.
+room_bots: Dict[int, Dict[str, SeatBot]] = {}
+BOT_POLICY = os.getenv("MJ_BOT_POLICY", "shanten")
+BOT_TAKEOVER_DELAY = float(os.getenv("MJ_BOT_TAKEOVER_DELAY", 5.0))
+# room_id -> running bot driver task
+_bot_tasks: Dict[int, asyncio.Future] = {}
+
+def configure_bots(policy: Optional[str] = None, takeover_delay: Optional[float] = None):
+    """Set the default bot policy and the takeover delay (negative disables takeover)."""
+    global BOT_POLICY, BOT_TAKEOVER_DELAY
+    if policy is not None:
+        if policy not in POLICIES:
+            raise ValueError("Unknown bot policy %r" % policy)
+        BOT_POLICY = policy
+    if takeover_delay is not None:
+        BOT_TAKEOVER_DELAY = float(takeover_delay)
+
+def _new_bot(policy: str, takeover: bool = False) -> SeatBot:
+    mc = _core if _core_bound else _bind_core()
+    if mc is None or not hasattr(mc, "shanten"):
+        raise HTTPException(status_code=500, detail="mahjong_core module not available")
+    return SeatBot(POLICIES[policy](_core_view), takeover=takeover)
+
+@_route("POST", "/add_bot", AddBotResponse)
+async def add_bot(room_id: int, policy: Optional[str] = None):
+    """Seat a server-side bot (see services/bots.py for policies, default MJ_BOT_POLICY)."""
+    policy = policy or BOT_POLICY
+    if policy not in POLICIES:
+        raise HTTPException(status_code=400, detail="Unknown policy")
+    async with _room_lock(room_id):
+        room = _get_room(room_id)
+        n = 1
+        while "bot-%d-%d" % (room_id, n) in room.players:
+            n += 1
+        name = "bot-%d-%d" % (room_id, n)
+        bot = _new_bot(policy)
+        try:
+            room.add_player(name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        room_bots.setdefault(room_id, {})[name] = bot
+        room_index.update(room)
+        return {"room_id": room_id, "players": room.players, "bot": name, "policy": policy}
+
+def _wake_bots(room_id: int):
+    """Start the room's bot driver unless it is already running."""
+    if room_id in room_bots and room_id not in _bot_tasks:
+        # the driver outlives the request that woke it, so it must not inherit its trace
+        with tracing.untraced():
+            _bot_tasks[room_id] = asyncio.ensure_future(_drive_bots(room_id))
+
+async def _drive_bots(room_id: int):
+    try:
+        while True:
+            async with _room_lock(room_id):
+                moved = await _bot_step(room_id)
+            if not moved:
+                return
+            await asyncio.sleep(0)
+    except Exception:
+        logger.exception("Bot driver for room %s failed", room_id)
+    finally:
+        _bot_tasks.pop(room_id, None)
+
+async def _bot_step(room_id: int) -> bool:
+    """Make one bot move in the room; False when no bot has anything to do."""
+    room = rooms.get(room_id)
+    bots = room_bots.get(room_id)
+    if room is None or not bots or room.status != "playing":
+        return False
+    pending = room.pending_discard
+    if pending is not None:
+        # answer the claim window: the best bot claim by the engine's priority, else a pass
+        seats = [p for p in bots if p != pending["player"] and p not in room.passes and p in room.players]
+        if not seats:
+            return False
+        intents = []
+        for p in seats:
+            want = bots[p].claim(room, p, pending["tile"])
+            if want:
+                distance = (room.players.index(p) - room.players.index(pending["player"])) % len(room.players)
+                intents.append((-CLAIM_PRIORITY[want[0]], distance, p, want))
+        if intents:
+            _, _, p, (action, tiles) = min(intents)
+            try:
+                result = await _play(room, "claim", p, action, tiles)
+            except HTTPException:
+                result = None
+            # a claim outranked by an invalid hu is recorded but not taken: pass instead
+            if result and ("claimed" in result or "win" in result):
+                return True
+            seats = [p]
+        await _play(room, "pass_claim", seats[0])
+        return True
+    player = room.current_player
+    bot = bots.get(player)
+    if bot is None:
+        return False
+    try:
+        # a hand one over a multiple of three has drawn (or claimed) and must discard
+        if len(room.hands[player]) % 3 == 2:
+            await _play(room, "discard", player, bot.discard(room, player))
+        elif room.deck:
+            await _play(room, "draw", player)
+        else:
+            return False
+    except HTTPException as e:
+        logger.info("Bot %s in room %s stopped: %s", player, room_id, e.detail)
+        return False
+    return True
+
+def _release_seat(rid: int, player: str):
+    """A seated player is back: a takeover bot hands the seat back."""
+    bot = room_bots.get(rid, {}).get(player)
+    if bot is not None and bot.takeover:
+        del room_bots[rid][player]
+        _broadcast_room(rid, {"type": "bot_released", "room_id": rid, "player": player})
+
+def _seat_left(rid: int, player: str):
+    """A seat's socket closed: schedule a takeover unless another socket still holds the seat."""
+    if BOT_TAKEOVER_DELAY < 0 or player in room_bots.get(rid, {}):
         return
-    if interval is None:
-        interval = _PENDING_CLEANUP_INTERVAL
-    if timeout is None:
-        timeout = PENDING_DISCARD_TIMEOUT
-    _ws_cleanup_stop_event = threading.Event()
-    _ws_cleanup_thread = threading.Thread(target=_ws_cleanup_loop, args=(_ws_cleanup_stop_event, interval, timeout), daemon=True)
-    _ws_cleanup_thread.start()
-
-def stop_ws_cleanup(timeout: float = 2.0):
-    """Stop the background websocket cleanup thread, waiting up to `timeout` seconds."""
-    global _ws_cleanup_thread, _ws_cleanup_stop_event
-    if _ws_cleanup_stop_event:
-        _ws_cleanup_stop_event.set()
-    if _ws_cleanup_thread:
-        _ws_cleanup_thread.join(timeout)
-    _ws_cleanup_thread = None
-    _ws_cleanup_stop_event = None
-
-def restart_ws_cleanup(interval: Optional[float] = None, timeout: Optional[float] = None):
-    """Restart websocket cleanup thread with new parameters."""
-    stop_ws_cleanup()
-    start_ws_cleanup(interval=interval, timeout=timeout)
\ No newline at end of file
+    if any(getattr(w.state, "player", None) == player for w in room_connections.get(rid, {})):
+        return
+    asyncio.ensure_future(_take_over_later(rid, player, BOT_TAKEOVER_DELAY))
+
+async def _take_over_later(rid: int, player: str, delay: float):
+    await asyncio.sleep(delay)
+    async with _room_lock(rid):
+        room = rooms.get(rid)
+        if room is None or room.status != "playing" or player not in room.players:
+            return
+        if player in room_bots.get(rid, {}):
+            return
+        if any(getattr(w.state, "player", None) == player for w in room_connections.get(rid, {})):
+            return
+        try:
+            bot = _new_bot(BOT_POLICY, takeover=True)
+        except HTTPException:
+            return
+        room_bots.setdefault(rid, {})[player] = bot
+        logger.info("Bot took over %s in room %s", player, rid)
+        _broadcast_room(rid, {"type": "bot_takeover", "room_id": rid, "player": player})
+    _wake_bots(rid)
+
+# memory accounting: per-room state lives in Room plus these router tables,
+# all keyed by room id (room_index.summaries is reported as "index")
+_ROOM_TABLES = (("event_log", room_event_log), ("connections", room_connections), ("lock", room_locks),
+                ("bots", room_bots), ("bot_task", _bot_tasks), ("spectators", spectator_publishers),
+                ("sse", sse_channels), ("seq", room_seq))
+# counted by their own size only: a socket's scope references the whole app
+_SHALLOW = (WebSocket, asyncio.Task)
+
+def room_footprint(rid: int, seen: Set[int]) -> Dict[str, int]:
+    """Estimated bytes held for room `rid`, by component (see services/memory.py)."""
+    parts: Dict[str, int] = {}
+    room = rooms.get(rid)
+    if room is not None:
+        parts.update(memory.room_parts(room, seen))
+    summary = room_index.summaries.get(rid)
+    if summary is not None:
+        parts["index"] = memory.deep_size(summary, seen)
+    for name, table in _ROOM_TABLES:
+        value = table.get(rid)
+        if value is not None:
+            parts[name] = memory.deep_size(value, seen, _SHALLOW)
+    return parts
+
+async def memory_report(top: int = 10) -> dict:
+    """Estimated memory of every room, in total, per component and per status.
+
+    Runs on the event loop (where room state is mutated), yielding every 256
+    rooms so a large walk doesn't stall other requests.
+    """
+    t0 = time.perf_counter()
+    seen: Set[int] = set()
+    components: Dict[str, int] = {}
+    by_status: Dict[str, dict] = {}
+    sizes = []
+    for n, (rid, room) in enumerate(list(rooms.items())):
+        if n and not n % 256:
+            await asyncio.sleep(0)
+        parts = room_footprint(rid, seen)
+        size = sum(parts.values())
+        for name, value in parts.items():
+            components[name] = components.get(name, 0) + value
+        status = by_status.setdefault(room.status, {"rooms": 0, "bytes": 0})
+        status["rooms"] += 1
+        status["bytes"] += size
+        sizes.append((size, rid, room.status, parts))
+    total = sum(size for size, _, _, _ in sizes)
+    tables = _ROOM_TABLES + (("index", room_index.summaries),)
+    report = {
+        "rooms": len(sizes), "total_bytes": total,
+        "per_room_bytes": round(total / len(sizes), 1) if sizes else 0.0,
+        "components": dict(sorted(components.items(), key=lambda kv: -kv[1])),
+        "by_status": by_status,
+        "largest": [{"room_id": rid, "status": status, "bytes": size, "components": parts}
+                    for size, rid, status, parts in heapq.nlargest(top, sizes, key=lambda s: s[0])],
+        "orphans": {name: sum(1 for rid in list(table) if rid not in rooms) for name, table in tables},
+        "traced_bytes": None, "traced_peak_bytes": None,
+    }
+    if tracemalloc.is_tracing():
+        report["traced_bytes"], report["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+    report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return report
+
+@_route("GET", "/admin/memory", MemoryResponse)
+async def admin_memory(top: int = Query(10, ge=0, le=1000), _auth=Depends(require_admin)):
+    """Estimated live memory per room and in total; `top` largest rooms are itemized.
+
+    Rooms are never evicted, so finished rooms' bytes in by_status and
+    non-zero orphans are what to watch for leaks.
+    """
+    return await memory_report(top)
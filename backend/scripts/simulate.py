@@ -0,0 +1,178 @@
+"""Self-play simulator for bot policies.
+
+Plays complete games on the headless engine (models/engine.py), so turn
+order, claim priority and win checks are the production rules on the
+production Room model. Games fan out over a process pool; each one is
+seeded from --seed and its index (deck and bot choices), so the results do
+not depend on the worker count. Seats rotate every game so no policy always
+deals.
+
+Reports games/s, per-policy win rates and rule-coverage counters (commands
+run, claims accepted and rejected, rob-gang wins, exhausted decks); --json
+prints the raw counters for regression checks.
+
+Run from backend/:
+
+    python -m scripts.simulate --games 1000 --policies shanten,random,random,random --workers 4
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from models.engine import CLAIM_PRIORITY, Engine, GameError
+from models.room import Room
+from services import native
+from services.bots import POLICIES
+
+_mc = None
+
+def _native():
+    global _mc
+    if _mc is None:
+        _mc = native.load()
+        if _mc is None or not hasattr(_mc, "shanten"):
+            raise RuntimeError("mahjong_core with shanten is not built")
+    return _mc
+
+def play_game(mc, names: List[str], index: int, seed: int) -> Counter:
+    """Play one game and return its counters."""
+    stats = Counter()
+    rng = random.Random("%d:%d" % (seed, index))
+    n = len(names)
+    seats = ["s%d" % i for i in range(n)]
+    # seat i plays policy names[(i + index) % n]
+    policy_of = {p: names[(i + index) % n] for i, p in enumerate(seats)}
+    bots = {p: POLICIES[policy_of[p]](mc, random.Random(rng.random())) for p in seats}
+    room = Room(index + 1, seats, max_players=n)
+    room.init_deck(rng)
+    engine = Engine(room, is_win=mc.is_win, clock=itertools.count().__next__)
+    engine.start()
+    stats["games"] += 1
+    for p in seats:
+        stats["policy:%s:seated" % policy_of[p]] += 1
+    winner, how = None, None
+    must_discard = None
+    while room.status == "playing":
+        player = must_discard or room.current_player
+        if must_discard is None:
+            if not room.deck:
+                stats["exhausted"] += 1
+                break
+            stats["cmd:draw"] += 1
+            if engine.draw(player).result.get("win"):
+                winner, how = player, "tsumo"
+                break
+        must_discard = None
+        tile = bots[player].discard(room, player)
+        engine.discard(player, tile)
+        stats["cmd:discard"] += 1
+        stats["turns"] += 1
+        # every other seat declares at once; the best claim by the engine's
+        # priority goes in first, as the server would resolve simultaneous claims
+        intents = []
+        for p in seats:
+            if p == player:
+                continue
+            want = bots[p].claim(room, p, tile)
+            if want:
+                distance = (seats.index(p) - seats.index(player)) % n
+                intents.append((-CLAIM_PRIORITY[want[0]], distance, p, want))
+        claimed = False
+        for _, _, p, (action, tiles) in sorted(intents):
+            try:
+                result = engine.claim(p, action, tiles).result
+            except GameError as e:
+                stats["claim_rejected:%s" % e.detail] += 1
+                continue
+            if result.get("win"):
+                winner = result["winner"]
+                how = "ron" if winner == p else "rob_gang"
+            elif result.get("claimed"):
+                stats["claim:%s" % action] += 1
+                # peng/chi discard straight away; gang draws a replacement first
+                if action != "gang":
+                    must_discard = p
+            else:
+                stats["claim_rejected:%s" % result.get("detail")] += 1
+                continue
+            claimed = True
+            break
+        if winner:
+            break
+        if not claimed:
+            for p in seats:
+                if p != player and room.pending_discard is not None:
+                    engine.pass_claim(p)
+                    stats["cmd:pass"] += 1
+    if winner:
+        stats["win:%s" % how] += 1
+        stats["policy:%s:wins" % policy_of[winner]] += 1
+        if room.melds[winner]:
+            stats["win:with_melds"] += 1
+    return stats
+
+def run_chunk(names: List[str], seed: int, start: int, stop: int) -> Counter:
+    mc = _native()
+    total = Counter()
+    for index in range(start, stop):
+        total += play_game(mc, names, index, seed)
+    return total
+
+def simulate(names: List[str], games: int, seed: int = 0, workers: int = 0) -> Counter:
+    """Counters summed over `games` games (workers=0 plays them in this process)."""
+    if workers <= 0:
+        return run_chunk(names, seed, 0, games)
+    # a few chunks per worker so a slow chunk doesn't leave the others idle
+    size = max(1, games // (workers * 4))
+    bounds = [(i, min(games, i + size)) for i in range(0, games, size)]
+    total = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_chunk, names, seed, lo, hi) for lo, hi in bounds]
+        for f in futures:
+            total += f.result()
+    return total
+
+def report(stats: Counter, names: List[str], seconds: float):
+    games = stats["games"]
+    print("%d games in %.2fs: %.1f games/s (%.0f/min), %.1f turns/game"
+          % (games, seconds, games / seconds, games * 60 / seconds, stats["turns"] / max(1, games)))
+    print("%-10s %8s %8s %8s" % ("policy", "seats", "wins", "win %"))
+    for name in sorted(set(names)):
+        seated = stats["policy:%s:seated" % name]
+        wins = stats["policy:%s:wins" % name]
+        print("%-10s %8d %8d %7.1f%%" % (name, seated, wins, 100.0 * wins / max(1, seated)))
+    print("rule coverage:")
+    for key in sorted(k for k in stats if not k.startswith("policy:")):
+        print("  %-40s %d" % (key, stats[key]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policies", default="shanten,random,random,random",
+                        help="comma separated, one per seat: %s" % ", ".join(sorted(POLICIES)))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes (0 = play in this process)")
+    parser.add_argument("--json", action="store_true", help="print the raw counters as JSON")
+    args = parser.parse_args()
+    names = [x.strip() for x in args.policies.split(",")]
+    unknown = [x for x in names if x not in POLICIES]
+    if unknown or not 2 <= len(names) <= 4:
+        sys.exit("need 2-4 seats from: %s" % ", ".join(sorted(POLICIES)))
+    t0 = time.perf_counter()
+    stats = simulate(names, args.games, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    if args.json:
+        print(json.dumps(dict(stats), sort_keys=True))
+    else:
+        report(stats, names, elapsed)
+
+if __name__ == "__main__":
+    main()
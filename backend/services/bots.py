@@ -0,0 +1,148 @@
+"""Bot policies.
+
+A policy picks a seat's discard and decides whether to claim another seat's
+discard from that seat's own view of a models.room.Room. The simulator
+(scripts/simulate.py) and server-side bots share them. `mc` is the native
+module (is_win, shanten); each policy gets its own seeded `rng` so games
+replay exactly.
+
+SeatBot is the server-side wrapper for one seat: it keeps the seat's wait
+set cached per hand, so claim decisions on other seats' discards are a set
+lookup instead of a win check.
+"""
+import abc
+import random
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+Claim = Tuple[str, Optional[List[int]]]
+
+def candidate_tiles(hand: List[int]) -> List[int]:
+    """Tiles that can pair or meld with something in `hand` (in-suit neighbours, held honors)."""
+    # a winning tile always pairs or forms a meld with a held tile, so only
+    # neighbours of held suited tiles (and copies of held honors) can be waits
+    out = set()
+    for t in hand:
+        if t <= 27:
+            suit_lo = (t - 1) // 9 * 9 + 1
+            out.update(range(max(suit_lo, t - 2), min(suit_lo + 8, t + 2) + 1))
+        else:
+            out.add(t)
+    return sorted(out)
+
+def ukeire(mc, hand: List[int]) -> int:
+    """Unseen copies (4 minus those held) of every tile that lowers `hand`'s shanten."""
+    base = mc.shanten(hand)
+    counts = Counter(hand)
+    total = 0
+    for t in candidate_tiles(hand):
+        if counts[t] < 4 and mc.shanten(hand + [t]) < base:
+            total += 4 - counts[t]
+    return total
+
+def wait_set(mc, hand: List[int]) -> List[int]:
+    """Tiles that would complete `hand` by the native win check."""
+    if len(hand) % 3 != 1:
+        return []
+    return [t for t in candidate_tiles(hand) if hand.count(t) < 4 and mc.is_win(hand + [t])]
+
+class Policy(abc.ABC):
+    name = "base"
+
+    def __init__(self, mc, rng: Optional[random.Random] = None):
+        self.mc = mc
+        self.rng = rng or random.Random()
+
+    @abc.abstractmethod
+    def discard(self, room, player: str) -> int:
+        """The tile `player` discards from its hand."""
+
+    def claim(self, room, player: str, tile: int, waits: Optional[Sequence[int]] = None) -> Optional[Claim]:
+        """(action, chi tiles) to claim `tile` with, or None to pass. Default: hu only.
+
+        `waits` is the seat's known wait set, if the caller has one.
+        """
+        hand = room.hands[player]
+        if waits is not None:
+            won = tile in waits
+        else:
+            won = len(hand) == 13 and self.mc.is_win(hand + [tile])
+        return ("hu", None) if won else None
+
+class RandomPolicy(Policy):
+    name = "random"
+
+    def discard(self, room, player: str) -> int:
+        return self.rng.choice(room.hands[player])
+
+class DrawnTilePolicy(Policy):
+    """Always throws the tile it just drew (the last one in hand)."""
+    name = "tsumogiri"
+
+    def discard(self, room, player: str) -> int:
+        return room.hands[player][-1]
+
+class ShantenPolicy(Policy):
+    """Discards to the lowest shanten, breaking ties by ukeire, then at random."""
+    name = "shanten"
+
+    def discard(self, room, player: str) -> int:
+        # one native call scores every distinct tile: (tile, shanten, ukeire)
+        table = self.mc.discard_table(room.hands[player])
+        best = min((s, -u) for _, s, u in table)
+        return self.rng.choice([t for t, s, u in table if (s, -u) == best])
+
+class CallerPolicy(ShantenPolicy):
+    """Shanten discards, but calls every peng, gang and chi it is offered."""
+    name = "caller"
+
+    def claim(self, room, player: str, tile: int, waits: Optional[Sequence[int]] = None) -> Optional[Claim]:
+        won = super().claim(room, player, tile, waits)
+        if won:
+            return won
+        hand = room.hands[player]
+        held = hand.count(tile)
+        if held >= 3:
+            return ("gang", None)
+        if held == 2:
+            return ("peng", None)
+        # chi is for the seat after the discarder, which the discard already made current
+        if tile <= 27 and player == room.current_player:
+            for lo in (tile - 2, tile - 1, tile):
+                parts = [t for t in (lo, lo + 1, lo + 2) if t != tile]
+                if lo >= 1 and lo + 2 <= 27 and (lo - 1) // 9 == (lo + 1) // 9 and all(t in hand for t in parts):
+                    return ("chi", parts)
+        return None
+
+POLICIES = {cls.name: cls for cls in (RandomPolicy, DrawnTilePolicy, ShantenPolicy, CallerPolicy)}
+
+class SeatBot:
+    """A policy playing one server seat, with the seat's wait set cached per hand.
+
+    `takeover` marks a bot standing in for a disconnected player, which
+    hands the seat back when they reconnect.
+    """
+    __slots__ = ("policy", "takeover", "_hand", "_waits")
+
+    def __init__(self, policy: Policy, takeover: bool = False):
+        self.policy = policy
+        self.takeover = takeover
+        self._hand: Optional[Tuple[int, ...]] = None
+        self._waits: List[int] = []
+
+    def cache_waits(self, hand: List[int], waits: List[int]):
+        """Remember a wait set already computed for `hand` (e.g. for its hand event)."""
+        self._hand = tuple(sorted(hand))
+        self._waits = waits
+
+    def waits(self, hand: List[int]) -> List[int]:
+        key = tuple(sorted(hand))
+        if key != self._hand:
+            self.cache_waits(hand, wait_set(self.policy.mc, hand))
+        return self._waits
+
+    def discard(self, room, player: str) -> int:
+        return self.policy.discard(room, player)
+
+    def claim(self, room, player: str, tile: int) -> Optional[Claim]:
+        return self.policy.claim(room, player, tile, self.waits(room.hands[player]))
@@ -0,0 +1,191 @@
+"""Wire encodings for room websocket events.
+
+JSON text frames are the default. Clients that offer the BINARY_SUBPROTOCOL
+in Sec-WebSocket-Protocol get a compact fixed-layout binary frame instead:
+
+    byte 0      event code (0 = JSON fallback, rest of the frame is UTF-8 JSON)
+    bytes 1-4   seq, uint32 little endian (0 when the event has no seq)
+    bytes 5..   per-event fields, see the table below
+
+Players are sent as their seat index in room.players (255 = none) and
+tiles as single bytes; lists are a count byte followed by the items. The
+room id is implied by the socket. Events that don't fit a layout exactly
+(unknown type, extra keys, out-of-range values) use the JSON fallback, so
+nothing is ever lost by choosing the binary protocol.
+"""
+import json
+import struct
+from typing import Dict, Iterable, List, Optional
+
+JSON_SUBPROTOCOL = "mahjong.json.v1"
+BINARY_SUBPROTOCOL = "mahjong.bin.v1"
+SUBPROTOCOLS = (BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL)
+
+NO_SEAT = 255
+
+_HEADER = struct.Struct("<BI")
+
+# value tables; positions are the wire codes
+ACTIONS = ("chi", "peng", "gang", "hu")
+MELD_TYPES = ("chi", "peng", "gang")
+CLEAR_REASONS = ("all_passed", "timeout")
+HAND_REASONS = ("connect", "deal", "draw", "discard", "claim", "admin_set_hand", "snapshot")
+
+# event code, type and the exact key set the compact layout covers
+FALLBACK = 0
+DRAW, DISCARD, PASS, PENDING_CLEARED, CLAIM, HU, WIN, HAND = range(1, 9)
+_LAYOUT_KEYS = {
+    "draw": (DRAW, {"type", "room_id", "player", "hand_count", "seq"}),
+    "discard": (DISCARD, {"type", "room_id", "player", "tile", "pending", "next_player", "seq"}),
+    "pass": (PASS, {"type", "room_id", "player", "passes", "seq"}),
+    "pending_cleared": (PENDING_CLEARED, {"type", "room_id", "reason", "seq"}),
+    "claim": (CLAIM, {"type", "action", "room_id", "player", "melds", "seq"}),
+    "hu": (HU, {"type", "room_id", "player", "winner", "seq"}),
+    "win": (WIN, {"type", "room_id", "player", "hand", "seq"}),
+    "hand": (HAND, {"type", "room_id", "player", "reason", "hand", "melds", "waits", "seq", "tile"}),
+}
+
+def negotiate(offered: Iterable[str]) -> Optional[str]:
+    """Pick the subprotocol to accept, honouring the client's preference order."""
+    for proto in offered or ():
+        if proto in SUBPROTOCOLS:
+            return proto
+    return None
+
+def encode_json(event: dict) -> str:
+    return json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+
+def encode_binary(event: dict, players: List[str]) -> bytes:
+    layout = _LAYOUT_KEYS.get(event.get("type"))
+    if layout is not None and set(event) <= layout[1]:
+        try:
+            return _encode_compact(layout[0], event, players)
+        except (KeyError, ValueError, TypeError, struct.error):
+            pass
+    return _HEADER.pack(FALLBACK, 0) + encode_json(event).encode("utf-8")
+
+class _Writer:
+    def __init__(self, code: int, seq: int, seats: Dict[str, int]):
+        self.buf = bytearray(_HEADER.pack(code, seq))
+        self.seats = seats
+
+    def byte(self, value: int):
+        if not 0 <= value <= 255:
+            raise ValueError("value out of range")
+        self.buf.append(value)
+
+    def seat(self, player: Optional[str]):
+        self.byte(NO_SEAT if player is None else self.seats[player])
+
+    def code(self, table: tuple, value: str):
+        self.byte(table.index(value))
+
+    def tiles(self, tiles: List[int]):
+        self.byte(len(tiles))
+        for t in tiles:
+            self.byte(t)
+
+    def melds(self, melds: List[dict]):
+        self.byte(len(melds))
+        for m in melds:
+            if set(m) != {"type", "tiles"}:
+                raise ValueError("unexpected meld shape")
+            self.code(MELD_TYPES, m["type"])
+            self.tiles(m["tiles"])
+
+def _encode_compact(code: int, e: dict, players: List[str]) -> bytes:
+    w = _Writer(code, e.get("seq", 0), {p: i for i, p in enumerate(players)})
+    if code == DRAW:
+        w.seat(e["player"])
+        w.byte(e["hand_count"])
+    elif code == DISCARD:
+        w.seat(e["player"])
+        w.byte(e["tile"])
+        w.byte(1 if e["pending"] else 0)
+        w.seat(e["next_player"])
+    elif code == PASS:
+        w.seat(e["player"])
+        w.byte(len(e["passes"]))
+        for p in e["passes"]:
+            w.seat(p)
+    elif code == PENDING_CLEARED:
+        w.code(CLEAR_REASONS, e["reason"])
+    elif code == CLAIM:
+        w.code(ACTIONS, e["action"])
+        w.seat(e["player"])
+        w.melds(e["melds"])
+    elif code == HU:
+        w.seat(e["player"])
+        w.seat(e["winner"])
+    elif code == WIN:
+        w.seat(e["player"])
+        w.tiles(e["hand"])
+    elif code == HAND:
+        w.seat(e["player"])
+        w.code(HAND_REASONS, e["reason"])
+        w.byte(e.get("tile") or 0)
+        w.tiles(e["hand"])
+        w.tiles(e["waits"])
+        w.melds(e["melds"])
+    return bytes(w.buf)
+
+class _Reader:
+    def __init__(self, data: bytes, players: List[str]):
+        self.data = data
+        self.pos = _HEADER.size
+        self.players = players
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def seat(self) -> Optional[str]:
+        i = self.byte()
+        return self.players[i] if i < len(self.players) else None
+
+    def tiles(self) -> List[int]:
+        n = self.byte()
+        out = list(self.data[self.pos:self.pos + n])
+        self.pos += n
+        return out
+
+    def melds(self) -> List[dict]:
+        return [{"type": MELD_TYPES[self.byte()], "tiles": self.tiles()} for _ in range(self.byte())]
+
+def decode_binary(data: bytes, players: List[str], room_id: Optional[int] = None) -> dict:
+    """Inverse of encode_binary (reference decoder, mirrored in frontend/ws_demo.html)."""
+    code, seq = _HEADER.unpack_from(data)
+    if code == FALLBACK:
+        return json.loads(data[_HEADER.size:].decode("utf-8"))
+    r = _Reader(data, players)
+    e = {}
+    if code == DRAW:
+        e.update(type="draw", player=r.seat(), hand_count=r.byte())
+    elif code == DISCARD:
+        e.update(type="discard", player=r.seat(), tile=r.byte(), pending=bool(r.byte()), next_player=r.seat())
+    elif code == PASS:
+        e.update(type="pass", player=r.seat())
+        e["passes"] = [r.seat() for _ in range(r.byte())]
+    elif code == PENDING_CLEARED:
+        e.update(type="pending_cleared", reason=CLEAR_REASONS[r.byte()])
+    elif code == CLAIM:
+        e.update(type="claim", action=ACTIONS[r.byte()], player=r.seat())
+        e["melds"] = r.melds()
+    elif code == HU:
+        e.update(type="hu", player=r.seat(), winner=r.seat())
+    elif code == WIN:
+        e.update(type="win", player=r.seat(), hand=r.tiles())
+    elif code == HAND:
+        e.update(type="hand", player=r.seat(), reason=HAND_REASONS[r.byte()])
+        tile = r.byte()
+        e.update(hand=r.tiles(), waits=r.tiles(), melds=r.melds())
+        if tile:
+            e["tile"] = tile
+    else:
+        raise ValueError("unknown event code %d" % code)
+    if room_id is not None:
+        e["room_id"] = room_id
+    if seq:
+        e["seq"] = seq
+    return e
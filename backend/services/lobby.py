@@ -0,0 +1,80 @@
+"""Secondary room indexes for player lookups and the lobby listing.
+
+The rooms router calls update() after every change to a room's seating or
+status. Each room keeps a cached summary that is only rebuilt then, and
+room ids are kept in sorted lists (all, per status, open seats) so a lobby
+page is a bisect plus a slice: O(log n + page) rather than a walk over every
+room. All methods run on the event loop thread.
+"""
+import bisect
+from typing import Dict, List, Optional, Set, Tuple
+
+# statuses in which a player's seat counts as taken
+ACTIVE_STATUSES = ("waiting", "playing")
+
+def _insert(ids: List[int], room_id: int):
+    i = bisect.bisect_left(ids, room_id)
+    if i == len(ids) or ids[i] != room_id:
+        ids.insert(i, room_id)
+
+def _discard(ids: List[int], room_id: int):
+    i = bisect.bisect_left(ids, room_id)
+    if i < len(ids) and ids[i] == room_id:
+        del ids[i]
+
+class RoomIndex:
+    def __init__(self):
+        self.summaries: Dict[int, dict] = {}
+        self.player_rooms: Dict[str, Set[int]] = {}
+        self.all_ids: List[int] = []
+        self.status_ids: Dict[str, List[int]] = {}
+        self.open_ids: List[int] = []
+
+    def update(self, room):
+        rid = room.room_id
+        old = self.summaries.get(rid)
+        open_seats = room.max_players - len(room.players) if room.status == "waiting" else 0
+        summary = {"room_id": rid, "status": room.status, "players": list(room.players),
+                   "max_players": room.max_players, "open_seats": max(0, open_seats)}
+        if summary == old:
+            return
+        # replaced, never mutated, so pages already handed out stay valid
+        self.summaries[rid] = summary
+        if old is None:
+            _insert(self.all_ids, rid)
+        old_status = old["status"] if old else None
+        if old_status != room.status:
+            if old_status is not None:
+                _discard(self.status_ids[old_status], rid)
+            _insert(self.status_ids.setdefault(room.status, []), rid)
+        was_open = bool(old and old["open_seats"])
+        if was_open != bool(summary["open_seats"]):
+            (_discard if was_open else _insert)(self.open_ids, rid)
+        seated_before = set(old["players"]) if old and old_status in ACTIVE_STATUSES else set()
+        seated_now = set(room.players) if room.status in ACTIVE_STATUSES else set()
+        for p in seated_before - seated_now:
+            seats = self.player_rooms.get(p)
+            if seats is not None:
+                seats.discard(rid)
+                if not seats:
+                    del self.player_rooms[p]
+        for p in seated_now - seated_before:
+            self.player_rooms.setdefault(p, set()).add(rid)
+
+    def rooms_of(self, player: str) -> List[int]:
+        """Rooms where `player` holds a seat in a waiting or playing game."""
+        return sorted(self.player_rooms.get(player, ()))
+
+    def page(self, status: Optional[str] = None, open_only: bool = False,
+             after: int = 0, limit: int = 50) -> Tuple[List[dict], Optional[int], int]:
+        """Summaries of rooms with id > `after`, the cursor for the next page and the match count."""
+        if open_only:
+            ids = self.open_ids if status in (None, "waiting") else []
+        elif status is not None:
+            ids = self.status_ids.get(status, [])
+        else:
+            ids = self.all_ids
+        start = bisect.bisect_right(ids, after)
+        chunk = ids[start:start + limit]
+        next_after = chunk[-1] if start + limit < len(ids) else None
+        return [self.summaries[i] for i in chunk], next_after, len(ids)
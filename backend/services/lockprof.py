@@ -0,0 +1,171 @@
+"""Opt-in lock contention profiler.
+
+ProfiledLock wraps a threading lock (rooms_lock) and stays in place for the
+life of the process; while the profiler is disabled an acquire costs one
+attribute check on top of the inner lock. Per-room asyncio locks are wrapped
+per acquisition by LockProfiler.wrap_async, and only while profiling, so
+disabled rooms pay nothing.
+
+Every acquisition records its wait and hold time under (lock name, call
+site), where the call site is the file:line of the `with` / `async with`
+statement. Each site keeps the last `samples` timings for percentiles plus
+running totals. Recording is lock-free: deque.append and dict.setdefault
+are atomic under the GIL.
+"""
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+def _site(depth: int) -> str:
+    frame = sys._getframe(depth + 1)
+    code = frame.f_code
+    return "%s:%d %s" % (os.path.basename(code.co_filename), frame.f_lineno, code.co_name)
+
+def _percentiles(samples: List[float]) -> dict:
+    """Nearest-rank p50/p95/p99 and max of `samples` (seconds) in microseconds."""
+    if not samples:
+        return {"p50_us": 0.0, "p95_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def at(q: float) -> float:
+        return round(ordered[min(last, int(q * len(ordered)))] * 1e6, 1)
+    return {"p50_us": at(0.50), "p95_us": at(0.95), "p99_us": at(0.99),
+            "max_us": round(ordered[-1] * 1e6, 1)}
+
+class _Site:
+    __slots__ = ("count", "wait_total", "hold_total", "waits", "holds")
+
+    def __init__(self, samples: int):
+        self.count = 0
+        self.wait_total = 0.0
+        self.hold_total = 0.0
+        self.waits: Deque[float] = deque(maxlen=samples)
+        self.holds: Deque[float] = deque(maxlen=samples)
+
+class LockProfiler:
+    def __init__(self, samples: int = 4096):
+        self.enabled = False
+        self.samples = samples
+        self.since: Optional[float] = None
+        self._sites: Dict[Tuple[str, str], _Site] = {}
+
+    def configure(self, enabled: Optional[bool] = None, samples: Optional[int] = None, reset: bool = False):
+        if samples is not None and samples != self.samples:
+            self.samples = max(1, int(samples))
+            reset = True
+        if reset:
+            self._sites = {}
+            self.since = time.time() if self.enabled else None
+        if enabled is not None and bool(enabled) != self.enabled:
+            self.enabled = bool(enabled)
+            if self.enabled:
+                self.since = time.time()
+
+    def record(self, lock: str, site: str, wait: float, hold: float):
+        entry = self._sites.get((lock, site))
+        if entry is None:
+            entry = self._sites.setdefault((lock, site), _Site(self.samples))
+        entry.count += 1
+        entry.wait_total += wait
+        entry.hold_total += hold
+        entry.waits.append(wait)
+        entry.holds.append(hold)
+
+    def wrap_async(self, lock, name: str) -> "_ProfiledAsyncLock":
+        return _ProfiledAsyncLock(self, lock, name)
+
+    def report(self) -> dict:
+        """Per-site totals and percentiles, sites with the most total wait first."""
+        sites = []
+        for (lock, site), entry in list(self._sites.items()):
+            sites.append({"lock": lock, "site": site, "count": entry.count,
+                          "wait_total_ms": round(entry.wait_total * 1e3, 3),
+                          "hold_total_ms": round(entry.hold_total * 1e3, 3),
+                          "wait": _percentiles(list(entry.waits)),
+                          "hold": _percentiles(list(entry.holds))})
+        sites.sort(key=lambda s: (-s["wait_total_ms"], -s["hold_total_ms"]))
+        return {"enabled": self.enabled, "since": self.since, "samples": self.samples, "sites": sites}
+
+class ProfiledLock:
+    """A threading lock that reports to `profiler` while it is enabled.
+
+    Only the owning thread writes the acquire bookkeeping, between acquire
+    and release, so it can live on the wrapper.
+    """
+    __slots__ = ("_lock", "_profiler", "_name", "_site", "_waited", "_acquired")
+
+    def __init__(self, lock, profiler: LockProfiler, name: str):
+        self._lock = lock
+        self._profiler = profiler
+        self._name = name
+        self._site: Optional[str] = None
+        self._waited = 0.0
+        self._acquired = 0.0
+
+    def _acquire(self, blocking: bool, timeout: float, depth: int) -> bool:
+        if not self._profiler.enabled:
+            ok = self._lock.acquire(blocking, timeout)
+            if ok:
+                self._site = None
+            return ok
+        site = _site(depth + 1)
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            self._acquired = now = time.perf_counter()
+            self._waited = now - t0
+            self._site = site
+        return ok
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._acquire(blocking, timeout, 1)
+
+    def __enter__(self) -> bool:
+        if not self._profiler.enabled:
+            self._lock.acquire()
+            self._site = None
+            return True
+        return self._acquire(True, -1, 1)
+
+    def release(self, *exc):
+        site = self._site
+        if site is None:
+            self._lock.release()
+            return
+        self._site = None
+        held = time.perf_counter() - self._acquired
+        waited = self._waited
+        self._lock.release()
+        self._profiler.record(self._name, site, waited, held)
+
+    __exit__ = release
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+class _ProfiledAsyncLock:
+    """One `async with` on an asyncio.Lock, timed and attributed to its call site."""
+    __slots__ = ("_profiler", "_lock", "_name", "_site", "_waited", "_acquired")
+
+    def __init__(self, profiler: LockProfiler, lock, name: str):
+        self._profiler = profiler
+        self._lock = lock
+        self._name = name
+
+    async def __aenter__(self):
+        # the awaiting coroutine's frame sits directly above this one
+        self._site = _site(1)
+        t0 = time.perf_counter()
+        await self._lock.acquire()
+        self._acquired = now = time.perf_counter()
+        self._waited = now - t0
+        return None
+
+    async def __aexit__(self, *exc):
+        held = time.perf_counter() - self._acquired
+        self._lock.release()
+        self._profiler.record(self._name, self._site, self._waited, held)
+        return False
@@ -0,0 +1,130 @@
+"""Matchmaking queue.
+
+Players enqueue with a table size (max_players). Each table size has its own
+heap ordered by (queued_at, seq), so the longest-waiting players are seated
+first and popping a full group costs O(group * log n). Cancelled or
+re-queued tickets stay in the heap and are skipped when popped (lazy
+deletion), so cancel is O(1).
+
+The queue only groups players; the rooms router turns groups into started
+rooms. A popped group that could not be seated is marked failed, and the
+players must enqueue again. Matched and failed tickets wait for the player
+to collect them (status or the socket); ones never collected are expired
+`ttl` seconds after they resolved. The expiry walk stops at the first
+ticket that is still live, because tickets are kept in resolution order.
+All methods run on the event loop thread.
+"""
+import heapq
+import itertools
+import secrets
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+class Ticket:
+    __slots__ = ("player", "secret", "max_players", "seq", "queued_at", "status",
+                 "room_id", "token", "matched_at")
+
+    def __init__(self, player: str, max_players: int, seq: int):
+        self.player = player
+        self.secret = secrets.token_urlsafe(16)
+        self.max_players = max_players
+        self.seq = seq
+        self.queued_at = time.time()
+        self.status = "queued"  # queued | matched | failed | cancelled
+        self.room_id: Optional[int] = None
+        self.token: Optional[str] = None  # seat token, set when matched
+        self.matched_at: Optional[float] = None
+
+    def view(self) -> dict:
+        out = {"player": self.player, "status": self.status, "max_players": self.max_players}
+        if self.status == "matched":
+            out.update(room_id=self.room_id, token=self.token)
+        return out
+
+class Matchmaker:
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.tickets: Dict[str, Ticket] = {}
+        self._heaps: Dict[int, List[Tuple[float, int, str]]] = {}
+        self._waiting: Dict[int, int] = {}  # live queued tickets per table size
+        self._seq = itertools.count(1)
+        # (resolved_at, ticket) for matched and failed tickets, oldest first
+        self._resolved: Deque[Tuple[float, Ticket]] = deque()
+
+    def enqueue(self, player: str, max_players: int) -> Ticket:
+        """Queue `player`; raises ValueError if they are already queued."""
+        current = self.tickets.get(player)
+        if current is not None and current.status == "queued":
+            raise ValueError("Player already queued")
+        ticket = Ticket(player, max_players, next(self._seq))
+        self.tickets[player] = ticket
+        heapq.heappush(self._heaps.setdefault(max_players, []), (ticket.queued_at, ticket.seq, player))
+        self._waiting[max_players] = self._waiting.get(max_players, 0) + 1
+        return ticket
+
+    def cancel(self, player: str) -> bool:
+        ticket = self.tickets.get(player)
+        if ticket is None or ticket.status != "queued":
+            return False
+        ticket.status = "cancelled"
+        self._waiting[ticket.max_players] -= 1
+        del self.tickets[player]
+        return True
+
+    def waiting(self, max_players: Optional[int] = None) -> int:
+        if max_players is None:
+            return sum(self._waiting.values())
+        return self._waiting.get(max_players, 0)
+
+    def ready(self) -> bool:
+        return any(n >= size for size, n in self._waiting.items())
+
+    def pop_groups(self, limit: int) -> List[List[Ticket]]:
+        """Pop up to `limit` full groups, longest-waiting players first."""
+        groups = []
+        for size, heap in self._heaps.items():
+            while self._waiting[size] >= size and len(groups) < limit:
+                group = []
+                while len(group) < size:
+                    _, seq, player = heapq.heappop(heap)
+                    ticket = self.tickets.get(player)
+                    if ticket is None or ticket.seq != seq or ticket.status != "queued":
+                        continue  # cancelled or superseded entry
+                    group.append(ticket)
+                self._waiting[size] -= size
+                groups.append(group)
+        return groups
+
+    def matched(self, ticket: Ticket, room_id: int, token: str):
+        ticket.status = "matched"
+        ticket.room_id = room_id
+        ticket.token = token
+        ticket.matched_at = time.time()
+        self._resolved.append((ticket.matched_at, ticket))
+
+    def failed(self, ticket: Ticket):
+        """Mark a popped ticket whose group could not be seated."""
+        if ticket.status != "queued":
+            return
+        ticket.status = "failed"
+        self._resolved.append((time.time(), ticket))
+
+    def forget(self, player: str):
+        """Drop a matched or failed ticket once the player has been told about it."""
+        ticket = self.tickets.get(player)
+        if ticket is not None and ticket.status in ("matched", "failed"):
+            del self.tickets[player]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop matched and failed tickets resolved more than `ttl` ago; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        dropped = 0
+        resolved = self._resolved
+        while resolved and resolved[0][0] <= cutoff:
+            ticket = resolved.popleft()[1]
+            # skip tickets already collected or replaced by a new enqueue
+            if self.tickets.get(ticket.player) is ticket:
+                del self.tickets[ticket.player]
+                dropped += 1
+        return dropped
@@ -0,0 +1,83 @@
+"""Deep-size estimates of live server state.
+
+deep_size() adds up sys.getsizeof over everything an object references:
+dict keys and values, list/tuple/set/deque items, instance __dict__ and
+__slots__. Every object is counted once per `seen` set. Pass one set through
+a whole pass, so objects shared between rooms (event key strings, player
+names in several tables) are charged once, to the first room that reaches
+them. The walk never follows into shared process state: classes, modules,
+functions, event loops and the small-int cache are skipped. Objects of the
+`shallow` types count only their own size (a WebSocket's scope references
+the whole app).
+
+These are estimates of what the state holds, not of allocator overhead or
+free lists. benchmarks/bench_memory.py checks them against tracemalloc.
+"""
+import asyncio
+import sys
+import types
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+         asyncio.AbstractEventLoop)
+_LEAVES = (str, bytes, bytearray, int, float, complex)
+_SEQUENCES = (list, tuple, set, frozenset, deque)
+
+def _slots(cls) -> Tuple[str, ...]:
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return tuple(names)
+
+_slot_names: Dict[type, Tuple[str, ...]] = {}
+
+def deep_size(obj, seen: Optional[Set[int]] = None, shallow: tuple = ()) -> int:
+    """Bytes held by `obj` and what it references, skipping ids already in `seen`."""
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if o is None or o is True or o is False or isinstance(o, _SKIP):
+            continue
+        if type(o) is int and -5 <= o <= 256:
+            continue  # cached by the interpreter
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, _LEAVES) or (shallow and isinstance(o, shallow)):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, _SEQUENCES):
+            stack.extend(o)
+        else:
+            attrs = getattr(o, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            cls = type(o)
+            names = _slot_names.get(cls)
+            if names is None:
+                names = _slot_names[cls] = _slots(cls)
+            for name in names:
+                stack.append(getattr(o, name, None))
+    return size
+
+# Room attributes reported on their own; the rest is "room"
+ROOM_PARTS = ("deck", "hands", "discards", "melds", "pending_discard", "seat_tokens")
+
+def room_parts(room, seen: Set[int]) -> Dict[str, int]:
+    """deep_size of a models.room.Room split into ROOM_PARTS and "room" (the object and the rest)."""
+    seen.add(id(room))
+    attrs = vars(room)
+    seen.add(id(attrs))
+    parts = {"room": sys.getsizeof(room) + sys.getsizeof(attrs)}
+    for name, value in attrs.items():
+        key = name if name in ROOM_PARTS else "room"
+        parts[key] = parts.get(key, 0) + deep_size(name, seen) + deep_size(value, seen)
+    return parts
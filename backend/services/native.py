@@ -0,0 +1,282 @@
+"""Resolve the mahjong_core engine once per process.
+
+load() returns the engine module: the native extension when it can be
+found, else (only if MJ_NATIVE_FALLBACK=1) the pure-Python port
+(services/pycore.py), else None. The first call
+resolves it and every later call returns the same module from a global.
+Resolution tries, in order:
+
+  cache   the extension path a previous process resolved, kept in a small
+          JSON file and trusted only while the file's size and mtime and
+          this interpreter's extension suffix still match
+  import  a regular `import mahjong_core` from sys.path (an installed or
+          copied extension)
+  scan    mahjong_core/ and its build output dirs under backend/, probing
+          only the file names this interpreter can load
+
+A hit from import or scan is written back to the cache. Running from
+backend/, `import mahjong_core` finds the mahjong_core/ source directory
+first and imports it as an empty namespace package. That package is never
+returned, and it is taken out of sys.modules so it can't shadow the
+extension.
+
+MJ_NATIVE_CACHE sets the cache file ("" turns the cache off). The pycore
+fallback is off by default. It is far slower, and the server runs engine
+calls such as bot policies inline on the event loop, so a missing
+extension should fail loudly rather than slow every room down. Set
+MJ_NATIVE_FALLBACK=1 to allow it (tools, tests, machines without a
+compiler). info() reports what was loaded, from where and how long
+resolving it took.
+
+The module also holds the call helpers shared by the rooms router and the
+app's /check_win endpoints. native_view(mc) marks the engine's calls for
+the sampling profiler. timed_call() and timed_is_win() observe
+mahjong_native_seconds and add trace spans. run() awaits a call on the
+native pool (MJ_NATIVE_WORKERS threads, 0 = inline), which
+configure_pool() resizes.
+"""
+import asyncio
+import importlib.machinery
+import importlib.util
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services import metrics, tracing
+from services.sampler import NativeView
+
+logger = logging.getLogger("uvicorn.error")
+
+NAME = "mahjong_core"
+_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_DIRS = (
+    os.path.join(_BASE, NAME),
+    os.path.join(_BASE, NAME, "Release"),
+    os.path.join(_BASE, NAME, "build", "Release"),
+    os.path.join(_BASE, NAME, "build"),
+)
+DEFAULT_CACHE = os.path.join(_BASE, NAME, ".resolved.json")
+
+_lock = threading.Lock()
+_resolved = False
+_module = None
+_info: dict = {"backend": None, "source": None, "path": None, "seconds": None, "errors": []}
+
+def load():
+    """The engine module (native, else pycore if enabled); None if neither is available."""
+    if _resolved:
+        return _module
+    with _lock:
+        if not _resolved:
+            _resolve()
+    return _module
+
+def info() -> dict:
+    """backend ("native", "pycore" or None), source, path, seconds and load errors of the last resolve."""
+    load()
+    return dict(_info, errors=list(_info["errors"]))
+
+def reset():
+    """Forget the resolved module, so the next load() resolves again (tests, benchmarks)."""
+    global _resolved, _module
+    with _lock:
+        _resolved = False
+        _module = None
+
+def cache_path() -> Optional[str]:
+    path = os.getenv("MJ_NATIVE_CACHE", DEFAULT_CACHE)
+    return path or None
+
+def candidates() -> List[str]:
+    """Extension files in SEARCH_DIRS that this interpreter can load, best suffix first."""
+    found = []
+    for d in SEARCH_DIRS:
+        for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+            path = os.path.join(d, NAME + suffix)
+            if os.path.isfile(path):
+                found.append(path)
+    return found
+
+def _usable(mod) -> bool:
+    return hasattr(mod, "is_win")
+
+def _stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "suffix": importlib.machinery.EXTENSION_SUFFIXES[0]}
+
+def _read_cache(cache: Optional[str]) -> Optional[str]:
+    if not cache:
+        return None
+    try:
+        with open(cache) as f:
+            entry = json.load(f)
+        return entry["path"] if entry == _stamp(entry["path"]) else None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _write_cache(cache: Optional[str], path: str):
+    if not cache:
+        return
+    try:
+        tmp = cache + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(_stamp(path), f)
+        os.replace(tmp, cache)
+    except OSError as e:
+        logger.debug("could not write %s: %s", cache, e)
+
+def _load_file(path: str):
+    loader = importlib.machinery.ExtensionFileLoader(NAME, path)
+    spec = importlib.util.spec_from_file_location(NAME, path, loader=loader)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def _import():
+    try:
+        mod = sys.modules.get(NAME) or importlib.import_module(NAME)
+    except ImportError:
+        return None
+    if _usable(mod):
+        return mod
+    # the source directory imported as a namespace package
+    if sys.modules.get(NAME) is mod:
+        del sys.modules[NAME]
+    return None
+
+def _find(cache: Optional[str], errors: List[str]) -> Tuple[object, Optional[str], Optional[str]]:
+    """(module, source, path) of the first native engine that loads."""
+    cached = _read_cache(cache)
+    tried = set()
+    if cached:
+        tried.add(cached)
+        try:
+            mod = _load_file(cached)
+            if _usable(mod):
+                return mod, "cache", cached
+        except Exception as e:
+            errors.append("%s: %s" % (cached, e))
+    mod = _import()
+    if mod is not None:
+        path = getattr(mod, "__file__", None)
+        if path and path != cached:
+            _write_cache(cache, path)
+        return mod, "import", path
+    for path in candidates():
+        if path in tried:
+            continue
+        try:
+            mod = _load_file(path)
+        except Exception as e:
+            errors.append("%s: %s" % (path, e))
+            continue
+        if _usable(mod):
+            _write_cache(cache, path)
+            return mod, "scan", path
+        errors.append("%s: no is_win" % path)
+    return None, None, None
+
+def _resolve():
+    global _resolved, _module
+    t0 = time.perf_counter()
+    errors: List[str] = []
+    mod, source, path = _find(cache_path(), errors)
+    backend = "native"
+    if mod is not None:
+        sys.modules[NAME] = mod
+    elif os.getenv("MJ_NATIVE_FALLBACK", "0").lower() in ("1", "true", "yes"):
+        from services import pycore as mod
+        backend, source, path = "pycore", "fallback", mod.__file__
+    else:
+        backend = None
+    seconds = time.perf_counter() - t0
+    _info.update(backend=backend, source=source, path=path, seconds=seconds, errors=errors)
+    for e in errors:
+        logger.warning("mahjong_core: failed to load %s", e)
+    if backend is None:
+        logger.error("mahjong_core: extension not found and the pycore fallback is disabled"
+                     " (MJ_NATIVE_FALLBACK=1 enables it)")
+    elif backend == "pycore":
+        logger.warning("mahjong_core: extension not found, using the pure-Python engine from %s", path)
+    else:
+        logger.info("mahjong_core: %s backend from %s (%s) in %.1f ms", backend, path, source, seconds * 1e3)
+    _module = mod
+    _resolved = True
+
+NATIVE_SECONDS = metrics.registry.histogram(
+    "mahjong_native_seconds", "mahjong_core call latency (wait_set is one is_win per candidate tile).",
+    ("call",), metrics.FAST_BUCKETS)
+
+# native evaluation (is_win, wait sets, bulk checks) can run on a small
+# dedicated pool so it neither blocks the event loop nor takes Starlette's
+# threadpool slots. MJ_NATIVE_WORKERS=0 runs it inline on the loop instead.
+NATIVE_WORKERS = int(os.getenv("MJ_NATIVE_WORKERS", 2))
+_executor: Optional[ThreadPoolExecutor] = None
+
+def configure_pool(workers: int):
+    """Set the native pool size (0 = evaluate inline on the event loop)."""
+    global NATIVE_WORKERS, _executor
+    old, _executor = _executor, None
+    NATIVE_WORKERS = max(0, int(workers))
+    if NATIVE_WORKERS:
+        _executor = ThreadPoolExecutor(max_workers=NATIVE_WORKERS, thread_name_prefix="mahjong-native")
+    if old is not None:
+        old.shutdown(wait=False)
+
+configure_pool(NATIVE_WORKERS)
+
+async def run(fn, *args):
+    """Await fn(*args) on the native pool (inline when the pool is disabled)."""
+    if _executor is None:
+        return fn(*args)
+    if tracing.current() is None:
+        return await asyncio.get_event_loop().run_in_executor(_executor, fn, *args)
+    # pool threads don't see the request's trace, so time the whole hop here
+    t0 = time.perf_counter()
+    try:
+        return await asyncio.get_event_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        tracing.add_span("native_pool:" + fn.__name__, t0, time.perf_counter() - t0)
+
+def timed_call(fn: Callable, call: str) -> Callable:
+    """fn observed in mahjong_native_seconds{call} and as a span of a sampled trace."""
+    observe = NATIVE_SECONDS.observe
+    clock = time.perf_counter
+    span = "native:" + call
+
+    def wrapper(*args):
+        t0 = clock()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = clock() - t0
+            observe(elapsed, call)
+            tracing.add_span(span, t0, elapsed)
+    return wrapper
+
+_views: Dict[object, NativeView] = {}
+_timed_is_win: Dict[object, Callable] = {}
+
+def native_view(mc) -> Optional[NativeView]:
+    """mc with its calls marked for the sampling profiler (GET /rooms/admin/profile)."""
+    if mc is None:
+        return None
+    view = _views.get(mc)
+    if view is None:
+        view = _views[mc] = NativeView(mc)
+    return view
+
+def timed_is_win(mc) -> Optional[Callable]:
+    """mc.is_win, observed as mahjong_native_seconds{call="is_win"}."""
+    if mc is None:
+        return None
+    fn = _timed_is_win.get(mc)
+    if fn is None:
+        fn = _timed_is_win[mc] = timed_call(native_view(mc).is_win, "is_win")
+    return fn
@@ -0,0 +1,177 @@
+"""Pure-Python implementation of the mahjong_core API.
+
+Same functions, arguments and results as the native extension
+(mahjong_core/mahjong_core.cpp), following the same algorithms line for
+line: is_win's pair-then-greedy-melds check, the per-suit memoized shanten
+decomposition and the discard table. It is the fallback when the extension
+isn't built and the reference the native benchmarks are checked against
+(benchmarks/bench_native.py), so a change to either side must keep them in
+agreement.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+def is_win(tiles: Sequence[int]) -> bool:
+    """Simplified win check, input 14 tiles, return true if win."""
+    if len(tiles) != 14:
+        return False
+    counts = [0] * 40
+    for t in tiles:
+        if t < 1 or t > 39:
+            return False
+        counts[t] += 1
+    for i in range(1, 40):
+        if counts[i] >= 2:
+            temp = counts[:]
+            temp[i] -= 2
+            melds = 0
+            for j in range(1, 40):
+                if temp[j] >= 3:
+                    melds += temp[j] // 3
+                    temp[j] %= 3
+                if j <= 27:
+                    while temp[j] and temp[j + 1] and temp[j + 2]:
+                        temp[j] -= 1
+                        temp[j + 1] -= 1
+                        temp[j + 2] -= 1
+                        melds += 1
+            if melds == 4:
+                return True
+    return False
+
+def is_win_batch(packed: bytes) -> bytes:
+    """Win check for packed hands (14 bytes each), returns one byte per hand."""
+    if len(packed) % 14:
+        raise ValueError("packed hands must be a multiple of 14 bytes")
+    return bytes(1 if is_win(packed[i:i + 14]) else 0 for i in range(0, len(packed), 14))
+
+# most partial blocks for (pair 0/1, melds 0..4), -1 = unreachable, keyed by
+# (sequences allowed, group counts); emptied when it reaches _GROUPS_MAX so it
+# stays bounded, as the native tables are
+_groups: Dict[Tuple[bool, Tuple[int, ...]], List[List[int]]] = {}
+_GROUPS_MAX = 1 << 16
+
+def _group_dfs(c: List[int], seqs: bool, i: int, melds: int, partials: int, pair: int, r: List[List[int]]):
+    n = len(c)
+    while i < n and c[i] == 0:
+        i += 1
+    if i == n:
+        m = min(melds, 4)
+        t = min(partials, 8)
+        if t > r[pair][m]:
+            r[pair][m] = t
+        return
+    if c[i] >= 3:
+        c[i] -= 3
+        _group_dfs(c, seqs, i, melds + 1, partials, pair, r)
+        c[i] += 3
+    if seqs and i + 2 < n and c[i + 1] and c[i + 2]:
+        c[i] -= 1
+        c[i + 1] -= 1
+        c[i + 2] -= 1
+        _group_dfs(c, seqs, i, melds + 1, partials, pair, r)
+        c[i] += 1
+        c[i + 1] += 1
+        c[i + 2] += 1
+    if c[i] >= 2:
+        c[i] -= 2
+        if not pair:
+            _group_dfs(c, seqs, i, melds, partials, 1, r)
+        _group_dfs(c, seqs, i, melds, partials + 1, pair, r)
+        c[i] += 2
+    if seqs:
+        for d in (1, 2):
+            if i + d < n and c[i + d]:
+                c[i] -= 1
+                c[i + d] -= 1
+                _group_dfs(c, seqs, i, melds, partials + 1, pair, r)
+                c[i] += 1
+                c[i + d] += 1
+    # leave one copy isolated
+    c[i] -= 1
+    _group_dfs(c, seqs, i, melds, partials, pair, r)
+    c[i] += 1
+
+def _group_blocks(counts: Sequence[int], seqs: bool) -> List[List[int]]:
+    key = (seqs, tuple(counts))
+    r = _groups.get(key)
+    if r is None:
+        r = [[-1] * 5, [-1] * 5]
+        _group_dfs(list(counts), seqs, 0, 0, 0, 0, r)
+        if len(_groups) >= _GROUPS_MAX:
+            _groups.clear()
+        _groups[key] = r
+    return r
+
+def _shanten_counts(counts: Sequence[int], size: int) -> int:
+    target = size // 3
+    best = 2 * target
+    acc = [[0, -1, -1, -1, -1], [-1] * 5]
+    for g, start in enumerate((1, 10, 19, 28)):
+        r = _group_blocks(counts[start:start + (9 if g < 3 else 12)], g < 3)
+        nxt = [[-1] * 5, [-1] * 5]
+        for p1 in (0, 1):
+            for m1 in range(5):
+                a = acc[p1][m1]
+                if a < 0:
+                    continue
+                for p2 in range(2 - p1):
+                    for m2 in range(5):
+                        b = r[p2][m2]
+                        if b < 0:
+                            continue
+                        m = min(4, m1 + m2)
+                        if a + b > nxt[p1 + p2][m]:
+                            nxt[p1 + p2][m] = a + b
+        acc = nxt
+    for p in (0, 1):
+        for m in range(5):
+            if acc[p][m] < 0:
+                continue
+            mm = min(m, target)
+            t = min(acc[p][m], target - mm)
+            best = min(best, 2 * (target - mm) - t - p)
+    return best
+
+def _count(tiles: Sequence[int]) -> List[int]:
+    counts = [0] * 40
+    for t in tiles:
+        if t < 1 or t > 39:
+            raise ValueError("tile out of range")
+        counts[t] += 1
+    return counts
+
+def shanten(tiles: Sequence[int]) -> int:
+    """Tiles away from ready (0) or complete (-1) for the melds + pair shape."""
+    return _shanten_counts(_count(tiles), len(tiles))
+
+def discard_table(tiles: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """(tile, shanten after discarding it, ukeire) for each distinct tile in the hand."""
+    counts = _count(tiles)
+    size = len(tiles)
+    near = [False] * 40
+    for t in range(1, 40):
+        if not counts[t]:
+            continue
+        if t > 27:
+            near[t] = True
+            continue
+        lo = (t - 1) // 9 * 9 + 1
+        for c in range(max(lo, t - 2), min(lo + 8, t + 2) + 1):
+            near[c] = True
+    out = []
+    for t in range(1, 40):
+        if not counts[t]:
+            continue
+        counts[t] -= 1
+        s = _shanten_counts(counts, size - 1)
+        ukeire = 0
+        for c in range(1, 40):
+            if not near[c] or counts[c] >= 4:
+                continue
+            counts[c] += 1
+            if _shanten_counts(counts, size) < s:
+                ukeire += 4 - (counts[c] - 1)
+            counts[c] -= 1
+        counts[t] += 1
+        out.append((t, s, ukeire))
+    return out
@@ -0,0 +1,41 @@
+"""Response classes.
+
+FastJSONResponse uses orjson when it is installed and the stdlib json module
+otherwise. The content must already be JSON-native (dicts, lists, str, int,
+float, bool, None): nothing is passed through jsonable_encoder.
+
+DuplexStreamingResponse streams a body produced while the request body is
+still being read.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator consumes the request body itself.
+
+    The stock class may read receive() to watch for a disconnect while it
+    streams, which would swallow the request chunks the iterator is waiting
+    for. Here a client that goes away surfaces as a send error instead.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,128 @@
+"""On-demand sampling profiler.
+
+StackSampler.capture() runs on its own thread. Every 1/hz seconds it reads
+sys._current_frames() and counts each thread's stack as a collapsed line:
+"thread;outer (file:line);...;inner (file:line) count". That is the input
+format of flamegraph.pl, speedscope and similar tools. Only the sampling
+thread does work; the sampled threads are never paused beyond the GIL
+handoff.
+
+The native extension releases the GIL, so a thread inside mahjong_core
+shows only its Python caller on the stack. NativeView wraps the module's
+functions with a per-thread marker, and the sampler appends a
+"mahjong_core.<fn> [native]" leaf for threads inside one of them. Time in
+the extension then shows up as its own frame instead of being charged to
+the caller.
+
+Stacks whose leaf is an idle wait (selector poll, thread pool queue, lock
+wait) are dropped unless idle=True, so the event loop's idle time doesn't
+swamp the profile.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+# thread ident -> native function it is currently inside
+_native_calls: Dict[int, str] = {}
+
+_IDLE = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+def _marked(fn: Callable, name: str) -> Callable:
+    get_ident = threading.get_ident
+
+    def wrapper(*args):
+        tid = get_ident()
+        outer = _native_calls.get(tid)
+        _native_calls[tid] = name
+        try:
+            return fn(*args)
+        finally:
+            if outer is None:
+                del _native_calls[tid]
+            else:
+                _native_calls[tid] = outer
+    wrapper.__wrapped__ = fn
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    return wrapper
+
+class NativeView:
+    """The native module with every public function marked for the sampler."""
+
+    def __init__(self, module, prefix: str = "mahjong_core"):
+        self.__wrapped__ = module
+        for attr in dir(module):
+            value = getattr(module, attr)
+            if not attr.startswith("_") and callable(value):
+                setattr(self, attr, _marked(value, "%s.%s [native]" % (prefix, attr)))
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+class StackSampler:
+    def __init__(self):
+        self._busy = threading.Lock()
+        # thread ident -> display name override (the event loop)
+        self.names: Dict[int, str] = {}
+
+    @property
+    def busy(self) -> bool:
+        return self._busy.locked()
+
+    def capture(self, seconds: float, hz: float, idle: bool = False) -> Optional[dict]:
+        """Sample every thread but this one; None if a capture is already running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return self._capture(seconds, hz, idle)
+        finally:
+            self._busy.release()
+
+    def _capture(self, seconds: float, hz: float, idle: bool) -> dict:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        stacks: Counter = Counter()
+        ticks = 0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        next_tick = t0
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+            next_tick += interval
+            ticks += 1
+            names = {t.ident: t.name for t in threading.enumerate()}
+            names.update(self.names)
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                native = _native_calls.get(tid)
+                code = frame.f_code
+                if native is None and not idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(tid, "thread-%d" % tid))
+                labels.reverse()
+                if native is not None:
+                    labels.append(native)
+                stacks[";".join(labels)] += 1
+        return {"stacks": stacks, "ticks": ticks, "seconds": time.perf_counter() - t0}
+
+def collapsed(stacks: Counter) -> bytes:
+    """Collapsed-stack text, most frequent stack first."""
+    return "".join("%s %d\n" % (stack, n) for stack, n in stacks.most_common()).encode()
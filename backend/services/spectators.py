@@ -0,0 +1,173 @@
+"""Per-room spectator fan-out.
+
+Spectators are kept out of room_connections so player sockets never wait on
+them. Each room with watchers gets one SpectatorPublisher task on the event
+loop: public events are pushed to it, held for `delay` seconds (broadcast
+delay for featured tables), coalesced over a `coalesce` window into a single
+frame, encoded once per wire format and written to all spectators with at
+most `concurrency` sends in flight. Spectators that can't take a frame
+within `send_timeout` are dropped and their socket is closed with 1013 (try
+again later), so the client reconnects with ?since= rather than waiting on a
+stream that no longer feeds it.
+
+A joining spectator's catch-up is replayed by its own task, so a slow
+joiner never holds up the live stream. Live frames released while it
+catches up queue behind its catch-up. The socket joins the live set once
+that queue is empty.
+
+All methods must be called on the event loop thread.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("uvicorn.error")
+
+# close code for a dropped spectator: 1013 "try again later"
+DROP_CLOSE_CODE = 1013
+
+class SpectatorPublisher:
+    def __init__(self, room_id: int,
+                 encode: Callable,
+                 send: Callable,
+                 catch_up: Callable,
+                 delay: float = 0.0,
+                 coalesce: float = 0.05,
+                 concurrency: int = 64,
+                 send_timeout: float = 5.0):
+        """`encode(ws, event, cache)` returns the frame for ws's wire format,
+        `send(ws, frame)` is a coroutine writing it and
+        `catch_up(ws, since, released_seq)` lists the events a joining
+        spectator needs before the live stream.
+        """
+        self.room_id = room_id
+        self.delay = delay
+        self.coalesce = coalesce
+        self.send_timeout = send_timeout
+        self.spectators: Set = set()
+        # spectators still replaying their catch-up: frames queued for each, and its task
+        self._joining: Dict[object, Deque] = {}
+        self._replays: Dict[object, asyncio.Future] = {}
+        # highest seq already written to spectators
+        self.released_seq = 0
+        self._encode = encode
+        self._send = send
+        self._catch_up = catch_up
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        # FIFO of ("event", loop_time, event) and ("join", ws, since) items
+        self._pending: Deque[Tuple] = deque()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.ensure_future(self._run())
+
+    def push(self, event: dict):
+        if self._closed:
+            return
+        self._pending.append(("event", asyncio.get_event_loop().time(), event))
+        self._wakeup.set()
+
+    def join(self, ws, since: Optional[int] = None):
+        """Queue a spectator; it gets its catch-up frames in order before live ones."""
+        self._pending.append(("join", ws, since))
+        self._wakeup.set()
+
+    def leave(self, ws):
+        self.spectators.discard(ws)
+        replay = self._replays.get(ws)
+        if replay is not None:
+            replay.cancel()
+        if any(item[0] == "join" and item[1] is ws for item in self._pending):
+            self._pending = deque(item for item in self._pending if not (item[0] == "join" and item[1] is ws))
+
+    def idle(self) -> bool:
+        return not self.spectators and not self._joining and not any(item[0] == "join" for item in self._pending)
+
+    def close(self):
+        self._closed = True
+        self._task.cancel()
+        for replay in list(self._replays.values()):
+            replay.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        try:
+            while not self._closed:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                kind, first, payload = self._pending[0]
+                if kind == "join":
+                    self._pending.popleft()
+                    self._admit(first, payload)
+                    continue
+                # wait until the oldest event is due, plus the coalescing window
+                wait = first + self.delay + self.coalesce - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                cutoff = loop.time() - self.delay
+                batch = []
+                while self._pending and self._pending[0][0] == "event" and self._pending[0][1] <= cutoff:
+                    batch.append(self._pending.popleft()[2])
+                if batch:
+                    await self._publish(batch)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Spectator publisher for room %s crashed", self.room_id)
+
+    def _admit(self, ws, since: Optional[int]):
+        # catch-up up to released_seq, taken before anything newer is released
+        queued = deque(self._encode(ws, event, None) for event in self._catch_up(ws, since, self.released_seq))
+        self._joining[ws] = queued
+        self._replays[ws] = asyncio.ensure_future(self._replay(ws, queued))
+
+    async def _replay(self, ws, queued: Deque):
+        try:
+            while queued:
+                if not await self._deliver(ws, queued.popleft()):
+                    self._drop(ws)
+                    return
+            # nothing queued and no await before this: the next live frame goes to the set
+            self.spectators.add(ws)
+        finally:
+            self._joining.pop(ws, None)
+            self._replays.pop(ws, None)
+
+    async def _publish(self, batch: List[dict]):
+        self.released_seq = max(self.released_seq, batch[-1].get("seq", 0))
+        if not self.spectators and not self._joining:
+            return
+        if len(batch) == 1:
+            event = batch[0]
+        else:
+            event = {"type": "batch", "room_id": self.room_id, "events": batch}
+        frames = {}
+        for ws, queued in self._joining.items():
+            queued.append(self._encode(ws, event, frames))
+        targets = list(self.spectators)
+        results = await asyncio.gather(*[self._deliver(ws, self._encode(ws, event, frames)) for ws in targets])
+        for ws, ok in zip(targets, results):
+            if not ok:
+                self.spectators.discard(ws)
+                self._drop(ws)
+
+    async def _deliver(self, ws, frame) -> bool:
+        async with self._sem:
+            try:
+                await asyncio.wait_for(self._send(ws, frame), self.send_timeout)
+                return True
+            except Exception:
+                logger.info("Dropping slow or closed spectator in room %s", self.room_id)
+                return False
+
+    def _drop(self, ws):
+        # closed off to the side: a stalled socket's close must not hold up the stream
+        asyncio.ensure_future(self._close(ws))
+
+    async def _close(self, ws):
+        try:
+            await asyncio.wait_for(ws.close(code=DROP_CLOSE_CODE), self.send_timeout)
+        except Exception:
+            pass
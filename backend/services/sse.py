@@ -0,0 +1,63 @@
+"""Server-Sent Events fan-out for read-only room observers.
+
+Each room with observers gets one EventChannel. Public events are encoded
+into an SSE frame once, when they are published, and kept in a short ring
+of (seq, frame) pairs; every observer stream just walks that shared ring
+from its own cursor, so a frame costs one encode no matter how many
+observers are attached and an observer costs one generator and an int.
+
+All methods must be called on the event loop thread.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from services import codec
+
+def format_event(seq: int, event: dict) -> bytes:
+    """One SSE frame; the room seq is the event id, so Last-Event-ID resumes from it."""
+    return b"id: %d\ndata: %s\n\n" % (seq, codec.encode_json(event).encode("utf-8"))
+
+class EventChannel:
+    def __init__(self, room_id: int, seq: int = 0, size: int = 64):
+        self.room_id = room_id
+        # seq of the newest event published (or already caught up when created)
+        self.seq = seq
+        # frames after `floor` are all still in the ring
+        self.floor = seq
+        self.frames: Deque[Tuple[int, bytes]] = deque(maxlen=size)
+        self.observers = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, event: dict):
+        seq = event.get("seq", self.seq + 1)
+        if len(self.frames) == self.frames.maxlen:
+            self.floor = self.frames[0][0]
+        self.frames.append((seq, format_event(seq, event)))
+        self.seq = seq
+        # wake everyone waiting on this generation, then start the next one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def since(self, cursor: int) -> Optional[List[bytes]]:
+        """Frames after `cursor`, or None if the ring no longer reaches back that far.
+
+        Room seqs also count private events, which never reach the channel, so
+        published seqs have gaps; `floor` rather than contiguity decides whether
+        anything after `cursor` was evicted.
+        """
+        if cursor >= self.seq:
+            return []
+        if cursor < self.floor:
+            return None
+        return [frame for seq, frame in self.frames if seq > cursor]
+
+    async def wait(self, cursor: int, timeout: float) -> bool:
+        """Wait until an event newer than `cursor` is published; False on timeout."""
+        if self.seq > cursor:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
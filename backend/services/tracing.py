@@ -0,0 +1,277 @@
+"""Sampled request tracing to a rotating NDJSON file.
+
+A request handler calls tracer.start(name); with probability `rate` that
+returns a Trace made current for the request's context (a ContextVar, so it
+follows awaits but not other tasks), otherwise None. Code on the request
+path records child spans either around a block:
+
+    with tracing.span("engine:" + command):
+        ...
+
+or after the fact, when it already timed the work itself:
+
+    tracing.add_span("native:is_win", t0, elapsed)
+
+With no current trace, span() returns a shared no-op context manager and
+add_span() returns at once, so an unsampled request allocates nothing for
+tracing. Timestamps are time.perf_counter() values; spans are written as
+microsecond offsets from the request start.
+
+tracer.finish() hands the finished trace to a QueueHandler. A listener
+thread builds the record, JSON-encodes it and appends one line to a RotatingFileHandler, so the
+event loop never formats or writes trace records.
+"""
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from typing import List, Optional
+
+_current: contextvars.ContextVar = contextvars.ContextVar("mahjong_trace", default=None)
+
+class Trace:
+    __slots__ = ("trace_id", "name", "attrs", "wall", "start", "spans", "stack", "done")
+
+    def __init__(self, trace_id: str, name: str, attrs: Optional[dict]):
+        self.trace_id = trace_id
+        self.name = name
+        # request parameters, scalars only (dependencies like _auth are skipped)
+        self.attrs = {k: v for k, v in (attrs or {}).items()
+                      if not k.startswith("_") and isinstance(v, (str, int, float, bool))}
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        # [name, start, duration, parent index (-1 = the request), attrs]
+        self.spans: List[list] = []
+        self.stack: List[int] = []
+        self.done = False
+
+    def add(self, name: str, start: float, duration: float, attrs: Optional[dict] = None) -> int:
+        if self.done:
+            return -1
+        self.spans.append([name, start, duration, self.stack[-1] if self.stack else -1, attrs])
+        return len(self.spans) - 1
+
+    def record(self, duration: float, status: Optional[int]) -> dict:
+        return {
+            "trace_id": self.trace_id, "name": self.name, "time": self.wall,
+            "duration_us": round(duration * 1e6, 1), "status": status, "attrs": self.attrs,
+            "spans": [{"name": name, "offset_us": round((start - self.start) * 1e6, 1),
+                       "duration_us": round(dur * 1e6, 1), "parent": parent, "attrs": attrs}
+                      for name, start, dur, parent, attrs in self.spans],
+        }
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "index")
+
+    def __init__(self, trace: Trace, name: str, attrs: Optional[dict]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        trace = self.trace
+        self.index = trace.add(self.name, time.perf_counter(), 0.0, self.attrs)
+        if self.index >= 0:
+            trace.stack.append(self.index)
+        return self
+
+    def __exit__(self, *exc):
+        if self.index < 0:
+            return False
+        trace = self.trace
+        entry = trace.spans[self.index]
+        entry[2] = time.perf_counter() - entry[1]
+        if trace.stack and trace.stack[-1] == self.index:
+            trace.stack.pop()
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+def span(name: str, attrs: Optional[dict] = None):
+    """Time a block as a child of the innermost open span of the current trace."""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, attrs)
+
+def add_span(name: str, start: float, duration: float):
+    """Record already-timed work (perf_counter start, seconds) in the current trace."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start, duration)
+
+class untraced:
+    """Run a block (typically creating a task) outside the current trace."""
+    __slots__ = ("token",)
+
+    def __enter__(self):
+        self.token = _current.set(None) if _current.get() is not None else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.token is not None:
+            _current.reset(self.token)
+        return False
+
+class _JSONLines(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        trace, duration, status = record.msg
+        return json.dumps(trace.record(duration, status), separators=(",", ":"))
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting happens on the listener thread
+        return record
+
+class Tracer:
+    def __init__(self):
+        self.rate = 0.0
+        self.path: Optional[str] = None
+        self.max_bytes = 10 * 1024 * 1024
+        self.backups = 5
+        self._ids = itertools.count(1)
+        self._prefix = "%x" % random.getrandbits(32)
+        self._logger = logging.getLogger("mahjong.trace")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler: Optional[logging.Handler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def configure(self, rate: Optional[float] = None, path: Optional[str] = None,
+                  max_bytes: Optional[int] = None, backups: Optional[int] = None):
+        """Set the sample rate (0..1), output file and rotation.
+
+        The file (and its directory) is only opened once the rate is above 0.
+        """
+        reopen = False
+        if path is not None and path != self.path:
+            self.path, reopen = path, True
+        if max_bytes is not None and max_bytes != self.max_bytes:
+            self.max_bytes, reopen = max(0, int(max_bytes)), True
+        if backups is not None and backups != self.backups:
+            self.backups, reopen = max(0, int(backups)), True
+        if rate is not None:
+            self.rate = min(1.0, max(0.0, float(rate)))
+        if reopen:
+            self.close()
+        if self.rate > 0.0 and self._handler is None and self.path:
+            self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        out = logging.handlers.RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                                   encoding="utf-8", delay=True)
+        out.setFormatter(_JSONLines())
+        records: queue.Queue = queue.Queue()
+        self._handler = _DeferredQueueHandler(records)
+        self._listener = logging.handlers.QueueListener(records, out)
+        self._listener.start()
+        self._logger.addHandler(self._handler)
+
+    def close(self):
+        """Stop exporting, after writing out every queued trace."""
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+            self._handler = None
+        if self._listener is not None:
+            self._listener.stop()  # drains the queue first
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+    def start(self, name: str, attrs: Optional[dict] = None):
+        """Sample a new trace and make it current; returns (trace, token) or None."""
+        if self.rate <= 0.0 or self._handler is None or random.random() >= self.rate:
+            return None
+        trace = Trace("%s-%d" % (self._prefix, next(self._ids)), name, attrs)
+        return trace, _current.set(trace)
+
+    def finish(self, started, status: Optional[int] = None):
+        trace, token = started
+        duration = time.perf_counter() - trace.start
+        trace.done = True
+        _current.reset(token)
+        # the record is built and encoded on the listener thread
+        self._logger.info((trace, duration, status))
+
+tracer = Tracer()
+
+class TracedLock:
+    """A threading lock whose acquire wait is a span of the current trace."""
+    __slots__ = ("_lock", "_name")
+
+    def __init__(self, lock, name: str):
+        self._lock = lock
+        self._name = "lock_wait:" + name
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        trace = _current.get()
+        if trace is None:
+            return self._lock.acquire(blocking, timeout)
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        trace.add(self._name, t0, time.perf_counter() - t0)
+        return ok
+
+    def __enter__(self) -> bool:
+        if _current.get() is None:
+            return self._lock.__enter__()
+        return self.acquire()
+
+    def release(self, *exc):
+        self._lock.release()
+
+    __exit__ = release
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+class _TracedAsyncLock:
+    """One `async with` on an asyncio.Lock, with its wait recorded as a span."""
+    __slots__ = ("_lock", "_name", "_trace")
+
+    def __init__(self, lock, name: str, trace: Trace):
+        self._lock = lock
+        self._name = name
+        self._trace = trace
+
+    async def acquire(self) -> bool:
+        t0 = time.perf_counter()
+        await self._lock.acquire()
+        self._trace.add(self._name, t0, time.perf_counter() - t0)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return None
+
+    async def __aexit__(self, *exc):
+        self.release()
+        return False
+
+def traced_async_lock(lock, name: str):
+    """`lock`, or a wrapper timing its acquire when a trace is current."""
+    trace = _current.get()
+    if trace is None:
+        return lock
+    return _TracedAsyncLock(lock, "lock_wait:" + name, trace)
@@ -0,0 +1,86 @@
+import json
+import requests
+import websocket
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def setup_room(a, b):
+    created = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": a}).json()
+    room_id = created["room_id"]
+    requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": b}).raise_for_status()
+    return room_id, created["token"]
+
+def start(room_id):
+    r = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def batch(room_id, actions, atomic=False):
+    r = requests.post(f"{BASE}{PREFIX}/{room_id}/batch", json={"actions": actions, "atomic": atomic})
+    r.raise_for_status()
+    return r.json()
+
+def state(room_id):
+    return requests.get(f"{BASE}{PREFIX}/game_state", params={"room_id": room_id}).json()
+
+def turn(current, other, tile):
+    return [{"cmd": "draw_tile", "player": current},
+            {"cmd": "discard_tile", "player": current, "args": {"tile": tile}},
+            {"cmd": "pass_claim", "player": other}]
+
+def test_batch_applies_in_order_until_first_failure():
+    room_id, _ = setup_room("BatA", "BatB")
+    st = start(room_id)
+    cur = st["current_player"]
+    other = "BatB" if cur == "BatA" else "BatA"
+    actions = turn(cur, other, st["hands"][cur][0]) + [{"cmd": "discard_tile", "player": other, "args": {"tile": 999}},
+                                                      {"cmd": "pass_claim", "player": cur}]
+    res = batch(room_id, actions)
+    if res["results"][0]["result"].get("win"):
+        return  # drew a winning hand; the rest of the turn is rejected
+    assert not res["ok"] and not res["rolled_back"]
+    assert res["applied"] == 3
+    assert [r["ok"] for r in res["results"]] == [True, True, True, False]
+    assert res["results"][3]["status"] == 400
+    s = state(room_id)
+    assert len(s["discards"]) == 1 and s["current_player"] == other
+
+def test_atomic_batch_rolls_back():
+    room_id, _ = setup_room("AtoA", "AtoB")
+    st = start(room_id)
+    before = state(room_id)
+    cur = st["current_player"]
+    res = batch(room_id, [{"cmd": "draw_tile", "player": cur},
+                          {"cmd": "discard_tile", "player": cur, "args": {"tile": 999}}], atomic=True)
+    assert res["rolled_back"] and res["applied"] == 0
+    after = state(room_id)
+    assert after["deck_count"] == before["deck_count"]
+    assert after["hands"] == before["hands"] and after["seq"] == before["seq"]
+
+def test_batch_broadcasts_one_coalesced_event():
+    room_id, token = setup_room("CoaA", "CoaB")
+    ws = websocket.create_connection(f"{WS_BASE}{PREFIX}/ws/{room_id}?player=CoaA&seat_token={token}", timeout=3)
+    try:
+        json.loads(ws.recv())  # connect hand event
+        st = start(room_id)
+        while json.loads(ws.recv()).get("reason") != "deal":
+            pass
+        cur = st["current_player"]
+        other = "CoaB" if cur == "CoaA" else "CoaA"
+        res = batch(room_id, turn(cur, other, st["hands"][cur][0]))
+        event = json.loads(ws.recv())
+        assert event["type"] == "batch" and event["seq"] == res["seq"] - (1 if cur == "CoaA" else 0)
+        assert [e["type"] for e in event["events"]][:2] == ["draw", "discard"]
+        if cur == "CoaA":
+            hand = json.loads(ws.recv())
+            assert hand["type"] == "hand" and hand["reason"] == "discard"
+    finally:
+        ws.close()
+
+def test_unknown_room_and_command():
+    assert requests.post(f"{BASE}{PREFIX}/999999/batch", json={"actions": []}).status_code == 404
+    room_id, _ = setup_room("UnkA", "UnkB")
+    res = batch(room_id, [{"cmd": "teleport", "player": "UnkA"}])
+    assert res["results"][0]["status"] == 400 and res["applied"] == 0
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import requests
+
+from routers import room
+from services.bots import POLICIES, Policy
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_bot_fills_seat_and_plays_its_turn():
+    rid = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "BotHost", "max_players": 2}).json()["room_id"]
+    r = requests.post(f"{BASE}{PREFIX}/add_bot", params={"room_id": rid})
+    assert r.status_code == 200 and r.json()["bot"] in r.json()["players"]
+    bot = r.json()["bot"]
+    assert requests.post(f"{BASE}{PREFIX}/add_bot", params={"room_id": rid}).status_code == 400  # room full
+    requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": rid}).raise_for_status()
+    drawn = requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": rid, "player": "BotHost"}).json()
+    requests.post(f"{BASE}{PREFIX}/discard_tile",
+                  params={"room_id": rid, "player": "BotHost", "tile": drawn["tile"]}).raise_for_status()
+    # the bot passes on the discard, draws and discards without any client
+    state = None
+    for _ in range(100):
+        state = requests.get(f"{BASE}{PREFIX}/game_state", params={"room_id": rid}).json()
+        if state["status"] != "playing" or any(p == bot for p, _ in state["discards"]):
+            break
+        time.sleep(0.02)
+    assert state["status"] == "finished" or state["discards"][-1][0] == bot
+
+def test_unknown_policy_is_rejected():
+    rid = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "BotHost2"}).json()["room_id"]
+    r = requests.post(f"{BASE}{PREFIX}/add_bot", params={"room_id": rid, "policy": "nope"})
+    assert r.status_code == 400
+
+def test_policies_must_implement_discard():
+    class NoDiscard(Policy):
+        name = "no_discard"
+
+    for cls in (Policy, NoDiscard):
+        try:
+            cls(None)
+            assert False, "%s instantiated without discard" % cls.__name__
+        except TypeError:
+            pass
+    assert all(cls(None).name == name for name, cls in POLICIES.items())
+
+def test_bot_takes_over_disconnected_seat_and_hands_it_back():
+    saved = room.BOT_TAKEOVER_DELAY
+    room.configure_bots(takeover_delay=0.01)
+
+    async def run():
+        rid = (await room.create_room(player="Gone", max_players=2))["room_id"]
+        await room.join_room(room_id=rid, player="Stays")
+        await room.start_game(room_id=rid)
+        room._seat_left(rid, "Gone")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            r = room.rooms[rid]
+            if r.pending_discard is not None or r.status != "playing":
+                break
+        bot = room.room_bots[rid]["Gone"]
+        assert bot.takeover
+        r = room.rooms[rid]
+        assert r.status != "playing" or r.pending_discard["player"] == "Gone"
+        room._release_seat(rid, "Gone")
+        assert "Gone" not in room.room_bots[rid]
+
+    try:
+        asyncio.run(run())
+    finally:
+        room.configure_bots(takeover_delay=saved)
+
+def test_bot_plays_after_a_claim_window_times_out():
+    async def run():
+        rid = (await room.create_room(player="Slow1", max_players=3))["room_id"]
+        bot = (await room.add_bot(room_id=rid))["bot"]
+        await room.join_room(room_id=rid, player="Slow2")
+        assert (await room.start_game(room_id=rid))["current_player"] == "Slow1"
+        drawn = await room.draw_tile(room_id=rid, player="Slow1")
+        await room.discard_tile(room_id=rid, player="Slow1", tile=drawn["tile"])
+        # the bot passes at once; Slow2 never answers, so only the timeout closes the window
+        room.start_pending_cleanup(interval=0.01, timeout=0.05)
+        try:
+            r = room.rooms[rid]
+            for _ in range(200):
+                await asyncio.sleep(0.01)
+                if r.status != "playing" or any(p == bot for p, _ in r.discards):
+                    break
+            assert r.status != "playing" or any(p == bot for p, _ in r.discards)
+        finally:
+            room.stop_pending_cleanup()
+    asyncio.run(run())
+
+def test_bot_passes_when_an_invalid_hu_outranks_its_claim():
+    async def run():
+        rid = (await room.create_room(player="Hu1", max_players=3))["room_id"]
+        await room.join_room(room_id=rid, player="Caller")
+        await room.join_room(room_id=rid, player="Hu2")
+        await room.start_game(room_id=rid)
+        r = room.rooms[rid]
+        r.hands.update(Hu1=[5, 11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 23, 24],
+                       Caller=[5, 5, 1, 2, 3, 7, 8, 9, 25, 26, 27, 31, 32],
+                       Hu2=[1, 3, 6, 9, 11, 14, 17, 20, 22, 25, 28, 31, 34])
+        await room.discard_tile(room_id=rid, player="Hu1", tile=5)
+        assert (await room.claim(room_id=rid, player="Hu2", action="hu"))["accepted"] is False
+        room.room_bots[rid] = {"Caller": room._new_bot("caller")}
+        try:
+            steps = 0
+            while steps < 10:
+                async with room._room_lock(rid):
+                    if not await room._bot_step(rid):
+                        break
+                steps += 1
+            # one refused peng, one pass, then nothing left for the bot to do
+            assert steps == 1 and "Caller" in r.passes
+            assert len(r.pending_discard["claims"]) == 2
+        finally:
+            room.room_bots.pop(rid, None)
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import json
+import random
+import requests
+
+BASE = "http://127.0.0.1:8000"
+WIN = [1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12, 13, 31, 31]
+
+def hands(n, seed=3):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        out.append(list(WIN) if i % 7 == 0 else [rng.randint(1, 39) for _ in range(14)])
+    return out
+
+def post(body, ctype):
+    r = requests.post(f"{BASE}/check_win/bulk", data=body, headers={"content-type": ctype})
+    assert r.status_code == 200, r.text
+    return r
+
+def test_packed_and_ndjson_agree_across_chunks():
+    sample = hands(10000)  # spans several evaluation chunks
+    packed = post(bytes(t for h in sample for t in h), "application/octet-stream").content
+    assert len(packed) == len(sample)
+    assert all(packed[i] == 1 for i in range(0, len(sample), 7))
+    lines = post("\n".join(json.dumps(h) for h in sample), "application/x-ndjson").text.splitlines()
+    results = [json.loads(l) for l in lines]
+    assert [r["index"] for r in results] == list(range(len(sample)))
+    assert [int(r["win"]) for r in results] == list(packed)
+
+def test_streamed_body_is_accepted():
+    def gen():
+        for h in hands(3000):
+            yield bytes(h)
+    assert len(post(gen(), "application/octet-stream").content) == 3000
+
+def test_ndjson_reports_bad_lines():
+    body = "\n".join([json.dumps({"tiles": WIN}), "[1,2]", "not json", json.dumps(WIN[:-1] + [999])])
+    results = [json.loads(l) for l in post(body, "application/x-ndjson").text.splitlines()]
+    assert results[0] == {"index": 0, "win": True}
+    assert results[1]["error"] == "Tiles must be 14 numbers"
+    assert results[2]["error"] == "Invalid JSON"
+    assert results[3] == {"index": 3, "win": False}
+
+def test_rejects_bad_packed_length_and_content_type():
+    r = requests.post(f"{BASE}/check_win/bulk", data=b"\x01" * 15, headers={"content-type": "application/octet-stream"})
+    assert r.status_code == 400
+    assert requests.post(f"{BASE}/check_win/bulk", json=[WIN]).status_code == 415
+
+def test_ndjson_line_with_several_values_is_one_bad_line():
+    body = "\n".join([json.dumps(WIN) + ", [2]", "1,2", "[1", "2]", json.dumps(WIN)])
+    results = [json.loads(l) for l in post(body, "application/x-ndjson").text.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert all(r["error"] == "Invalid JSON" for r in results[:4])
+    assert results[4] == {"index": 4, "win": True}
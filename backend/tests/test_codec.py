@@ -0,0 +1,43 @@
+import pytest
+
+from services import codec
+
+PLAYERS = ["Alice", "Bob", "Carol", "Dave"]
+
+EVENTS = [
+    {"type": "draw", "room_id": 3, "player": "Bob", "hand_count": 14, "seq": 7},
+    {"type": "discard", "room_id": 3, "player": "Alice", "tile": 5, "pending": True, "next_player": "Bob", "seq": 8},
+    {"type": "pass", "room_id": 3, "player": "Carol", "passes": ["Carol", "Dave"], "seq": 9},
+    {"type": "pending_cleared", "room_id": 3, "reason": "timeout", "seq": 10},
+    {"type": "claim", "action": "chi", "room_id": 3, "player": "Bob",
+     "melds": [{"type": "chi", "tiles": [4, 5, 6]}], "seq": 11},
+    {"type": "hu", "room_id": 3, "player": "Dave", "winner": "Dave", "seq": 12},
+    {"type": "win", "room_id": 3, "player": "Alice", "hand": [1, 2, 3, 31, 31], "seq": 13},
+    {"type": "hand", "room_id": 3, "player": "Bob", "reason": "draw", "hand": [4, 6, 11], "melds": [],
+     "waits": [5], "tile": 11, "seq": 14},
+    # private hello sent on connect has no seq
+    {"type": "hand", "room_id": 3, "player": "Bob", "reason": "connect", "hand": [], "melds": [], "waits": []},
+]
+
+@pytest.mark.parametrize("event", EVENTS, ids=lambda e: e["type"])
+def test_compact_round_trip(event):
+    data = codec.encode_binary(event, PLAYERS)
+    assert data[0] != codec.FALLBACK
+    assert codec.decode_binary(data, PLAYERS, room_id=3) == event
+    assert len(data) < len(codec.encode_json(event))
+
+def test_unknown_shapes_fall_back_to_json():
+    odd = [
+        {"type": "start", "room_id": 3, "players": PLAYERS, "current_player": "Alice", "deck_count": 100, "seq": 1},
+        {"type": "draw", "room_id": 3, "player": "Bob", "hand_count": 14, "seq": 7, "extra": "kept"},
+        {"type": "draw", "room_id": 3, "player": "Mallory", "hand_count": 14, "seq": 7},
+    ]
+    for event in odd:
+        data = codec.encode_binary(event, PLAYERS)
+        assert data[0] == codec.FALLBACK
+        assert codec.decode_binary(data, PLAYERS) == event
+
+def test_negotiate_prefers_client_order_and_defaults_to_json():
+    assert codec.negotiate([codec.BINARY_SUBPROTOCOL, codec.JSON_SUBPROTOCOL]) == codec.BINARY_SUBPROTOCOL
+    assert codec.negotiate(["chat", codec.JSON_SUBPROTOCOL]) == codec.JSON_SUBPROTOCOL
+    assert codec.negotiate([]) is None
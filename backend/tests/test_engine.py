@@ -0,0 +1,46 @@
+import pytest
+
+from models.engine import Engine, GameError
+from models.room import Room
+
+def _started(players=("A", "B", "C"), is_win=lambda hand: False):
+    room = Room(1, list(players))
+    engine = Engine(room, is_win=is_win, clock=iter(range(1000)).__next__)
+    engine.start()
+    return room, engine
+
+def test_turn_flow_emits_events_and_hand_updates():
+    room, engine = _started()
+    out = engine.draw("A")
+    assert out.result["must_discard"] and [e["type"] for e in out.events] == ["draw"]
+    assert out.hands == [("A", "draw", out.result["tile"])]
+    out = engine.discard("A", out.result["tile"])
+    assert out.result["next_player"] == "B" and room.pending_discard["time"] == 0
+    with pytest.raises(GameError) as err:
+        engine.draw("B")
+    assert err.value.detail == "Pending discard awaiting claims" and err.value.status == 400
+    assert engine.pass_claim("B").result["resolved"] == "waiting_other_passes"
+    out = engine.pass_claim("C")
+    assert out.result["resolved"] == "no_claims" and out.events[-1]["type"] == "pending_cleared"
+
+def test_claim_priority_and_rob_gang():
+    room, engine = _started()
+    room.hands.update(A=[5, 20], B=[4, 6, 9], C=[5, 5, 11])
+    engine.discard("A", 5)
+    # C's peng outranks B's chi even though B is next in turn
+    room.pending_discard["claims"].append({"player": "B", "action": "chi", "tiles": "4,6", "time": 0, "distance": 1})
+    out = engine.claim("C", "peng")
+    assert out.result == {"claimed": "peng", "player": "C", "melds": [{"type": "peng", "tiles": [5, 5, 5]}]}
+    assert room.current_player == "C" and room.hands["C"] == [11]
+
+    room, engine = _started(is_win=lambda hand: sorted(hand) == [7, 7])
+    room.hands.update(A=[7, 1], B=[7, 7, 7], C=[7])
+    engine.discard("A", 7)
+    out = engine.claim("B", "gang")
+    assert out.result == {"win": True, "winner": "C"} and room.status == "finished"
+
+def test_missing_win_checker_is_a_server_error():
+    room, engine = _started(is_win=None)
+    with pytest.raises(GameError) as err:
+        engine.draw("A")
+    assert err.value.status == 500 and len(room.hands["A"]) == 13
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+from benchmarks import bench_inprocess
+from benchmarks.inprocess import ConnectionClosed, InProcessApp
+
+def test_http_and_websocket_without_a_server():
+    async def run():
+        async with InProcessApp() as server:
+            r = await server.client.post("/rooms/create_room", params={"player": "InProcA", "max_players": 2})
+            assert r.status_code == 200
+            rid, token = r.json()["room_id"], r.json()["token"]
+            r = await server.client.post("/rooms/join_room", params={"room_id": rid, "player": "InProcB"})
+            ws = await server.websocket("/rooms/ws/%d?player=InProcA&seat_token=%s" % (rid, token))
+            assert json.loads(await ws.recv())["reason"] == "connect"
+            await server.client.post("/rooms/start_game", params={"room_id": rid})
+            assert [json.loads(await ws.recv())["type"] for _ in range(2)] == ["start", "hand"]
+            await ws.send(json.dumps({"id": 7, "cmd": "draw_tile"}))
+            frames = [json.loads(await ws.recv()) for _ in range(3)]
+            reply = next(f for f in frames if f["type"] == "reply")
+            assert reply["id"] == 7 and reply["ok"]
+            assert {f["type"] for f in frames} == {"draw", "hand", "reply"}
+            bad = await server.websocket("/rooms/ws/%d?player=InProcB&seat_token=wrong" % rid)
+            try:
+                await bad.recv()
+                assert False, "socket with a bad seat token stayed open"
+            except ConnectionClosed as e:
+                assert e.code == 1008
+    asyncio.run(run())
+    asyncio.run(run())  # a second startup in a fresh loop works too
+
+def test_per_action_bench_is_reproducible():
+    runs = [asyncio.run(bench_inprocess.run(games=2, seats=4, seed=3, transport=t)) for t in ("http", "http", "ws")]
+    counts = [{name: len(phases["total"]) for name, phases in b.timings.items()} for b in runs]
+    assert counts[0] == counts[1] == counts[2]
+    assert counts[0]["pass_claim"] == 3 * counts[0]["discard_tile"]
+    assert runs[0].frames == runs[1].frames
+    draws = runs[0].timings["draw_tile"]
+    assert all(d >= b for d, b in zip(draws["total"], draws["broadcast"]))
+    assert runs[0].frames["discard_tile"] == 5 * counts[0]["discard_tile"]  # 4 discard events + the hand
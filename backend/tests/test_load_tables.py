@@ -0,0 +1,19 @@
+import asyncio
+
+from benchmarks.load_tables import parse_args, run
+
+def test_load_harness_plays_full_games_over_http_and_ws():
+    for transport in ("http", "ws"):
+        summary = asyncio.run(run(parse_args(["--tables", "3", "--seats", "2", "--transport", transport,
+                                              "--policy", "caller", "--game-timeout", "60"])))
+        assert sum(summary["games"].values()) == 3
+        assert set(summary["games"]) <= {"win", "hu", "exhausted"}
+        assert summary["errors"] == 0
+        draws = summary["endpoints"]["draw_tile"]
+        assert draws["requests"] > 0 and 0 < draws["p50_ms"] <= draws["p99_ms"] <= draws["max_ms"]
+        assert summary["event_lag"]["discard"]["events"] > 0
+
+def test_load_harness_in_process():
+    summary = asyncio.run(run(parse_args(["--in-process", "--tables", "4", "--seats", "4", "--policy", "caller"])))
+    assert sum(summary["games"].values()) == 4 and summary["errors"] == 0
+    assert summary["event_lag"]["pass"]["events"] > 0
@@ -0,0 +1,47 @@
+import requests
+
+from models.room import Room
+from services.lobby import RoomIndex
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_index_tracks_seats_status_and_open_rooms():
+    index = RoomIndex()
+    a = Room(1, ["Ann"], max_players=2)
+    b = Room(2, ["Ben"], max_players=2)
+    index.update(a)
+    index.update(b)
+    assert index.open_ids == [1, 2] and index.rooms_of("Ann") == [1]
+    b.add_player("Cat")
+    index.update(b)
+    assert index.open_ids == [1]
+    b.deal_tiles()
+    index.update(b)
+    assert index.status_ids["playing"] == [2] and index.status_ids["waiting"] == [1]
+    b.status = "finished"
+    index.update(b)
+    assert index.rooms_of("Ben") == [] and index.status_ids["finished"] == [2]
+    page, next_after, total = index.page(limit=1)
+    assert [r["room_id"] for r in page] == [1] and next_after == 1 and total == 2
+    page, next_after, _ = index.page(after=next_after, limit=1)
+    assert [r["room_id"] for r in page] == [2] and next_after is None
+    assert index.page(status="playing", open_only=True)[2] == 0
+
+def test_lobby_pages_and_filters():
+    created = []
+    for i in range(3):
+        r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "Lob%d" % i, "max_players": 2})
+        created.append(r.json()["room_id"])
+    requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": created[0], "player": "LobX"}).raise_for_status()
+    requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": created[0]}).raise_for_status()
+    after = created[0] - 1
+    page = requests.get(f"{BASE}{PREFIX}", params={"after": after, "limit": 2}).json()
+    assert [r["room_id"] for r in page["rooms"]] == created[:2]
+    assert page["rooms"][0]["status"] == "playing" and page["rooms"][1]["open_seats"] == 1
+    nxt = requests.get(f"{BASE}{PREFIX}", params={"after": page["next_after"], "limit": 2}).json()
+    assert nxt["rooms"][0]["room_id"] == created[2]
+    open_ids = [r["room_id"] for r in requests.get(f"{BASE}{PREFIX}", params={"open": True, "after": after}).json()["rooms"]]
+    assert created[0] not in open_ids and created[1] in open_ids
+    found = requests.get(f"{BASE}{PREFIX}/player_room", params={"player": "LobX"}).json()
+    assert created[0] in found["room_ids"]
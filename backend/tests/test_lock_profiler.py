@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+from services.lockprof import LockProfiler, ProfiledLock
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_profiled_lock_records_wait_and_hold_per_site():
+    profiler = LockProfiler(samples=16)
+    lock = ProfiledLock(threading.Lock(), profiler, "test")
+    with lock:
+        pass
+    assert profiler.report()["sites"] == []  # disabled: nothing recorded
+    profiler.configure(enabled=True)
+
+    def holder():
+        with lock:
+            time.sleep(0.05)
+    t = threading.Thread(target=holder)
+    t.start()
+    time.sleep(0.01)
+    with lock:
+        pass
+    t.join()
+    sites = {s["site"].split(" ")[1]: s for s in profiler.report()["sites"]}
+    assert sites["holder"]["hold"]["max_us"] >= 40000
+    waiter = sites["test_profiled_lock_records_wait_and_hold_per_site"]
+    assert waiter["count"] == 1 and waiter["wait"]["p50_us"] >= 20000
+    profiler.configure(reset=True)
+    assert profiler.report()["sites"] == []
+
+def test_async_wrapper_attributes_the_awaiting_coroutine():
+    profiler = LockProfiler()
+    profiler.configure(enabled=True)
+
+    async def step(lock):
+        async with profiler.wrap_async(lock, "room_lock"):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        lock = asyncio.Lock()
+        await asyncio.gather(step(lock), step(lock))
+    asyncio.run(run())
+    site, = profiler.report()["sites"]
+    assert site["lock"] == "room_lock" and site["site"].endswith(" step") and site["count"] == 2
+    assert site["wait"]["max_us"] >= 5000
+
+def test_admin_lock_endpoint():
+    r = requests.post(f"{BASE}{PREFIX}/admin/locks", params={"enabled": "true", "reset": "true"})
+    assert r.status_code == 200 and r.json()["enabled"]
+    try:
+        rid = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "LockA"}).json()["room_id"]
+        requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": rid, "player": "LockB"}).raise_for_status()
+        report = requests.get(f"{BASE}{PREFIX}/admin/locks").json()
+        locks = {(s["lock"], s["site"].split(" ")[1]) for s in report["sites"]}
+        assert ("rooms_lock", "create_room") in locks
+        assert ("room_lock", "join_room") in locks
+    finally:
+        requests.post(f"{BASE}{PREFIX}/admin/locks", params={"enabled": "false"})
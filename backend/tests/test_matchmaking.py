@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+import uuid
+
+import requests
+import websocket
+
+from routers import room
+from services.matchmaking import Matchmaker
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_groups_pop_in_queue_order_and_skip_cancelled():
+    mm = Matchmaker()
+    for p in ("a", "b", "c", "d", "e"):
+        mm.enqueue(p, 2)
+    mm.enqueue("x", 3)
+    assert mm.waiting() == 6 and mm.waiting(2) == 5
+    assert mm.cancel("b") and not mm.cancel("b")
+    assert mm.ready()
+    groups = mm.pop_groups(10)
+    assert [[t.player for t in g] for g in groups] == [["a", "c"], ["d", "e"]]
+    assert mm.waiting(2) == 0 and mm.waiting(3) == 1 and not mm.ready()
+    try:
+        mm.enqueue("x", 2)
+        assert False, "duplicate enqueue accepted"
+    except ValueError:
+        pass
+    mm.matched(groups[0][0], 7, "tok")
+    assert mm.tickets["a"].view() == {"player": "a", "status": "matched", "max_players": 2, "room_id": 7, "token": "tok"}
+    mm.forget("a")
+    assert "a" not in mm.tickets
+
+def _enqueue(player):
+    r = requests.post(f"{BASE}{PREFIX}/matchmaking/enqueue", params={"player": player, "max_players": 2})
+    r.raise_for_status()
+    return r.json()["ticket"]
+
+def test_enqueue_matches_into_started_room():
+    tag = uuid.uuid4().hex[:6]
+    first, second = "mmA-" + tag, "mmB-" + tag
+    t1 = _enqueue(first)
+    ws = websocket.create_connection(f"{WS_BASE}{PREFIX}/matchmaking/ws?player={first}&ticket={t1}", timeout=3)
+    try:
+        r = requests.post(f"{BASE}{PREFIX}/matchmaking/enqueue", params={"player": first, "max_players": 2})
+        assert r.status_code == 409
+        t2 = _enqueue(second)
+        event = json.loads(ws.recv())
+    finally:
+        ws.close()
+    assert event["type"] == "matched" and sorted(event["players"]) == sorted([first, second])
+    room_id = event["room_id"]
+    state = requests.get(f"{BASE}{PREFIX}/game_state", params={"room_id": room_id}).json()
+    assert state["status"] == "playing"
+    status = None
+    for _ in range(50):
+        status = requests.get(f"{BASE}{PREFIX}/matchmaking/status", params={"player": second, "ticket": t2}).json()
+        if status["status"] == "matched":
+            break
+        time.sleep(0.05)
+    assert status["room_id"] == room_id and status["token"]
+    # the matched ticket is dropped once reported
+    r = requests.get(f"{BASE}{PREFIX}/matchmaking/status", params={"player": second, "ticket": t2})
+    assert r.status_code == 404
+
+def test_cancel_leaves_queue():
+    player = "mmC-" + uuid.uuid4().hex[:6]
+    ticket = _enqueue(player)
+    r = requests.post(f"{BASE}{PREFIX}/matchmaking/cancel", params={"player": player, "ticket": "wrong"})
+    assert r.status_code == 404
+    r = requests.post(f"{BASE}{PREFIX}/matchmaking/cancel", params={"player": player, "ticket": ticket})
+    assert r.json() == {"cancelled": True}
+
+def test_resolved_tickets_expire_after_ttl():
+    mm = Matchmaker(ttl=10)
+    for p in ("a", "b", "c", "d"):
+        mm.enqueue(p, 2)
+    (a, b), (c, d) = mm.pop_groups(10)
+    mm.matched(a, 1, "ta")
+    mm.matched(b, 1, "tb")
+    mm.failed(c)
+    mm.failed(d)
+    assert c.view()["status"] == "failed"
+    mm.forget("b")  # collected
+    mm.enqueue("d", 2)  # the failed player queues again
+    assert mm.expire(time.time() + 5) == 0 and "a" in mm.tickets
+    assert mm.expire(time.time() + 11) == 2
+    assert set(mm.tickets) == {"d"} and mm.tickets["d"].status == "queued"
+
+def test_group_that_fails_to_seat_is_marked_failed(monkeypatch):
+    def broken(groups):
+        raise RuntimeError("no room")
+
+    async def run():
+        monkeypatch.setattr(room, "_seat_groups", broken)
+        monkeypatch.setattr(room, "matchmaker", Matchmaker())
+        room.start_matchmaking(interval=0)
+        try:
+            tickets = [room.matchmaker.enqueue(p, 2) for p in ("mmF1", "mmF2")]
+            room._matchmaking_wakeup.set()
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if all(t.status != "queued" for t in tickets):
+                    break
+        finally:
+            room.stop_matchmaking()
+        # the popped tickets are not lost: the players learn to enqueue again
+        assert [t.status for t in tickets] == ["failed", "failed"] and not room.matchmaker.waiting()
+        assert (await room.matchmaking_status(player="mmF1", ticket=tickets[0].secret))["status"] == "failed"
+        assert "mmF1" not in room.matchmaker.tickets
+        room.matchmaker.enqueue("mmF1", 2)
+    asyncio.run(run())
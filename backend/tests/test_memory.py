@@ -0,0 +1,52 @@
+import asyncio
+import sys
+
+from benchmarks import bench_memory
+from benchmarks.inprocess import InProcessApp
+from services import memory
+
+class _Slotted:
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+def test_deep_size_counts_each_object_once_and_skips_shared_state():
+    items = ["x" * 100, "y" * 100]
+    assert memory.deep_size(items) == sys.getsizeof(items) + sum(sys.getsizeof(s) for s in items)
+    seen = set()
+    one, two = _Slotted(items), _Slotted(items)
+    assert memory.deep_size(one, seen) > memory.deep_size(items)
+    # everything reachable was charged to the first walk
+    assert memory.deep_size(two, seen) == sys.getsizeof(two)
+    assert memory.deep_size([1, 2, 3, None, True, memory]) == sys.getsizeof([1, 2, 3, None, True, memory])
+
+def test_admin_memory_reports_rooms_by_component_and_status():
+    async def run():
+        async with InProcessApp() as server:
+            post = server.client.post
+            ids = []
+            for i in range(3):
+                r = (await post("/rooms/create_room", params={"player": "MemTestA%d" % i, "max_players": 2})).json()
+                await post("/rooms/join_room", params={"room_id": r["room_id"], "player": "MemTestB%d" % i})
+                ids.append(r["room_id"])
+            await post("/rooms/start_game", params={"room_id": ids[0]})
+            ws = await server.websocket("/rooms/ws/%d?player=MemTestA0&seat_token=%s" % (ids[0], r["token"]))
+            return (await server.client.get("/rooms/admin/memory", params={"top": 50})).json(), ids
+    report, ids = asyncio.run(run())
+    assert report["rooms"] >= 3 and report["total_bytes"] == sum(s["bytes"] for s in report["by_status"].values())
+    assert not any(report["orphans"].values())
+    rooms = {r["room_id"]: r for r in report["largest"]}
+    dealt = rooms[ids[0]]["components"]
+    assert dealt["deck"] > 0 and dealt["hands"] > 0 and dealt["event_log"] > 0
+    assert rooms[ids[0]]["bytes"] > rooms[ids[2]]["bytes"]
+    assert sum(report["components"].values()) == report["total_bytes"]
+
+def test_memory_bench_phases_track_tracemalloc():
+    rows = bench_memory.run(rooms=4, seats=2, turns=3, seed=1, sites=0)
+    rows = {row["phase"]: row for row in asyncio.run(rows)}
+    assert list(rows) == list(bench_memory.PHASES)
+    assert rows["dealt"]["estimate"] > rows["created"]["estimate"] > 0
+    # with no sockets open the estimate follows what is actually allocated
+    for phase in ("seated", "closed"):
+        assert 0.3 < rows[phase]["estimate"] / rows[phase]["traced"] < 3, rows[phase]
@@ -0,0 +1,51 @@
+import threading
+
+import requests
+
+from services import metrics
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def _sample(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_metrics_endpoint_exposes_request_and_native_timings():
+    rid = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "MetA", "max_players": 2}).json()["room_id"]
+    requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": rid, "player": "MetB"}).raise_for_status()
+    requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": rid}).raise_for_status()
+    assert requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": rid, "player": "MetB"}).status_code == 400
+    requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": rid, "player": "MetA"}).raise_for_status()
+    r = requests.get(f"{BASE}/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert _sample(text, 'mahjong_request_seconds_count{endpoint="draw_tile"}') >= 2
+    assert _sample(text, 'mahjong_request_errors_total{endpoint="draw_tile",status="400"}') >= 1
+    assert _sample(text, 'mahjong_native_seconds_count{call="is_win"}') >= 1
+    assert _sample(text, 'mahjong_lock_wait_seconds_count{lock="rooms_lock"}') >= 1
+    assert _sample(text, 'mahjong_rooms{status="playing"}') >= 1
+    assert "mahjong_pending_discards_expired_total" in text
+
+def test_histogram_sums_per_thread_shards():
+    reg = metrics.Registry()
+    hist = reg.histogram("t_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    count = reg.counter("t_total", "test")
+
+    def work():
+        for _ in range(1000):
+            hist.observe(0.5, "x")
+            count.inc()
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    text = reg.render().decode()
+    assert 't_seconds_bucket{op="x",le="0.1"} 0' in text
+    assert 't_seconds_bucket{op="x",le="1.0"} 4000' in text
+    assert 't_seconds_bucket{op="x",le="+Inf"} 4000' in text
+    assert 't_seconds_count{op="x"} 4000' in text
+    assert "t_total 4000" in text
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+import requests
+
+from benchmarks.bench_startup import BACKEND
+
+BASE = "http://127.0.0.1:8000"
+
+_CHILD = """
+import json, sys
+from services import native
+%s
+mc = native.load()
+print(json.dumps(dict(native.info(), same=native.load() is mc, shadowed=sys.modules.get("mahjong_core") is not mc)))
+"""
+
+def resolve(cache: str, setup: str = "", **env) -> dict:
+    base = {k: v for k, v in os.environ.items() if k != "MJ_NATIVE_FALLBACK"}
+    out = subprocess.run([sys.executable, "-c", _CHILD % setup], cwd=BACKEND, stdout=subprocess.PIPE,
+                         env=dict(base, MJ_NATIVE_CACHE=cache, **env), check=True)
+    return json.loads(out.stdout.decode().strip().splitlines()[-1])
+
+def test_native_path_is_cached_and_revalidated(tmp_path):
+    cache = str(tmp_path / "resolved.json")
+    # from backend/, `import mahjong_core` finds the source dir as a namespace package
+    first = resolve(cache)
+    assert (first["backend"], first["source"]) == ("native", "scan")
+    assert first["same"] and not first["shadowed"] and not first["errors"]
+    assert json.load(open(cache))["path"] == first["path"]
+    assert resolve(cache)["source"] == "cache"
+    entry = json.load(open(cache))
+    entry["size"] += 1  # rebuilt since
+    json.dump(entry, open(cache, "w"))
+    assert resolve(cache)["source"] == "scan"
+    assert resolve("")["source"] == "scan" and not os.path.exists(cache + ".tmp")
+
+def test_pycore_fallback_without_the_extension(tmp_path):
+    hide = "native.SEARCH_DIRS = ()"
+    fallback = resolve("", hide, MJ_NATIVE_FALLBACK="1")
+    assert (fallback["backend"], fallback["source"]) == ("pycore", "fallback")
+    assert fallback["path"].endswith("pycore.py")
+    # off unless asked for
+    assert resolve("", hide)["backend"] is None
+
+def test_root_reports_the_engine_and_check_win_uses_it():
+    r = requests.get(BASE + "/").json()
+    assert r["mahjong_core_loaded"] is True and r["engine"]["backend"] == "native"
+    win = [1, 1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 5]
+    assert requests.post(BASE + "/check_win", json={"tiles": win}).json() == {"win": True}
@@ -0,0 +1,41 @@
+import random
+
+from benchmarks.bench_native import compare, single_suit_hands
+from services import native, pycore
+
+def test_python_port_matches_native():
+    mc = native.load()
+    assert native.info()["backend"] == "native"
+    rng = random.Random(7)
+    wall = [t for t in range(1, 35) for _ in range(4)]
+    hands = [rng.sample(wall, 14) for _ in range(300)] + single_suit_hands(14)[::2000]
+    for hand in hands:
+        assert pycore.is_win(hand) == mc.is_win(hand)
+        assert pycore.shanten(hand[:13]) == mc.shanten(hand[:13])
+    for hand in hands[:40]:
+        assert sorted(pycore.discard_table(hand)) == sorted(mc.discard_table(hand))
+    packed = bytes(t for hand in hands for t in hand)
+    assert pycore.is_win_batch(packed) == mc.is_win_batch(packed)
+
+def test_exhaustive_single_suit_enumeration():
+    hands = single_suit_hands(14)
+    assert len(hands) == 118800
+    assert len({tuple(h) for h in hands}) == len(hands)
+    assert all(len(h) == 14 and max(h.count(t) for t in h) <= 4 for h in hands[::997])
+
+def test_regression_check_only_flags_native_slowdowns():
+    baseline = {"results": {"native.is_win.random": 1000.0, "native.shanten.random": 1000.0,
+                            "python.is_win.random": 1000.0}}
+    current = {"native.is_win.random": 700.0, "native.shanten.random": 800.0, "python.is_win.random": 1.0}
+    slower = compare(current, baseline, 0.25)
+    assert len(slower) == 1 and slower[0].startswith("native.is_win.random")
+
+def test_group_memo_stays_bounded(monkeypatch):
+    monkeypatch.setattr(pycore, "_GROUPS_MAX", 8)
+    mc = native.load()
+    rng = random.Random(11)
+    wall = [t for t in range(1, 35) for _ in range(4)]
+    for _ in range(200):
+        hand = rng.sample(wall, 13)
+        assert pycore.shanten(hand) == mc.shanten(hand)
+        assert len(pycore._groups) <= 8
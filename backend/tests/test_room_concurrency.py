@@ -0,0 +1,34 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def post(path, **params):
+    return requests.post(f"{BASE}{PREFIX}{path}", params=params)
+
+def test_concurrent_discards_apply_once():
+    room_id = post("/create_room", player="RaceA").json()["room_id"]
+    post("/join_room", room_id=room_id, player="RaceB").raise_for_status()
+    st = post("/start_game", room_id=room_id).json()
+    current = st["current_player"]
+    drawn = post("/draw_tile", room_id=room_id, player=current)
+    drawn.raise_for_status()
+    tiles = sorted(set(drawn.json()["hand"]))
+    with ThreadPoolExecutor(max_workers=len(tiles)) as pool:
+        results = list(pool.map(lambda t: post("/discard_tile", room_id=room_id, player=current, tile=t), tiles))
+    assert [r.status_code for r in results].count(200) == 1
+    state = requests.get(f"{BASE}{PREFIX}/game_state", params={"room_id": room_id}).json()
+    assert len(state["discards"]) == 1
+    assert state["hands"][current] == 13
+
+def test_rooms_progress_independently():
+    def play(n):
+        room_id = post("/create_room", player="Par%dA" % n).json()["room_id"]
+        post("/join_room", room_id=room_id, player="Par%dB" % n).raise_for_status()
+        current = post("/start_game", room_id=room_id).json()["current_player"]
+        r = post("/draw_tile", room_id=room_id, player=current)
+        r.raise_for_status()
+        return post("/discard_tile", room_id=room_id, player=current, tile=r.json()["tile"]).status_code
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(play, range(8))) == [200] * 8
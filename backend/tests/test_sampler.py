@@ -0,0 +1,53 @@
+import threading
+import time
+import types
+
+import requests
+
+from services.sampler import NativeView, StackSampler, collapsed
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_capture_counts_python_and_marked_native_frames():
+    # time.sleep releases the GIL like the extension does
+    native = NativeView(types.SimpleNamespace(is_win=time.sleep))
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    def in_native():
+        while not stop.is_set():
+            native.is_win(0.01)
+    threads = [threading.Thread(target=spin, name="spinner"), threading.Thread(target=in_native, name="caller")]
+    for t in threads:
+        t.start()
+    try:
+        result = StackSampler().capture(0.3, 200)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert result["ticks"] > 10
+    text = collapsed(result["stacks"]).decode()
+    lines = text.splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("spinner;") and "spin (test_sampler.py" in line for line in lines)
+    assert any(line.startswith("caller;") and "mahjong_core.is_win [native] " in line for line in lines)
+
+def test_only_one_capture_at_a_time():
+    sampler = StackSampler()
+    t = threading.Thread(target=sampler.capture, args=(0.2, 50))
+    t.start()
+    time.sleep(0.05)
+    assert sampler.capture(0.01, 50) is None
+    t.join()
+
+def test_admin_profile_endpoint_returns_collapsed_stacks():
+    r = requests.get(f"{BASE}{PREFIX}/admin/profile", params={"seconds": 0.2, "hz": 100, "idle": "true"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert int(r.headers["X-Profile-Ticks"]) > 0
+    assert any(line.startswith("event-loop;") for line in r.text.splitlines())
+    assert requests.get(f"{BASE}{PREFIX}/admin/profile", params={"hz": 0}).status_code == 422
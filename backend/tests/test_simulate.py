@@ -0,0 +1,24 @@
+import random
+
+from models.room import Room
+from scripts.simulate import simulate
+from services import native
+from services.bots import ShantenPolicy, ukeire
+
+def test_simulation_is_seeded_and_accounts_for_every_game():
+    names = ["caller", "shanten", "random", "tsumogiri"]
+    stats = simulate(names, 12, seed=5)
+    assert stats == simulate(names, 12, seed=5)
+    assert stats["games"] == 12
+    wins = sum(v for k, v in stats.items() if k.startswith("win:") and k != "win:with_melds")
+    assert wins + stats["exhausted"] == 12
+    assert sum(stats["policy:%s:seated" % n] for n in names) == 48
+    assert stats["claim:peng"] + stats["claim:chi"] > 0
+
+def test_shanten_policy_keeps_the_ready_shape():
+    mc = native.load()
+    room = Room(1, ["A", "B"])
+    room.hands["A"] = [1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12, 31, 31, 35]
+    assert ShantenPolicy(mc, random.Random(0)).discard(room, "A") == 35
+    # 10-13 ryanmen waits on 10 and 13: four copies of each are unseen
+    assert ukeire(mc, [1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12, 31, 31]) == 8
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+import requests
+
+from benchmarks.inprocess import InProcessApp
+from services.sse import EventChannel
+
+BASE = "http://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def test_channel_ring_tracks_evictions_across_seq_gaps():
+    channel = EventChannel(1, seq=3, size=2)
+    assert channel.since(3) == []
+    for seq in (5, 8, 9):  # gaps are private events
+        channel.publish({"type": "draw", "seq": seq})
+    assert [f.split(b"\n")[0] for f in channel.since(5)] == [b"id: 8", b"id: 9"]
+    # seq 5 was evicted, so a cursor before it can't be served from the ring
+    assert channel.since(4) is None and channel.since(9) == []
+
+def _events(lines, count):
+    """Read `count` SSE events as (id, data) pairs from a response's line iterator."""
+    out, event_id, data = [], None, None
+    for line in lines:
+        if line.startswith("id: "):
+            event_id = int(line[4:])
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+        elif line == "" and data is not None:
+            out.append((event_id, data))
+            data = None
+            if len(out) == count:
+                return out
+    return out
+
+def _started_room():
+    r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": "SseA", "max_players": 2})
+    room_id = r.json()["room_id"]
+    requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": "SseB"}).raise_for_status()
+    st = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id}).json()
+    return room_id, st["current_player"]
+
+def test_stream_starts_with_snapshot_then_live_events():
+    room_id, current = _started_room()
+    with requests.get(f"{BASE}{PREFIX}/{room_id}/events", stream=True, timeout=3) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        lines = resp.iter_lines(chunk_size=None, decode_unicode=True)
+        [(snap_id, snap)] = _events(lines, 1)
+        assert snap["type"] == "snapshot" and snap["state"]["status"] == "playing"
+        drawn = requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": room_id, "player": current}).json()
+        requests.post(f"{BASE}{PREFIX}/discard_tile",
+                      params={"room_id": room_id, "player": current, "tile": drawn["tile"]}).raise_for_status()
+        live = _events(lines, 2)
+    assert [e["type"] for _, e in live] == ["draw", "discard"]
+    assert snap_id < live[0][0] < live[1][0]
+    # the private hand events in between never reach observers
+    assert all("hand" not in e for _, e in live)
+
+def test_last_event_id_resumes_and_unknown_room_404():
+    room_id, current = _started_room()
+    with requests.get(f"{BASE}{PREFIX}/{room_id}/events", stream=True, timeout=3) as resp:
+        [(snap_id, _)] = _events(resp.iter_lines(chunk_size=None, decode_unicode=True), 1)
+    requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": room_id, "player": current}).raise_for_status()
+    with requests.get(f"{BASE}{PREFIX}/{room_id}/events", stream=True, timeout=3,
+                      headers={"Last-Event-ID": str(snap_id)}) as resp:
+        [(_, missed)] = _events(resp.iter_lines(chunk_size=None, decode_unicode=True), 1)
+    assert missed["type"] == "draw"
+    assert requests.get(f"{BASE}{PREFIX}/999999/events", timeout=3).status_code == 404
+
+async def _response_status(app, path: str, headers=()) -> int:
+    """Status line of a GET to `app` (driven over raw ASGI, since the stream never ends)."""
+    url = urlsplit(path)
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": url.path, "raw_path": url.path.encode(), "root_path": "",
+             "query_string": url.query.encode(), "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+             "headers": [(b"host", b"testserver")] + [(k.encode(), v.encode()) for k, v in headers]}
+    status = asyncio.get_event_loop().create_future()
+    requested = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start" and not status.done():
+            status.set_result(message["status"])
+    task = asyncio.ensure_future(app(scope, receive, send))
+    try:
+        return await asyncio.wait_for(status, 5)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+def test_events_require_the_admin_token_when_one_is_set():
+    async def run():
+        async with InProcessApp() as server:
+            settings = server.app.state.settings
+            saved, settings.admin_token = settings.admin_token, "sse-secret"
+            try:
+                rid = (await server.client.post(PREFIX + "/create_room", params={"player": "SseAuth"})).json()["room_id"]
+                path = "%s/%d/events" % (PREFIX, rid)
+                return (await _response_status(server.app, path),
+                        await _response_status(server.app, path + "?token=wrong"),
+                        await _response_status(server.app, path + "?token=sse-secret"),
+                        await _response_status(server.app, path, [("authorization", "Bearer sse-secret")]))
+            finally:
+                settings.admin_token = saved
+    assert asyncio.run(run()) == (401, 401, 200, 200)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import os
+
+from routers import room
+from services import tracing
+
+def _endpoint(name):
+    return next(r.endpoint for r in room.router.routes if getattr(r, "name", None) == name)
+
+def test_sampled_request_records_lock_engine_native_and_broadcast_spans(tmp_path):
+    path = str(tmp_path / "traces.ndjson")
+    saved = (room.tracer.rate, room.tracer.path)
+    room.configure_tracing(rate=1.0, path=path)
+
+    async def run():
+        rid = json.loads((await _endpoint("create_room")(player="TraceA", max_players=2)).body)["room_id"]
+        await _endpoint("join_room")(room_id=rid, player="TraceB")
+        await _endpoint("start_game")(room_id=rid)
+        await _endpoint("draw_tile")(room_id=rid, player="TraceA")
+    try:
+        asyncio.run(run())
+    finally:
+        room.tracer.close()
+        room.configure_tracing(rate=saved[0], path=saved[1])
+    with open(path) as f:
+        traces = {t["name"]: t for t in map(json.loads, f)}
+    assert "lock_wait:rooms_lock" in [s["name"] for s in traces["create_room"]["spans"]]
+    draw = traces["draw_tile"]
+    assert draw["status"] == 200 and draw["attrs"]["player"] == "TraceA"
+    spans = draw["spans"]
+    names = [s["name"] for s in spans]
+    assert names[0] == "lock_wait:room_lock"
+    engine = names.index("engine:draw")
+    native = names.index("native:is_win")
+    assert spans[native]["parent"] == engine
+    assert "broadcast" in names
+    assert all(0 <= s["offset_us"] <= draw["duration_us"] for s in spans)
+
+def test_unsampled_requests_get_no_trace():
+    assert tracing.current() is None
+    assert tracing.span("engine") is tracing.span("other")  # the shared no-op
+    tracer = tracing.Tracer()
+    assert tracer.start("draw_tile", {"player": "x"}) is None
+    tracer.configure(rate=1.0)  # no file configured: still nothing sampled
+    assert tracer.start("draw_tile") is None
+
+def test_trace_file_rotates(tmp_path):
+    path = str(tmp_path / "t.ndjson")
+    tracer = tracing.Tracer()
+    tracer.configure(rate=1.0, path=path, max_bytes=2000, backups=2)
+    for i in range(100):
+        started = tracer.start("req", {"i": i})
+        tracing.add_span("work", started[0].start, 0.001)
+        tracer.finish(started, 200)
+    tracer.close()
+    files = sorted(os.listdir(str(tmp_path)))
+    assert files == ["t.ndjson", "t.ndjson.1", "t.ndjson.2"]
+    assert all(os.path.getsize(str(tmp_path / f)) <= 2000 for f in files)
@@ -0,0 +1,100 @@
+import json
+import requests
+import pytest
+import websocket
+
+from services import codec
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def create_room(player):
+    r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": player})
+    r.raise_for_status()
+    return r.json()
+
+def join_room(room_id, player):
+    r = requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": player})
+    r.raise_for_status()
+    return r.json()
+
+def start_game(room_id):
+    r = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def draw_tile(room_id, player):
+    return requests.post(f"{BASE}{PREFIX}/draw_tile", params={"room_id": room_id, "player": player})
+
+def connect(room_id, player=None, token=None):
+    url = f"{WS_BASE}{PREFIX}/ws/{room_id}"
+    if player:
+        url += f"?player={player}&seat_token={token}"
+    return websocket.create_connection(url, timeout=3)
+
+def recv_until(ws, predicate, limit=20):
+    for _ in range(limit):
+        e = json.loads(ws.recv())
+        if predicate(e):
+            return e
+    return None
+
+def test_seat_socket_gets_private_hand_and_public_draw_hides_tile():
+    created = create_room("SeatA")
+    room_id = created["room_id"]
+    joined = join_room(room_id, "SeatB")
+    ws_a = connect(room_id, "SeatA", created["token"])
+    ws_b = connect(room_id, "SeatB", joined["token"])
+    try:
+        hello = json.loads(ws_a.recv())
+        assert hello["type"] == "hand" and hello["reason"] == "connect"
+        json.loads(ws_b.recv())
+        st = start_game(room_id)
+        deal = recv_until(ws_a, lambda e: e.get("type") == "hand" and e.get("reason") == "deal")
+        assert deal["player"] == "SeatA"
+        assert sorted(deal["hand"]) == sorted(st["hands"]["SeatA"])
+        current = st["current_player"]
+        r = draw_tile(room_id, current)
+        assert r.status_code == 200
+        other = ws_b if current == "SeatA" else ws_a
+        drawer = ws_a if current == "SeatA" else ws_b
+        public = recv_until(other, lambda e: e.get("type") == "draw")
+        assert "tile" not in public
+        private = recv_until(drawer, lambda e: e.get("type") == "hand" and e.get("reason") == "draw")
+        assert private["tile"] == r.json()["tile"]
+        # the other seat never sees the drawer's private update
+        other.settimeout(0.5)
+        with pytest.raises(websocket.WebSocketTimeoutException):
+            recv_until(other, lambda e: e.get("type") == "hand" and e.get("player") == current)
+    finally:
+        ws_a.close()
+        ws_b.close()
+
+def test_bad_seat_token_is_rejected():
+    created = create_room("SeatC")
+    ws = connect(created["room_id"], "SeatC", "not-the-token")
+    with pytest.raises(websocket.WebSocketConnectionClosedException):
+        ws.recv()
+        ws.recv()
+
+def test_binary_subprotocol_sends_compact_frames():
+    created = create_room("BinA")
+    room_id = created["room_id"]
+    join_room(room_id, "BinB")
+    ws = websocket.create_connection(f"{WS_BASE}{PREFIX}/ws/{room_id}", timeout=3,
+                                     subprotocols=[codec.BINARY_SUBPROTOCOL, codec.JSON_SUBPROTOCOL])
+    try:
+        assert ws.getsubprotocol() == codec.BINARY_SUBPROTOCOL
+        seats = codec.decode_binary(ws.recv(), [])
+        assert seats["type"] == "seats" and seats["players"] == ["BinA", "BinB"]
+        st = start_game(room_id)
+        draw_tile(room_id, st["current_player"]).raise_for_status()
+        events = [codec.decode_binary(ws.recv(), seats["players"]) for _ in range(2)]
+        assert [e["type"] for e in events] == ["start", "draw"]
+        assert events[1]["player"] == st["current_player"] and events[1]["hand_count"] == 14
+    finally:
+        ws.close()
+
+if __name__ == "__main__":
+    pytest.main(["-q", __file__])
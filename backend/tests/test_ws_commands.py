@@ -0,0 +1,75 @@
+import json
+import requests
+import pytest
+import websocket
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def create_room(player):
+    r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": player})
+    r.raise_for_status()
+    return r.json()
+
+def join_room(room_id, player):
+    r = requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": player})
+    r.raise_for_status()
+    return r.json()
+
+def start_game(room_id):
+    r = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def connect(room_id, player=None, token=None):
+    url = f"{WS_BASE}{PREFIX}/ws/{room_id}"
+    if player:
+        url += f"?player={player}&seat_token={token}"
+    return websocket.create_connection(url, timeout=3)
+
+def command(ws, cmd_id, cmd, **args):
+    ws.send(json.dumps({"id": cmd_id, "cmd": cmd, "args": args}))
+    for _ in range(20):
+        e = json.loads(ws.recv())
+        if e.get("type") == "reply" and e.get("id") == cmd_id:
+            return e
+    return None
+
+def test_draw_and_discard_over_websocket():
+    created = create_room("CmdA")
+    room_id = created["room_id"]
+    joined = join_room(room_id, "CmdB")
+    st = start_game(room_id)
+    current = st["current_player"]
+    token = created["token"] if current == "CmdA" else joined["token"]
+    ws = connect(room_id, current, token)
+    try:
+        drawn = command(ws, 1, "draw_tile")
+        assert drawn["ok"] is True
+        tile = drawn["result"]["tile"]
+        discarded = command(ws, 2, "discard_tile", tile=tile)
+        assert discarded["ok"] is True
+        assert discarded["result"]["next_player"] != current
+        # game rules still apply: not our turn any more
+        again = command(ws, 3, "draw_tile")
+        assert again["ok"] is False and again["status"] == 400
+    finally:
+        ws.close()
+
+def test_unbound_socket_cannot_act_and_unknown_command_errors():
+    created = create_room("CmdC")
+    room_id = created["room_id"]
+    ws = connect(room_id)
+    try:
+        denied = command(ws, "a", "pass_claim")
+        assert denied["ok"] is False and denied["status"] == 403
+        state = command(ws, "b", "game_state")
+        assert state["ok"] is True and state["result"]["status"] == "waiting"
+        unknown = command(ws, "c", "teleport")
+        assert unknown["ok"] is False and unknown["status"] == 400
+    finally:
+        ws.close()
+
+if __name__ == "__main__":
+    pytest.main(["-q", __file__])
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from routers import room
+
+class FakeWebSocket:
+    """Just enough of starlette's WebSocket for the receive loop."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.sent = []
+        self.closed = None
+
+    async def receive(self):
+        if self.frames:
+            return self.frames.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+@pytest.fixture
+def fast_heartbeat():
+    saved = (room.WS_PING_INTERVAL, room.WS_IDLE_TIMEOUT)
+    room.configure_ws_idle(ping_interval=0.1, idle_timeout=0.35)
+    yield
+    room.configure_ws_idle(*saved)
+
+def consume(ws):
+    async def run():
+        return [msg async for msg in room._iter_messages(ws)]
+    return asyncio.run(run())
+
+def test_idle_socket_is_pinged_then_closed(fast_heartbeat):
+    ws = FakeWebSocket([{"type": "websocket.receive", "text": "hello"}])
+    assert consume(ws) == ["hello"]
+    assert ws.closed == 1001
+    assert ws.sent.count("ping") >= 2
+
+def test_heartbeats_are_answered_and_not_yielded(fast_heartbeat):
+    ws = FakeWebSocket([
+        {"type": "websocket.receive", "text": "ping"},
+        {"type": "websocket.receive", "text": "pong"},
+        {"type": "websocket.receive", "bytes": b'{"cmd": "game_state"}'},
+        {"type": "websocket.disconnect", "code": 1000},
+    ])
+    assert consume(ws) == ['{"cmd": "game_state"}']
+    assert ws.sent == ["pong"]
+    assert ws.closed is None
@@ -0,0 +1,81 @@
+import json
+import requests
+import pytest
+import websocket
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def create_room(player):
+    r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": player})
+    r.raise_for_status()
+    return r.json()["room_id"]
+
+def join_room(room_id, player):
+    r = requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": player})
+    r.raise_for_status()
+    return r.json()
+
+def start_game(room_id):
+    r = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def admin_set_hand(room_id, player, tiles):
+    r = requests.post(f"{BASE}{PREFIX}/admin/set_hand", params={"room_id": room_id, "player": player}, json=tiles)
+    r.raise_for_status()
+    return r.json()
+
+def discard_tile(room_id, player, tile):
+    return requests.post(f"{BASE}{PREFIX}/discard_tile", params={"room_id": room_id, "player": player, "tile": tile})
+
+def pass_claim(room_id, player):
+    return requests.post(f"{BASE}{PREFIX}/pass_claim", params={"room_id": room_id, "player": player})
+
+def game_state(room_id):
+    r = requests.get(f"{BASE}{PREFIX}/game_state", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def connect(room_id, since=None):
+    url = f"{WS_BASE}{PREFIX}/ws/{room_id}"
+    if since is not None:
+        url += f"?since={since}"
+    return websocket.create_connection(url, timeout=3)
+
+def test_since_replays_missed_public_events_in_order():
+    room_id = create_room("R1")
+    join_room(room_id, "R2")
+    start_game(room_id)
+    admin_set_hand(room_id, "R1", [9] + [30]*12)
+    seq_before = game_state(room_id)["seq"]
+    # events produced while we are disconnected
+    assert discard_tile(room_id, "R1", 9).status_code == 200
+    assert pass_claim(room_id, "R2").status_code == 200
+    ws = connect(room_id, since=seq_before)
+    try:
+        replayed = [json.loads(ws.recv()) for _ in range(3)]
+    finally:
+        ws.close()
+    assert [e["type"] for e in replayed] == ["discard", "pass", "pending_cleared"]
+    seqs = [e["seq"] for e in replayed]
+    assert seqs == sorted(seqs) and seqs[0] > seq_before
+    # private hand events of R1 were skipped for this public socket
+    assert seqs[-1] == game_state(room_id)["seq"]
+
+def test_unknown_offset_gets_snapshot():
+    room_id = create_room("S1")
+    join_room(room_id, "S2")
+    start_game(room_id)
+    ws = connect(room_id, since=10**9)
+    try:
+        e = json.loads(ws.recv())
+    finally:
+        ws.close()
+    assert e["type"] == "snapshot"
+    assert e["seq"] == game_state(room_id)["seq"]
+    assert e["state"]["status"] == "playing"
+
+if __name__ == "__main__":
+    pytest.main(["-q", __file__])
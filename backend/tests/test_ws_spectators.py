@@ -0,0 +1,146 @@
+import asyncio
+import json
+import requests
+import pytest
+import websocket
+
+from services.spectators import SpectatorPublisher
+
+BASE = "http://127.0.0.1:8000"
+WS_BASE = "ws://127.0.0.1:8000"
+PREFIX = "/rooms"
+
+def create_room(player):
+    r = requests.post(f"{BASE}{PREFIX}/create_room", params={"player": player})
+    r.raise_for_status()
+    return r.json()
+
+def join_room(room_id, player):
+    r = requests.post(f"{BASE}{PREFIX}/join_room", params={"room_id": room_id, "player": player})
+    r.raise_for_status()
+    return r.json()
+
+def start_game(room_id):
+    r = requests.post(f"{BASE}{PREFIX}/start_game", params={"room_id": room_id})
+    r.raise_for_status()
+    return r.json()
+
+def admin_set_hand(room_id, player, tiles):
+    r = requests.post(f"{BASE}{PREFIX}/admin/set_hand", params={"room_id": room_id, "player": player}, json=tiles)
+    r.raise_for_status()
+    return r.json()
+
+def discard_tile(room_id, player, tile):
+    return requests.post(f"{BASE}{PREFIX}/discard_tile", params={"room_id": room_id, "player": player, "tile": tile})
+
+def pass_claim(room_id, player):
+    return requests.post(f"{BASE}{PREFIX}/pass_claim", params={"room_id": room_id, "player": player})
+
+def spectate(room_id, since=None):
+    url = f"{WS_BASE}{PREFIX}/ws/{room_id}?role=spectator"
+    if since is not None:
+        url += f"&since={since}"
+    return websocket.create_connection(url, timeout=3)
+
+def flatten(frame):
+    e = json.loads(frame)
+    return e["events"] if e.get("type") == "batch" else [e]
+
+def collect(ws, count):
+    events = []
+    while len(events) < count:
+        events.extend(flatten(ws.recv()))
+    return events
+
+def test_spectators_get_public_stream_in_order():
+    created = create_room("WatchA")
+    room_id = created["room_id"]
+    join_room(room_id, "WatchB")
+    watchers = [spectate(room_id) for _ in range(3)]
+    try:
+        start_game(room_id)
+        admin_set_hand(room_id, "WatchA", [9] + [30]*12)
+        assert discard_tile(room_id, "WatchA", 9).status_code == 200
+        assert pass_claim(room_id, "WatchB").status_code == 200
+        for ws in watchers:
+            events = collect(ws, 4)
+            assert [e["type"] for e in events] == ["start", "discard", "pass", "pending_cleared"]
+            seqs = [e["seq"] for e in events]
+            assert seqs == sorted(seqs)
+            # private hand events never reach the spectator tier
+            assert all(e["type"] != "hand" for e in events)
+    finally:
+        for ws in watchers:
+            ws.close()
+
+if __name__ == "__main__":
+    pytest.main(["-q", __file__])
+
+def test_slow_joiner_catch_up_does_not_hold_the_live_stream():
+    async def run():
+        sent = {"live": [], "slow": []}
+        gate = asyncio.Event()
+
+        async def send(ws, frame):
+            if ws == "slow":
+                await gate.wait()
+            sent[ws].extend(frame)
+
+        def catch_up(ws, since, released):
+            return [{"seq": n} for n in range(1, released + 1)] if ws == "slow" else []
+        def encode(ws, event, cache):
+            return [e["seq"] for e in event.get("events", [event])]  # a coalesced batch is one frame
+        pub = SpectatorPublisher(1, encode=encode, send=send, catch_up=catch_up, coalesce=0, send_timeout=5)
+        pub.join("live")
+        pub.push({"seq": 1})
+        await asyncio.sleep(0.01)
+        pub.join("slow")  # stalls on its first catch-up frame
+        for seq in (2, 3):
+            pub.push({"seq": seq})
+        await asyncio.sleep(0.05)
+        assert sent == {"live": [1, 2, 3], "slow": []} and not pub.idle()
+        gate.set()
+        await asyncio.sleep(0.01)
+        # catch-up first, then the live frames released meanwhile, then live
+        pub.push({"seq": 4})
+        await asyncio.sleep(0.01)
+        assert sent == {"live": [1, 2, 3, 4], "slow": [1, 2, 3, 4]}
+        assert pub.spectators == {"live", "slow"}
+        pub.leave("live")
+        pub.leave("slow")
+        assert pub.idle()
+        pub.close()
+    asyncio.run(run())
+
+def test_dropped_spectator_gets_a_close_frame():
+    class Socket:
+        def __init__(self, stall):
+            self.stall = stall
+            self.frames = []
+            self.closed = None
+
+        async def close(self, code=1000):
+            self.closed = code
+
+    async def run():
+        async def send(ws, frame):
+            if ws.stall:
+                await asyncio.sleep(1)
+            ws.frames.append(frame)
+
+        fast, slow = Socket(False), Socket(True)
+        pub = SpectatorPublisher(1, encode=lambda ws, event, cache: event["seq"], send=send,
+                                 catch_up=lambda ws, since, released: [], coalesce=0, send_timeout=0.05)
+        pub.join(fast)
+        pub.join(slow)
+        await asyncio.sleep(0.01)
+        pub.push({"seq": 1})
+        await asyncio.sleep(0.1)
+        # the slow socket is told to reconnect (with ?since=) instead of going silent
+        assert slow.closed == 1013 and slow not in pub.spectators
+        assert fast.frames == [1] and fast.closed is None
+        pub.push({"seq": 2})
+        await asyncio.sleep(0.01)
+        assert fast.frames == [1, 2] and slow.frames == []
+        pub.close()
+    asyncio.run(run())